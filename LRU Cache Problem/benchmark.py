@@ -0,0 +1,346 @@
+"""
+Benchmark suite for the cache implementations.
+
+Suites (``--suite``, default: all):
+
+- ``memory``      - tracemalloc bytes per entry after filling each backend
+                    with ``--entries`` int -> int items,
+- ``throughput``  - ops/s of get (hit), get (miss), put (new key), put
+                    (update) and a skewed 80/20 get/put mix,
+- ``latency``     - p50/p90/p99/p99.9 of single get hit, get miss and put
+                    calls in nanoseconds,
+- ``workloads``   - hit ratio and ops/s of every eviction policy on the
+                    Zipf and scan traces from simulate.py,
+- ``contention``  - total ops/s of 1, 2, 4... threads sharing one cache
+                    (locked LRU vs. sharded LRU and CLOCK) and of the same
+                    numbers of processes with private caches.
+
+Compared LRU backends: ``dict nodes`` (the original NodeL design with a
+``__dict__`` per node), ``slots nodes`` (LRUCache), ``array``
+(ArrayLRUCache) and ``OrderedDict`` (a minimal LRU on
+``collections.OrderedDict``).
+
+Results can be saved as JSON and compared with an earlier run::
+
+    python benchmark.py --json before.json
+    python benchmark.py --json after.json --compare before.json
+    python benchmark.py --suite contention --workers 8
+"""
+
+import argparse
+import gc
+import json
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime, timezone
+from multiprocessing import Pool
+
+from lrucache import ArrayLRUCache, LRUCache, ShardedCache, ThreadSafeLRUCache
+from policies import POLICIES, make_cache
+from simulate import replay, scan_trace, zipf_trace
+
+
+class DictNode:
+    def __init__(self, key=None, value=None, weight=0, expires=None):
+        self.key = key
+        self.value = value
+        self.weight = weight
+        self.expires = expires
+        self.prev = None
+        self.next = None
+
+
+class DictNodeLRUCache(LRUCache):
+    node_class = DictNode
+
+
+class OrderedDictLRU:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            self.data.move_to_end(key, last=False)
+        except KeyError:
+            return default
+        return self.data[key]
+
+    def put(self, key, value):
+        data = self.data
+        if key in data:
+            data.move_to_end(key, last=False)
+        elif len(data) >= self.capacity:
+            data.popitem()
+        data[key] = value
+        data.move_to_end(key, last=False)
+
+
+BACKENDS = {
+    'dict nodes': DictNodeLRUCache,
+    'slots nodes': LRUCache,
+    'array': ArrayLRUCache,
+    'OrderedDict': OrderedDictLRU,
+}
+
+
+def measure_memory(factory, entries):
+    gc.collect()
+    tracemalloc.start()
+    cache = factory(entries)
+    for i in range(entries):
+        cache.put(i, i)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del cache
+    return peak
+
+
+def make_workload(ops, key_space, seed=1):
+    rng = random.Random(seed)
+    # Skewed keys: a small hot set gets most of the traffic
+    keys = [int(key_space * rng.random() ** 3) for _ in range(ops)]
+    is_put = [rng.random() < 0.2 for _ in range(ops)]
+    return keys, is_put
+
+
+def run_workload(cache, keys, is_put):
+    get, put = cache.get, cache.put
+    for key, write in zip(keys, is_put):
+        if write:
+            put(key, key)
+        elif get(key) is None:
+            put(key, key)
+
+
+def measure_speed(factory, capacity, keys, is_put):
+    cache = factory(capacity)
+    start = time.perf_counter()
+    run_workload(cache, keys, is_put)
+    return len(keys) / (time.perf_counter() - start)
+
+
+SHARED_BACKENDS = {
+    'locked LRU': lambda capacity: ThreadSafeLRUCache(capacity),
+    'sharded LRU': lambda capacity: ShardedCache(capacity, shards=16, policy='lru'),
+    'sharded CLOCK': lambda capacity: ShardedCache(capacity, shards=16, policy='clock'),
+}
+
+
+def measure_threads(factory, capacity, threads, ops):
+    """Total ops/s of ``threads`` threads sharing one cache."""
+    cache = factory(capacity)
+    workloads = [make_workload(ops, capacity * 4, seed=i) for i in range(threads)]
+    workers = [threading.Thread(target=run_workload, args=(cache, keys, is_put)) for keys, is_put in workloads]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return threads * ops / (time.perf_counter() - start)
+
+
+def _process_worker(args):
+    capacity, ops, seed = args
+    keys, is_put = make_workload(ops, capacity * 4, seed=seed)
+    cache = ShardedCache(capacity, shards=16, policy='clock')
+    start = time.perf_counter()
+    run_workload(cache, keys, is_put)
+    return start, time.perf_counter()
+
+
+def measure_processes(capacity, processes, ops):
+    """Total ops/s of ``processes`` processes, each with its own cache."""
+    with Pool(processes) as pool:
+        spans = pool.map(_process_worker, [(capacity, ops, i) for i in range(processes)])
+    start = min(span[0] for span in spans)
+    end = max(span[1] for span in spans)
+    return processes * ops / (end - start)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    last = len(samples) - 1
+    return {name: samples[int(last * q)] for name, q in
+            (('p50_ns', 0.5), ('p90_ns', 0.9), ('p99_ns', 0.99), ('p99.9_ns', 0.999))}
+
+
+def timed_calls(func, args_list):
+    clock = time.perf_counter_ns
+    samples = []
+    for args in args_list:
+        start = clock()
+        func(*args)
+        samples.append(clock() - start)
+    return samples
+
+
+def bench_memory(args):
+    return {name: measure_memory(factory, args.entries) / args.entries for name, factory in BACKENDS.items()}
+
+
+def _rate(func, args_list):
+    start = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return len(args_list) / (time.perf_counter() - start)
+
+
+def bench_throughput(args):
+    capacity = args.capacity
+    hit_keys = [(random.randrange(capacity),) for _ in range(args.ops)]
+    miss_keys = [(capacity + i,) for i in range(args.ops)]
+    keys, is_put = make_workload(args.ops, capacity * 4)
+    results = {}
+    for name, factory in BACKENDS.items():
+        cache = factory(capacity)
+        for i in range(capacity):
+            cache.put(i, i)
+        results[name] = {
+            'get_hit_ops': _rate(cache.get, hit_keys),
+            'get_miss_ops': _rate(cache.get, miss_keys),
+            'put_update_ops': _rate(cache.put, [(key, key) for (key,) in hit_keys]),
+            'put_new_ops': _rate(cache.put, [(key, key) for (key,) in miss_keys]),
+            'mixed_ops': measure_speed(factory, capacity, keys, is_put),
+        }
+    return results
+
+
+def bench_latency(args):
+    capacity = args.capacity
+    samples = min(args.ops, 200000)
+    hit_keys = [(random.randrange(capacity),) for _ in range(samples)]
+    miss_keys = [(capacity * 10 + i,) for i in range(samples)]
+    results = {}
+    for name, factory in BACKENDS.items():
+        cache = factory(capacity)
+        for i in range(capacity):
+            cache.put(i, i)
+        results[name] = {
+            'get_hit': percentiles(timed_calls(cache.get, hit_keys)),
+            'get_miss': percentiles(timed_calls(cache.get, miss_keys)),
+            'put': percentiles(timed_calls(cache.put, [(key, key) for (key,) in miss_keys])),
+        }
+    return results
+
+
+def bench_workloads(args):
+    traces = {
+        'zipf': zipf_trace(args.ops),
+        'scan': scan_trace(args.ops),
+    }
+    results = {}
+    for trace_name, trace in traces.items():
+        results[trace_name] = {}
+        for policy in POLICIES:
+            start = time.perf_counter()
+            ratio = replay(make_cache(policy, args.capacity), trace)
+            results[trace_name][policy] = {
+                'hit_ratio': ratio,
+                'ops': len(trace) / (time.perf_counter() - start),
+            }
+    return results
+
+
+def bench_contention(args):
+    counts = [1]
+    while counts[-1] * 2 <= args.workers:
+        counts.append(counts[-1] * 2)
+    ops = args.ops // args.workers
+    results = {}
+    for name, factory in SHARED_BACKENDS.items():
+        results[name] = {str(n): measure_threads(factory, args.capacity, n, ops) for n in counts}
+    results['processes'] = {str(n): measure_processes(args.capacity, n, ops) for n in counts}
+    return results
+
+
+SUITES = {
+    'memory': bench_memory,
+    'throughput': bench_throughput,
+    'latency': bench_latency,
+    'workloads': bench_workloads,
+    'contention': bench_contention,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + '/'))
+        else:
+            flat[path] = value
+    return flat
+
+
+def print_results(results, baseline=None):
+    flat = flatten(results)
+    old = flatten(baseline) if baseline else {}
+    width = max(len(path) for path in flat) if flat else 0
+    for path, value in flat.items():
+        line = f"{path:<{width}}  {value:>16,.2f}" if isinstance(value, float) else f"{path:<{width}}  {value:>16}"
+        if path in old and isinstance(old[path], (int, float)) and old[path]:
+            line += f"  {(value - old[path]) / old[path]:+8.1%}"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--suite', nargs='+', choices=SUITES, default=list(SUITES))
+    parser.add_argument('--scaling', action='store_true', help="same as --suite contention")
+    parser.add_argument('--entries', type=int, default=200000, help="entries for the memory suite")
+    parser.add_argument('--ops', type=int, default=500000, help="operations per measurement")
+    parser.add_argument('--capacity', type=int, default=50000, help="cache capacity")
+    parser.add_argument('--workers', type=int, default=8, help="maximum threads/processes for contention")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help="write results to this file")
+    parser.add_argument('--compare', help="JSON file from an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    if args.scaling:
+        args.suite = ['contention']
+    random.seed(args.seed)
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': sys.version.split()[0],
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'args': vars(args),
+        },
+        'results': {},
+    }
+    for suite in args.suite:
+        started = time.perf_counter()
+        report['results'][suite] = SUITES[suite](args)
+        print(f"[{suite}] {time.perf_counter() - started:.1f} s", file=sys.stderr)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    print_results(report['results'], baseline)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+"""
+Persistent second tier for LRUCache.
+
+``DiskTier`` keeps entries in one append-only segment file read through
+``mmap``. Each record is::
+
+    <crc32: u32> <key length: u32> <value length: u32> <pickled key> <pickled value>
+
+A value length of 0xFFFFFFFF marks a deletion (tombstone). The in-memory
+index maps key -> (offset of the value, value length). On ``close()`` (or
+``snapshot()``) the index is written to ``index.snapshot`` together with the
+segment length it covers; on open the snapshot is loaded and only records
+appended after it are replayed. A torn record at the end of the segment
+(crash during a write) fails its CRC and is cut off.
+
+Overwrites and deletions leave dead records behind; once they exceed
+``compact_ratio`` of the file, ``compact()`` copies the live records into a
+new segment and swaps it in.
+
+``TieredLRUCache`` is an LRUCache whose evicted entries spill to a DiskTier
+and are promoted back to memory on the next ``get``. Memory contents are
+spilled on ``close()`` so a restart begins warm.
+"""
+
+import mmap
+import os
+import pickle
+import struct
+import zlib
+
+from lrucache import LRUCache
+
+HEADER = struct.Struct('<III')
+TOMBSTONE = 0xFFFFFFFF
+SEGMENT_FILE = 'segment.dat'
+SNAPSHOT_FILE = 'index.snapshot'
+
+_MISSING = object()
+
+
+class DiskTier:
+    def __init__(self, directory, compact_ratio=0.5, min_compact_bytes=1 << 20, max_bytes=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.compact_ratio = compact_ratio
+        self.min_compact_bytes = min_compact_bytes
+        self.max_bytes = max_bytes
+        self.path = os.path.join(directory, SEGMENT_FILE)
+        self.index = {}                 # key -> (value offset, value length, record length)
+        self.live_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._file = open(self.path, 'a+b')
+        self._map = None
+        self._load()
+
+    # --- records ----------------------------------------------------------
+
+    def _append(self, key_bytes, value_bytes, tombstone=False):
+        value_length = TOMBSTONE if tombstone else len(value_bytes)
+        body = key_bytes + value_bytes
+        crc = zlib.crc32(HEADER.pack(0, len(key_bytes), value_length)[4:] + body)
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        self._file.write(HEADER.pack(crc, len(key_bytes), value_length) + body)
+        return offset + HEADER.size + len(key_bytes), HEADER.size + len(body)
+
+    def _view(self, end):
+        """Memory map covering at least ``end`` bytes of the segment."""
+        if self._map is None or len(self._map) < end:
+            self._file.flush()
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _scan(self, start):
+        """Replays records from ``start``; returns the end of the last valid record."""
+        size = os.path.getsize(self.path)
+        if size <= start:
+            return start
+        view = self._view(size)
+        offset = start
+        while offset + HEADER.size <= size:
+            crc, key_length, value_length = HEADER.unpack_from(view, offset)
+            body_length = key_length + (0 if value_length == TOMBSTONE else value_length)
+            end = offset + HEADER.size + body_length
+            if end > size or zlib.crc32(view[offset + 4:end]) != crc:
+                break
+            key = pickle.loads(view[offset + HEADER.size:offset + HEADER.size + key_length])
+            self._forget(key)
+            if value_length != TOMBSTONE:
+                self.index[key] = (offset + HEADER.size + key_length, value_length, end - offset)
+                self.live_bytes += end - offset
+            offset = end
+        return offset
+
+    def _load(self):
+        start = 0
+        snapshot = os.path.join(self.directory, SNAPSHOT_FILE)
+        if os.path.exists(snapshot):
+            try:
+                with open(snapshot, 'rb') as f:
+                    covered, index = pickle.load(f)
+                if covered <= os.path.getsize(self.path):
+                    self.index = index
+                    self.live_bytes = sum(entry[2] for entry in index.values())
+                    start = covered
+            except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+                self.index, self.live_bytes = {}, 0
+        valid_end = self._scan(start)
+        if valid_end < os.path.getsize(self.path):
+            # Torn write at the end of the segment
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._file.truncate(valid_end)
+
+    def _forget(self, key):
+        entry = self.index.pop(key, None)
+        if entry is not None:
+            self.live_bytes -= entry[2]
+
+    # --- public API -------------------------------------------------------
+
+    def get(self, key, default=None):
+        entry = self.index.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        offset, length, _ = entry
+        self.hits += 1
+        return pickle.loads(self._view(offset + length)[offset:offset + length])
+
+    def put(self, key, value):
+        key_bytes = pickle.dumps(key, pickle.HIGHEST_PROTOCOL)
+        value_bytes = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        self._forget(key)
+        offset, record_length = self._append(key_bytes, value_bytes)
+        self.index[key] = (offset, len(value_bytes), record_length)
+        self.live_bytes += record_length
+        if self.max_bytes is not None:
+            # Oldest spilled entries go first
+            while self.live_bytes > self.max_bytes and len(self.index) > 1:
+                self.delete(next(iter(self.index)))
+        self._maybe_compact()
+
+    def delete(self, key):
+        if key not in self.index:
+            return False
+        self._forget(key)
+        self._append(pickle.dumps(key, pickle.HIGHEST_PROTOCOL), b'', tombstone=True)
+        self._maybe_compact()
+        return True
+
+    def pop(self, key, default=None):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        self.delete(key)
+        return value
+
+    @property
+    def file_bytes(self):
+        # tell() counts records still in the write buffer; getsize() would not
+        self._file.seek(0, os.SEEK_END)
+        return self._file.tell()
+
+    @property
+    def dead_bytes(self):
+        return self.file_bytes - self.live_bytes
+
+    def _maybe_compact(self):
+        size = self.file_bytes
+        if size >= self.min_compact_bytes and self.dead_bytes > size * self.compact_ratio:
+            self.compact()
+
+    def compact(self):
+        """Rewrites the segment with live records only."""
+        tmp_path = self.path + '.compact'
+        view = self._view(self.file_bytes)
+        index = {}
+        with open(tmp_path, 'wb') as out:
+            for key, (offset, length, record_length) in self.index.items():
+                start = offset + length - record_length
+                new_start = out.tell()
+                out.write(view[start:offset + length])
+                index[key] = (new_start + (offset - start), length, record_length)
+            out.flush()
+            os.fsync(out.fileno())
+        self._map.close()
+        self._map = None
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'a+b')
+        self.index = index
+        self.snapshot()
+
+    def snapshot(self):
+        """Saves the index so the next open does not rescan the segment."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        tmp_path = os.path.join(self.directory, SNAPSHOT_FILE + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((self.file_bytes, self.index), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, os.path.join(self.directory, SNAPSHOT_FILE))
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.snapshot()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TieredLRUCache(LRUCache):
+    """
+    LRUCache with a DiskTier behind it. Entries with a TTL are not spilled
+    (their monotonic-clock expiry does not survive a restart).
+    """
+
+    def __init__(self, capacity=128, directory='lru_cache_tier', disk=None, **kwargs):
+        self.disk = disk if disk is not None else DiskTier(directory)
+        super().__init__(capacity, **kwargs)
+        self.disk_hits = 0
+
+    def _evicted(self, node):
+        if node.expires is None:
+            self.disk.put(node.key, node.value)
+        super()._evicted(node)
+
+    def get(self, key, default=None):
+        value = super().get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = self.disk.pop(key, _MISSING)
+        if value is _MISSING:
+            return default
+        # Promote back to memory (this may spill another entry)
+        self.disk_hits += 1
+        super().put(key, value)
+        return value
+
+    def put(self, key, value, *args, **kwargs):
+        # The disk copy would be stale after the update
+        self.disk.delete(key)
+        return super().put(key, value, *args, **kwargs)
+
+    def delete(self, key):
+        in_memory = super().delete(key)
+        return self.disk.delete(key) or in_memory
+
+    def __contains__(self, key):
+        return super().__contains__(key) or key in self.disk
+
+    def close(self):
+        """Spills memory contents (least recently used first) and closes the disk tier."""
+        for key, value in reversed(super().items()):
+            node = self.cache[key]
+            if node.expires is None:
+                self.disk.put(key, value)
+        self.disk.close()
@@ -0,0 +1,702 @@
+"""
+Least Recently Used cache with O(1) get, put and delete.
+
+Entries live in a dict (key -> node) and in a doubly linked list ordered
+from the most recently used (after ``head``) to the least recently used
+(before ``tail``). Every successful ``get`` or ``put`` moves the node to
+the front; evictions take nodes from the back.
+
+Optional features:
+
+- ``ttl`` - default lifetime of an entry in seconds (per-entry override in
+  ``put``). Expired entries are dropped lazily when they are looked up, or
+  all at once with ``purge_expired()``.
+- ``max_weight`` - capacity measured in bytes (or any unit returned by
+  ``weigh(key, value)``) instead of, or in addition to, the entry count.
+- hit / miss / eviction / expiration counters via ``stats()``.
+
+``ThreadSafeLRUCache`` guards every operation with a lock, and the
+``lru_cached`` decorator memoizes functions with either variant.
+
+``ArrayLRUCache`` is a compact variant for millions of entries: instead of
+one node object per entry it keeps keys and values in preallocated lists
+and the prev/next links in integer arrays indexed by slot (no TTL or
+weights).
+
+``ShardedCache`` splits the key space over independently locked shards,
+either LRU or CLOCK (approximate LRU whose hits do not relink anything).
+"""
+
+import sys
+import threading
+import time
+from array import array
+from collections import namedtuple
+from functools import wraps
+
+CacheStats = namedtuple('CacheStats', [
+    'hits', 'misses', 'evictions', 'expirations', 'size', 'weight', 'capacity', 'max_weight'
+])
+
+_MISSING = object()
+
+
+def default_weigh(key, value):
+    """Rough in-memory size of an entry in bytes."""
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+class Node:
+    # No per-node __dict__: ~100 bytes less per entry
+    __slots__ = ('key', 'value', 'weight', 'expires', 'prev', 'next')
+
+    def __init__(self, key=None, value=None, weight=0, expires=None):
+        self.key = key
+        self.value = value
+        self.weight = weight
+        self.expires = expires
+        self.prev = None
+        self.next = None
+
+
+class LRUCache:
+    node_class = Node
+
+    def __init__(self, capacity=128, ttl=None, max_weight=None, weigh=None,
+                 on_evict=None, clock=time.monotonic):
+        if capacity is None and max_weight is None:
+            raise ValueError("Either capacity or max_weight must be set")
+        if capacity is not None and capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if max_weight is not None and max_weight <= 0:
+            raise ValueError("max_weight must be positive")
+        self.capacity = capacity
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self.weigh = weigh or (default_weigh if max_weight is not None else None)
+        self.on_evict = on_evict
+        self.clock = clock
+
+        self.cache = {}
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self.head = self.node_class()
+        self.tail = self.node_class()
+        self.head.next = self.tail
+        self.tail.prev = self.head
+
+    # --- linked list ------------------------------------------------------
+
+    def _add(self, node):
+        node.prev = self.head
+        node.next = self.head.next
+        self.head.next.prev = node
+        self.head.next = node
+
+    def _unlink(self, node):
+        node.prev.next = node.next
+        node.next.prev = node.prev
+
+    def _move_to_front(self, node):
+        if self.head.next is not node:
+            self._unlink(node)
+            self._add(node)
+
+    def _discard(self, node):
+        self._unlink(node)
+        del self.cache[node.key]
+        self.weight -= node.weight
+
+    def _expired(self, node):
+        return node.expires is not None and node.expires <= self.clock()
+
+    def _evict_overflow(self):
+        while self.cache and ((self.capacity is not None and len(self.cache) > self.capacity)
+                              or (self.max_weight is not None and self.weight > self.max_weight)):
+            node = self.tail.prev
+            self._discard(node)
+            self.evictions += 1
+            self._evicted(node)
+
+    def _evicted(self, node):
+        if self.on_evict is not None:
+            self.on_evict(node.key, node.value)
+
+    # --- public API -------------------------------------------------------
+
+    def get(self, key, default=None):
+        """Return the cached value (and mark it as most recently used) or ``default``."""
+        node = self.cache.get(key)
+        if node is None:
+            self.misses += 1
+            return default
+        if self._expired(node):
+            self._discard(node)
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._move_to_front(node)
+        self.hits += 1
+        return node.value
+
+    def peek(self, key, default=None):
+        """Return the value without touching recency or counters."""
+        node = self.cache.get(key)
+        if node is None or self._expired(node):
+            return default
+        return node.value
+
+    def put(self, key, value, ttl=_MISSING, weight=None):
+        """
+        Insert or update ``key``. Updating keeps a single node and moves it to
+        the front. Returns False if the entry alone exceeds ``max_weight``.
+        """
+        ttl = self.ttl if ttl is _MISSING else ttl
+        expires = None if ttl is None else self.clock() + ttl
+        if weight is None:
+            weight = self.weigh(key, value) if self.weigh is not None else 0
+        if self.max_weight is not None and weight > self.max_weight:
+            self.delete(key)
+            return False
+
+        node = self.cache.get(key)
+        if node is not None:
+            self.weight += weight - node.weight
+            node.value, node.weight, node.expires = value, weight, expires
+            self._move_to_front(node)
+        else:
+            node = self.node_class(key, value, weight, expires)
+            self.cache[key] = node
+            self.weight += weight
+            self._add(node)
+        self._evict_overflow()
+        return True
+
+    def delete(self, key):
+        """Remove ``key``; returns True if it was present."""
+        node = self.cache.get(key)
+        if node is None:
+            return False
+        self._discard(node)
+        return True
+
+    def pop(self, key, default=_MISSING):
+        node = self.cache.get(key)
+        if node is None or self._expired(node):
+            if node is not None:
+                self._discard(node)
+                self.expirations += 1
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        self._discard(node)
+        return node.value
+
+    def purge_expired(self):
+        """Drop every expired entry; returns how many were removed."""
+        now = self.clock()
+        expired = [node for node in self.cache.values() if node.expires is not None and node.expires <= now]
+        for node in expired:
+            self._discard(node)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def clear(self):
+        self.cache.clear()
+        self.weight = 0
+        self.head.next = self.tail
+        self.tail.prev = self.head
+
+    def keys(self):
+        """Keys from the most to the least recently used."""
+        return [key for key, _ in self.items()]
+
+    def items(self):
+        result = []
+        node = self.head.next
+        while node is not self.tail:
+            if not self._expired(node):
+                result.append((node.key, node.value))
+            node = node.next
+        return result
+
+    def stats(self):
+        return CacheStats(self.hits, self.misses, self.evictions, self.expirations,
+                          len(self.cache), self.weight, self.capacity, self.max_weight)
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self):
+        return len(self.cache)
+
+    def __contains__(self, key):
+        node = self.cache.get(key)
+        return node is not None and not self._expired(node)
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    def __delitem__(self, key):
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.items()!r})"
+
+
+class ThreadSafeLRUCache(LRUCache):
+    """LRUCache whose operations are serialized by a re-entrant lock."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.RLock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            return super().get(key, default)
+
+    def peek(self, key, default=None):
+        with self.lock:
+            return super().peek(key, default)
+
+    def put(self, key, value, ttl=_MISSING, weight=None):
+        with self.lock:
+            return super().put(key, value, ttl, weight)
+
+    def delete(self, key):
+        with self.lock:
+            return super().delete(key)
+
+    def pop(self, key, default=_MISSING):
+        with self.lock:
+            return super().pop(key, default)
+
+    def purge_expired(self):
+        with self.lock:
+            return super().purge_expired()
+
+    def clear(self):
+        with self.lock:
+            super().clear()
+
+    def items(self):
+        with self.lock:
+            return super().items()
+
+    def stats(self):
+        with self.lock:
+            return super().stats()
+
+    def __contains__(self, key):
+        with self.lock:
+            return super().__contains__(key)
+
+
+class ArrayLRUCache:
+    """
+    Fixed-capacity LRU cache without per-entry objects.
+
+    Slot ``i`` holds ``slot_keys[i]`` and ``slot_values[i]``; ``prev[i]`` and ``next[i]``
+    link the slots into a circular list through a sentinel slot
+    (``capacity``): ``next[sentinel]`` is the most and ``prev[sentinel]`` the
+    least recently used slot. Unused slots form a free list chained through
+    ``next``. Per entry this costs one dict item plus 16 bytes of links.
+    """
+
+    def __init__(self, capacity=128, on_evict=None):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.on_evict = on_evict
+        self._reset()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _reset(self):
+        capacity = self.capacity
+        self.cache = {}                 # key -> slot
+        self.slot_keys = [None] * capacity
+        self.slot_values = [None] * capacity
+        sentinel = self.sentinel = capacity
+        self.prev = array('q', [sentinel]) * (capacity + 1)
+        # Free list: 0 -> 1 -> ... -> capacity - 1 -> -1
+        self.next = array('q', range(1, capacity + 1))
+        self.next[capacity - 1] = -1
+        self.next.append(sentinel)
+        self.free = 0
+
+    def _unlink(self, slot):
+        prev, next_ = self.prev, self.next
+        p, n = prev[slot], next_[slot]
+        next_[p] = n
+        prev[n] = p
+
+    def _add(self, slot):
+        prev, next_, sentinel = self.prev, self.next, self.sentinel
+        first = next_[sentinel]
+        prev[slot] = sentinel
+        next_[slot] = first
+        prev[first] = slot
+        next_[sentinel] = slot
+
+    def get(self, key, default=None):
+        slot = self.cache.get(key)
+        if slot is None:
+            self.misses += 1
+            return default
+        if self.next[self.sentinel] != slot:
+            self._unlink(slot)
+            self._add(slot)
+        self.hits += 1
+        return self.slot_values[slot]
+
+    def peek(self, key, default=None):
+        slot = self.cache.get(key)
+        return default if slot is None else self.slot_values[slot]
+
+    def put(self, key, value):
+        slot = self.cache.get(key)
+        if slot is not None:
+            self.slot_values[slot] = value
+            if self.next[self.sentinel] != slot:
+                self._unlink(slot)
+                self._add(slot)
+            return True
+        if self.free >= 0:
+            slot = self.free
+            self.free = self.next[slot]
+        else:
+            # Full: reuse the least recently used slot
+            slot = self.prev[self.sentinel]
+            self._unlink(slot)
+            old_key, old_value = self.slot_keys[slot], self.slot_values[slot]
+            del self.cache[old_key]
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(old_key, old_value)
+        self.slot_keys[slot] = key
+        self.slot_values[slot] = value
+        self.cache[key] = slot
+        self._add(slot)
+        return True
+
+    def delete(self, key):
+        slot = self.cache.pop(key, None)
+        if slot is None:
+            return False
+        self._unlink(slot)
+        self.slot_keys[slot] = self.slot_values[slot] = None
+        self.next[slot] = self.free
+        self.free = slot
+        return True
+
+    def clear(self):
+        # Like LRUCache.clear, the hit/miss counters are kept
+        self._reset()
+
+    def keys(self):
+        return [key for key, _ in self.items()]
+
+    def items(self):
+        result = []
+        slot = self.next[self.sentinel]
+        while slot != self.sentinel:
+            result.append((self.slot_keys[slot], self.slot_values[slot]))
+            slot = self.next[slot]
+        return result
+
+    def stats(self):
+        return CacheStats(self.hits, self.misses, self.evictions, 0,
+                          len(self.cache), 0, self.capacity, None)
+
+    def __len__(self):
+        return len(self.cache)
+
+    def __contains__(self, key):
+        return key in self.cache
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    def __delitem__(self, key):
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.items()!r})"
+
+
+class ClockCache:
+    """
+    Approximate LRU (CLOCK / second chance) with a lock-free hit path.
+
+    Entries sit in a ring of slots as immutable ``(key, value)`` tuples. A
+    hit only sets the slot's reference bit - nothing is relinked, so ``get``
+    takes no lock. To make room, the clock hand sweeps the ring, clearing
+    reference bits until it finds an unreferenced slot to reuse. Writers
+    (``put``/``delete``) are serialized by a lock.
+    """
+
+    def __init__(self, capacity=128, on_evict=None):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.on_evict = on_evict
+        self.cache = {}                         # key -> slot
+        self.entries = [None] * capacity        # slot -> (key, value)
+        self.referenced = bytearray(capacity)
+        self.free = list(range(capacity - 1, -1, -1))
+        self.hand = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        slot = self.cache.get(key)
+        if slot is not None:
+            entry = self.entries[slot]
+            # The slot may have been reused by a concurrent put
+            if entry is not None and entry[0] == key:
+                self.referenced[slot] = 1
+                # Unlocked counters may lose increments under contention
+                self.hits += 1
+                return entry[1]
+        self.misses += 1
+        return default
+
+    def peek(self, key, default=None):
+        slot = self.cache.get(key)
+        entry = None if slot is None else self.entries[slot]
+        return entry[1] if entry is not None and entry[0] == key else default
+
+    def _victim(self):
+        referenced, capacity = self.referenced, self.capacity
+        hand = self.hand
+        while referenced[hand]:
+            referenced[hand] = 0
+            hand = (hand + 1) % capacity
+        self.hand = (hand + 1) % capacity
+        return hand
+
+    def put(self, key, value):
+        with self.lock:
+            slot = self.cache.get(key)
+            if slot is not None:
+                self.entries[slot] = (key, value)
+                self.referenced[slot] = 1
+                return True
+            if self.free:
+                slot = self.free.pop()
+            else:
+                slot = self._victim()
+                old_key, old_value = self.entries[slot]
+                del self.cache[old_key]
+                self.evictions += 1
+                if self.on_evict is not None:
+                    self.on_evict(old_key, old_value)
+            self.entries[slot] = (key, value)
+            self.referenced[slot] = 0
+            self.cache[key] = slot
+            return True
+
+    def delete(self, key):
+        with self.lock:
+            slot = self.cache.pop(key, None)
+            if slot is None:
+                return False
+            self.entries[slot] = None
+            self.referenced[slot] = 0
+            self.free.append(slot)
+            return True
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+            self.entries = [None] * self.capacity
+            self.referenced = bytearray(self.capacity)
+            self.free = list(range(self.capacity - 1, -1, -1))
+            self.hand = 0
+
+    def keys(self):
+        return [key for key, _ in self.items()]
+
+    def items(self):
+        return [entry for entry in self.entries if entry is not None]
+
+    def stats(self):
+        return CacheStats(self.hits, self.misses, self.evictions, 0,
+                          len(self.cache), 0, self.capacity, None)
+
+    def __len__(self):
+        return len(self.cache)
+
+    def __contains__(self, key):
+        return self.peek(key, _MISSING) is not _MISSING
+
+
+class ShardedCache:
+    """
+    N independent caches selected by ``hash(key) % shards``, each with its
+    own lock and ``capacity // shards`` entries (``max_weight`` is split the
+    same way). Threads working on different shards do not contend.
+
+    ``policy`` is ``'lru'`` (ThreadSafeLRUCache shards; supports ``ttl`` and
+    ``max_weight``) or ``'clock'`` (ClockCache shards, lock-free hits).
+    """
+
+    def __init__(self, capacity=1024, shards=16, policy='lru', **kwargs):
+        if policy not in ('lru', 'clock'):
+            raise ValueError(f"Unknown policy: {policy}")
+        if capacity is not None and capacity < shards:
+            raise ValueError("capacity must be at least the number of shards")
+        self.policy = policy
+        self.capacity = capacity
+        per_shard = None if capacity is None else capacity // shards
+        if policy == 'lru':
+            if kwargs.get('max_weight') is not None:
+                kwargs['max_weight'] = kwargs['max_weight'] // shards
+            self.shards = [ThreadSafeLRUCache(per_shard, **kwargs) for _ in range(shards)]
+        else:
+            self.shards = [ClockCache(per_shard, **kwargs) for _ in range(shards)]
+
+    def shard(self, key):
+        return self.shards[hash(key) % len(self.shards)]
+
+    def get(self, key, default=None):
+        return self.shards[hash(key) % len(self.shards)].get(key, default)
+
+    def peek(self, key, default=None):
+        return self.shard(key).peek(key, default)
+
+    def put(self, key, value, **kwargs):
+        return self.shards[hash(key) % len(self.shards)].put(key, value, **kwargs)
+
+    def delete(self, key):
+        return self.shard(key).delete(key)
+
+    def clear(self):
+        for shard in self.shards:
+            shard.clear()
+
+    def items(self):
+        return [item for shard in self.shards for item in shard.items()]
+
+    def keys(self):
+        return [key for key, _ in self.items()]
+
+    def stats(self):
+        totals = [shard.stats() for shard in self.shards]
+        summed = [sum(values) for values in zip(*(stats[:6] for stats in totals))]
+        max_weight = None if totals[0].max_weight is None else sum(stats.max_weight for stats in totals)
+        return CacheStats(*summed, self.capacity, max_weight)
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards)
+
+    def __contains__(self, key):
+        return key in self.shard(key)
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    def __delitem__(self, key):
+        if not self.delete(key):
+            raise KeyError(key)
+
+
+def _make_key(args, kwargs, typed):
+    key = args
+    if kwargs:
+        key += (_MISSING,) + tuple(sorted(kwargs.items()))
+    if typed:
+        key += tuple(type(arg) for arg in args) + tuple(type(v) for _, v in sorted(kwargs.items()))
+    return key
+
+
+def _uncached(func):
+    """Wrapper with the lru_cached interface that calls ``func`` every time."""
+    misses = 0
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        nonlocal misses
+        misses += 1
+        return func(*args, **kwargs)
+
+    wrapper.cache = None
+    wrapper.cache_info = lambda: CacheStats(0, misses, 0, 0, 0, 0, 0, None)
+    wrapper.cache_clear = lambda: None
+    return wrapper
+
+
+def lru_cached(maxsize=128, ttl=None, max_weight=None, weigh=None, typed=False, thread_safe=True):
+    """
+    Memoize a function in an LRU cache::
+
+        @lru_cached(maxsize=1000, ttl=60)
+        def fetch_metadata(url): ...
+
+    The wrapper exposes ``cache``, ``cache_info()`` and ``cache_clear()``.
+    Calls with unhashable arguments bypass the cache. As with
+    ``functools.lru_cache``, ``maxsize=None`` means no entry limit (only
+    ``max_weight``, if given, bounds the cache) and ``maxsize=0`` turns
+    caching off (every call counts as a miss).
+    """
+    if callable(maxsize) and ttl is None and max_weight is None:
+        # Used as a bare @lru_cached
+        return lru_cached()(maxsize)
+
+    def decorator(func):
+        if maxsize is not None and maxsize <= 0:
+            return _uncached(func)
+        cache_class = ThreadSafeLRUCache if thread_safe else LRUCache
+        capacity = maxsize
+        if maxsize is None and max_weight is None:
+            # LRUCache needs some bound; nothing is ever evicted at this size
+            capacity = sys.maxsize
+        cache = cache_class(capacity, ttl=ttl, max_weight=max_weight, weigh=weigh)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                key = _make_key(args, kwargs, typed)
+                value = cache.get(key, _MISSING)
+            except TypeError:
+                return func(*args, **kwargs)
+            if value is _MISSING:
+                # Two threads may compute the same value; the last one wins
+                value = func(*args, **kwargs)
+                cache.put(key, value)
+            return value
+
+        wrapper.cache = cache
+        wrapper.cache_info = cache.stats
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
@@ -10,67 +10,40 @@ If the number of elements exceeds a specified limit, the longest unused element
 Ensure that the operations are optimized for time complexity.
 """
 
-size = 3
-
+from lrucache import LRUCache, lru_cached
 
-class NodeL:
-    def __init__(self, key=None, value=None):
-        self.key = key
-        self.value = value
-        self.prev = None
-        self.next = None
+size = 3
 
 
-class LRUCache:
-    def __init__(self, capacity: int):
-        self.capacity = capacity
-        self.cache = {}  
+def show(cache):
+    print("Show cache:")
+    for k, v in cache.items():
+        print(k, v)
+    print()
 
 
-        self.head = NodeL()  
-        self.tail = NodeL()
-        self.head.next = self.tail
-        self.tail.prev = self.head
-    
-    def add(self,node):
-        node.prev = self.head
-        node.next = self.head.next
-        self.head.next.prev = node
-        self.head.next = node
-    def remove(self,node):
-        prev = node.prev
-        next = node.next
-        prev.next = next
-        next.prev = prev
-        del self.cache[node.key]
-        
-    def Show(self):
-        print("Show cache:")
-        for k, v in self.cache.items():
-            print(k, v.value)
-        print()
-        
-    def get(self, key: int) -> int:
-        print(self.cache[key].value)
-        
-    def put(self, key: int, value: int) -> None:
-        node = NodeL(key, value)
-        self.cache[key] = node
-        self.add(node)
-        if len(self.cache) > self.capacity:
-            self.remove(self.tail.prev)
-            
-            
 cache = LRUCache(size)
 
-cache.Show()
+show(cache)
 cache.put(1, 1)
-cache.Show()
+show(cache)
 cache.put(2, 2)
-cache.Show()
-cache.get(1)
-cache.put(3,15)
-cache.Show()
-cache.get(3)
+show(cache)
+print(cache.get(1))
+cache.put(3, 15)
+show(cache)
+print(cache.get(3))
 cache.put(2, 4)
-cache.Show()
\ No newline at end of file
+show(cache)
+cache.put(4, 8)     # 1 is now the least recently used entry and gets evicted
+show(cache)
+print(cache.get(1))
+print(cache.stats())
+
+
+@lru_cached(maxsize=100)
+def fib(n):
+    return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+
+print(fib(80), fib.cache_info())
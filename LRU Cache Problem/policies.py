@@ -0,0 +1,349 @@
+"""
+Eviction policies with the same get/put interface as LRUCache.
+
+- ``LFUCache``     - least frequently used, O(1): keys are grouped in
+                     per-frequency buckets (oldest first inside a bucket).
+- ``ARCCache``     - Adaptive Replacement Cache: recency list T1 and
+                     frequency list T2 plus ghost lists B1/B2 of recently
+                     evicted keys, which move the target size ``p`` of T1.
+                     Resistant to scans.
+- ``WTinyLFUCache`` - a small LRU window in front of a segmented LRU
+                     (probation + protected). A key leaving the window is
+                     admitted to the main cache only if a count-min sketch
+                     estimates it as more frequent than the main cache's
+                     victim. Counters are halved periodically so old
+                     popularity fades.
+
+``make_cache(policy, capacity)`` builds any of them (plus ``lru`` and
+``clock`` from lrucache) by name; ``simulate.py`` replays access traces
+against them.
+"""
+
+from collections import OrderedDict
+
+from lrucache import CacheStats, ClockCache, LRUCache
+
+_MISSING = object()
+
+
+class _Counters:
+    def _init_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        return CacheStats(self.hits, self.misses, self.evictions, 0, len(self), 0, self.capacity, None)
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    def __delitem__(self, key):
+        if not self.delete(key):
+            raise KeyError(key)
+
+
+class LFUCache(_Counters):
+    def __init__(self, capacity=128):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.values = {}
+        self.freq = {}
+        self.buckets = {}           # frequency -> OrderedDict of keys (oldest first)
+        self.min_freq = 0
+        self._init_counters()
+
+    def _touch(self, key):
+        freq = self.freq[key]
+        bucket = self.buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[freq]
+            if self.min_freq == freq:
+                self.min_freq = freq + 1
+        self.freq[key] = freq + 1
+        self.buckets.setdefault(freq + 1, OrderedDict())[key] = None
+
+    def get(self, key, default=None):
+        if key not in self.values:
+            self.misses += 1
+            return default
+        self._touch(key)
+        self.hits += 1
+        return self.values[key]
+
+    def put(self, key, value):
+        if key in self.values:
+            self.values[key] = value
+            self._touch(key)
+            return True
+        if len(self.values) >= self.capacity:
+            if self.min_freq not in self.buckets:
+                # After a delete the minimum may be stale
+                self.min_freq = min(self.buckets)
+            bucket = self.buckets[self.min_freq]
+            victim, _ = bucket.popitem(last=False)
+            if not bucket:
+                del self.buckets[self.min_freq]
+            del self.values[victim], self.freq[victim]
+            self.evictions += 1
+        self.values[key] = value
+        self.freq[key] = 1
+        self.buckets.setdefault(1, OrderedDict())[key] = None
+        self.min_freq = 1
+        return True
+
+    def delete(self, key):
+        if key not in self.values:
+            return False
+        freq = self.freq.pop(key)
+        bucket = self.buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[freq]
+        del self.values[key]
+        return True
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, key):
+        return key in self.values
+
+
+class ARCCache(_Counters):
+    def __init__(self, capacity=128):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.p = 0.0
+        self.t1 = OrderedDict()     # seen once recently: key -> value
+        self.t2 = OrderedDict()     # seen at least twice
+        self.b1 = OrderedDict()     # ghosts evicted from t1: key -> None
+        self.b2 = OrderedDict()     # ghosts evicted from t2
+        self._init_counters()
+
+    def _replace(self, in_b2):
+        if self.t1 and (len(self.t1) > self.p or (in_b2 and len(self.t1) == self.p)):
+            key, _ = self.t1.popitem(last=False)
+            self.b1[key] = None
+        else:
+            key, _ = self.t2.popitem(last=False)
+            self.b2[key] = None
+        self.evictions += 1
+
+    def _full(self):
+        return len(self.t1) + len(self.t2) >= self.capacity
+
+    def get(self, key, default=None):
+        if key in self.t1:
+            value = self.t1.pop(key)
+            self.t2[key] = value
+        elif key in self.t2:
+            self.t2.move_to_end(key)
+            value = self.t2[key]
+        else:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        c = self.capacity
+        if key in self.t1:
+            del self.t1[key]
+            self.t2[key] = value
+        elif key in self.t2:
+            self.t2[key] = value
+            self.t2.move_to_end(key)
+        elif key in self.b1:
+            self.p = min(c, self.p + max(len(self.b2) / len(self.b1), 1))
+            if self._full():
+                self._replace(False)
+            del self.b1[key]
+            self.t2[key] = value
+        elif key in self.b2:
+            self.p = max(0.0, self.p - max(len(self.b1) / len(self.b2), 1))
+            if self._full():
+                self._replace(True)
+            del self.b2[key]
+            self.t2[key] = value
+        else:
+            l1 = len(self.t1) + len(self.b1)
+            total = l1 + len(self.t2) + len(self.b2)
+            if l1 >= c:
+                if len(self.t1) < c:
+                    self.b1.popitem(last=False)
+                    if self._full():
+                        self._replace(False)
+                else:
+                    self.t1.popitem(last=False)
+                    self.evictions += 1
+            elif total >= c:
+                if total >= 2 * c:
+                    self.b2.popitem(last=False)
+                if self._full():
+                    self._replace(False)
+            self.t1[key] = value
+        return True
+
+    def delete(self, key):
+        for store in (self.t1, self.t2):
+            if key in store:
+                del store[key]
+                return True
+        return False
+
+    def __len__(self):
+        return len(self.t1) + len(self.t2)
+
+    def __contains__(self, key):
+        return key in self.t1 or key in self.t2
+
+
+class CountMinSketch:
+    """
+    Frequency estimates in ``depth`` rows of 4-bit-range (0-15) counters.
+    After ``sample_size`` increments every counter is halved (aging).
+    """
+
+    _HALVE = bytes(i >> 1 for i in range(256))
+    _SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+
+    def __init__(self, width, depth=4, sample_size=None):
+        width = 1 << max(4, (width - 1).bit_length())
+        self.mask = width - 1
+        self.rows = [bytearray(width) for _ in range(depth)]
+        self.seeds = self._SEEDS[:depth]
+        self.sample_size = sample_size or 10 * width
+        self.additions = 0
+
+    def _indexes(self, key):
+        h = hash(key)
+        return [((h ^ seed) * 0x2545F4914F6CDD1D >> 32) & self.mask for seed in self.seeds]
+
+    def increment(self, key):
+        for row, index in zip(self.rows, self._indexes(key)):
+            if row[index] < 15:
+                row[index] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.rows = [row.translate(self._HALVE) for row in self.rows]
+            self.additions //= 2
+
+    def estimate(self, key):
+        return min(row[index] for row, index in zip(self.rows, self._indexes(key)))
+
+
+class WTinyLFUCache(_Counters):
+    def __init__(self, capacity=128, window_ratio=0.01, protected_ratio=0.8):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.window_capacity = min(capacity, max(1, int(capacity * window_ratio)))
+        # Window and main segments together hold exactly ``capacity`` entries
+        main = capacity - self.window_capacity
+        self.main_capacity = main
+        self.protected_capacity = max(1, int(main * protected_ratio))
+        self.window = OrderedDict()
+        self.probation = OrderedDict()
+        self.protected = OrderedDict()
+        self.sketch = CountMinSketch(capacity)
+        self._last_miss = _MISSING
+        self._init_counters()
+
+    def _promote(self, key):
+        value = self.probation.pop(key)
+        self.protected[key] = value
+        if len(self.protected) > self.protected_capacity:
+            demoted, demoted_value = self.protected.popitem(last=False)
+            self.probation[demoted] = demoted_value
+        return value
+
+    def get(self, key, default=None):
+        self.sketch.increment(key)
+        if key in self.window:
+            self.window.move_to_end(key)
+            value = self.window[key]
+        elif key in self.probation:
+            value = self._promote(key)
+        elif key in self.protected:
+            self.protected.move_to_end(key)
+            value = self.protected[key]
+        else:
+            self.misses += 1
+            self._last_miss = key
+            return default
+        self.hits += 1
+        return value
+
+    def _admit(self, candidate, value):
+        if len(self.probation) + len(self.protected) < self.main_capacity:
+            self.probation[candidate] = value
+            return
+        victims = self.probation or self.protected
+        if not victims:
+            # Main segment has no room (capacity=1): the candidate is dropped
+            self.evictions += 1
+            return
+        victim = next(iter(victims))
+        if self.sketch.estimate(candidate) > self.sketch.estimate(victim):
+            del victims[victim]
+            self.probation[candidate] = value
+        self.evictions += 1
+
+    def put(self, key, value):
+        if key != self._last_miss:
+            # A get() that missed has already counted this access
+            self.sketch.increment(key)
+        self._last_miss = _MISSING
+        for store in (self.window, self.protected):
+            if key in store:
+                store[key] = value
+                store.move_to_end(key)
+                return True
+        if key in self.probation:
+            self.probation[key] = value
+            self._promote(key)
+            return True
+        self.window[key] = value
+        if len(self.window) > self.window_capacity:
+            self._admit(*self.window.popitem(last=False))
+        return True
+
+    def delete(self, key):
+        for store in (self.window, self.probation, self.protected):
+            if key in store:
+                del store[key]
+                return True
+        return False
+
+    def __len__(self):
+        return len(self.window) + len(self.probation) + len(self.protected)
+
+    def __contains__(self, key):
+        return key in self.window or key in self.probation or key in self.protected
+
+
+POLICIES = {
+    'lru': LRUCache,
+    'clock': ClockCache,
+    'lfu': LFUCache,
+    'arc': ARCCache,
+    'tinylfu': WTinyLFUCache,
+}
+
+
+def make_cache(policy, capacity, **kwargs):
+    try:
+        cache_class = POLICIES[policy]
+    except KeyError:
+        raise ValueError(f"Unknown policy {policy!r}; choose from {', '.join(POLICIES)}") from None
+    return cache_class(capacity, **kwargs)
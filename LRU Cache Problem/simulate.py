@@ -0,0 +1,118 @@
+"""
+Replay access traces against the eviction policies and report hit ratios.
+
+A trace is a text file with one key per line (for CSV lines the first
+field is used), or one of the synthetic workloads:
+
+- ``zipf``  - skewed popularity (Zipf, s=0.9),
+- ``scan``  - the same Zipf traffic interrupted by long one-off sequential
+              scans, like report queries reading whole tables,
+- ``loop``  - a cyclic scan 10% larger than the simulated cache capacity.
+
+Every access is a ``get``; a miss is followed by a ``put``.
+
+    python simulate.py --synthetic scan --capacities 100 1000 10000
+    python simulate.py --trace keys.txt --policies lru arc tinylfu
+"""
+
+import argparse
+import itertools
+import random
+import time
+
+from policies import POLICIES, make_cache
+
+
+def read_trace(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line.split(',', 1)[0]
+
+
+def zipf_trace(length, keys=100000, s=0.9, seed=1):
+    rng = random.Random(seed)
+    cum_weights = list(itertools.accumulate(1.0 / (rank ** s) for rank in range(1, keys + 1)))
+    return rng.choices(range(keys), cum_weights=cum_weights, k=length)
+
+
+def scan_trace(length, keys=100000, scan_length=20000, every=50000, seed=1):
+    trace = zipf_trace(length, keys, seed=seed)
+    result, next_scan = [], keys
+    for i, key in enumerate(trace):
+        result.append(key)
+        if i and i % every == 0:
+            # Keys that are never used again
+            result.extend(range(next_scan, next_scan + scan_length))
+            next_scan += scan_length
+    return result
+
+
+def loop_trace(length, loop):
+    return [i % loop for i in range(length)]
+
+
+# Builders take (length, capacity); only the loop depends on the capacity
+SYNTHETIC = {
+    'zipf': lambda length, capacity: zipf_trace(length),
+    'scan': lambda length, capacity: scan_trace(length),
+    'loop': lambda length, capacity: loop_trace(length, int(capacity * 1.1)),
+}
+
+
+def replay(cache, trace):
+    get, put = cache.get, cache.put
+    missing = object()
+    hits = requests = 0
+    for key in trace:
+        requests += 1
+        if get(key, missing) is missing:
+            put(key, True)
+        else:
+            hits += 1
+    return hits / requests if requests else 0.0
+
+
+def simulate(traces, policies, capacities):
+    """
+    ``traces`` is one trace for all capacities or a {capacity: trace} dict.
+    Returns {(policy, capacity): (hit_ratio, seconds)}.
+    """
+    results = {}
+    for policy in policies:
+        for capacity in capacities:
+            trace = traces[capacity] if isinstance(traces, dict) else traces
+            start = time.perf_counter()
+            ratio = replay(make_cache(policy, capacity), trace)
+            results[policy, capacity] = ratio, time.perf_counter() - start
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay access traces against cache eviction policies.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--trace', help="file with one key per line")
+    source.add_argument('--synthetic', choices=SYNTHETIC)
+    parser.add_argument('--length', type=int, default=500000, help="length of a synthetic trace")
+    parser.add_argument('--policies', nargs='+', choices=POLICIES, default=list(POLICIES))
+    parser.add_argument('--capacities', nargs='+', type=int, default=[100, 1000, 10000])
+    args = parser.parse_args(argv)
+
+    if args.trace:
+        traces = list(read_trace(args.trace))
+        print(f"{len(traces)} accesses, {len(set(traces))} distinct keys")
+    elif args.synthetic == 'loop':
+        traces = {capacity: SYNTHETIC['loop'](args.length, capacity) for capacity in args.capacities}
+    else:
+        traces = SYNTHETIC[args.synthetic](args.length, None)
+        print(f"{len(traces)} accesses, {len(set(traces))} distinct keys")
+    results = simulate(traces, args.policies, args.capacities)
+
+    print(f"{'policy':<10}" + ''.join(f"{capacity:>12}" for capacity in args.capacities))
+    for policy in args.policies:
+        print(f"{policy:<10}" + ''.join(f"{results[policy, capacity][0]:>12.2%}" for capacity in args.capacities))
+
+
+if __name__ == '__main__':
+    main()
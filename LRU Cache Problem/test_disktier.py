@@ -0,0 +1,41 @@
+import random
+import shutil
+import tempfile
+import unittest
+
+from disktier import DiskTier
+
+
+class DiskTierTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_compact_keeps_buffered_record(self):
+        # get() maps the segment; the next put() stays in the write buffer
+        with DiskTier(self.directory) as disk:
+            for i in range(10):
+                disk.put(i, i)
+            self.assertEqual(disk.get(0), 0)
+            disk.put(10, 10)
+            disk.compact()
+            self.assertEqual(disk.get(10), 10)
+
+    def test_auto_compaction(self):
+        rng = random.Random(1)
+        expected = {}
+        with DiskTier(self.directory, min_compact_bytes=256) as disk:
+            for _ in range(2000):
+                key = rng.randrange(20)
+                if rng.random() < 0.5:
+                    value = rng.random()
+                    disk.put(key, value)
+                    expected[key] = value
+                else:
+                    self.assertEqual(disk.get(key), expected.get(key))
+        with DiskTier(self.directory) as disk:
+            self.assertEqual({key: disk.get(key) for key in expected}, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
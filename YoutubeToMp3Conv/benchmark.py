@@ -0,0 +1,129 @@
+"""
+Pomiar przepustowości muzyka.py bez sieci. Pliki audio z katalogu (LocalSource,
+opcjonalnie przez lokalny serwer HTTP) przechodzą przez wybrane tryby; dla
+każdego podawane są pliki/min, MB/s (rozmiar plików źródłowych) i wykorzystanie
+CPU: osobno proces główny (metadane, pobieranie, koordynacja) i procesy
+potomne (ffmpeg i pula konwersji).
+
+    python benchmark.py probki --generuj 20 --dlugosc 120
+    python benchmark.py probki --http --tryby sekwencyjny potok-strumien --json wynik.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from muzyka import FFMPEG, TEMP_DIR, LocalSource, Manifest, print_summary, run_pipeline, run_sequential
+
+MODES = {
+    'sekwencyjny': {'parallel': False, 'stream': False},
+    'strumien': {'parallel': False, 'stream': True},
+    'potok': {'parallel': True, 'stream': False},
+    'potok-strumien': {'parallel': True, 'stream': True},
+}
+
+def generate_samples(directory: str, count: int, seconds: int):
+    """Tworzy próbki: na przemian WAV (wymaga kodowania) i MP3 (wystarczy remux)."""
+    os.makedirs(directory, exist_ok=True)
+    for i in range(count):
+        ext = 'wav' if i % 2 == 0 else 'mp3'
+        path = os.path.join(directory, f"probka_{i:03d}.{ext}")
+        if os.path.exists(path):
+            continue
+        subprocess.run([FFMPEG, '-hide_banner', '-loglevel', 'error', '-nostdin', '-y',
+                        '-f', 'lavfi', '-i', f"sine=frequency={220 + 20 * i}:duration={seconds}",
+                        '-ac', '2', path], check=True)
+
+def measure(directory: str, mode: str, serve_http: bool, metadata_workers: int, download_workers: int,
+            encode_workers: int) -> dict:
+    options = MODES[mode]
+    source = LocalSource(directory, serve_http)
+    urls = source.urls()
+    input_bytes = sum(os.path.getsize(os.path.join(source.directory, name)) for name in urls)
+    workdir = tempfile.mkdtemp(prefix="muzyka_bench_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        os.makedirs(TEMP_DIR, exist_ok=True)
+        manifest = Manifest()
+        before = os.times()
+        if options['parallel']:
+            summary = run_pipeline(urls, manifest, metadata_workers, download_workers, encode_workers,
+                                   stream=options['stream'], source=source)
+        else:
+            summary = run_sequential(urls, manifest, stream=options['stream'], source=source)
+        after = os.times()
+    finally:
+        os.chdir(cwd)
+        source.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_summary(summary)
+    wall = summary['czas']
+    main_cpu = (after.user - before.user) + (after.system - before.system)
+    child_cpu = (after.children_user - before.children_user) + (after.children_system - before.children_system)
+    capacity = wall * (os.cpu_count() or 1)
+    return {
+        'pliki': summary['zapisane'],
+        'błędy': summary['błędy'],
+        'czas_s': wall,
+        'pliki_na_min': summary['zapisane'] * 60 / wall if wall else 0.0,
+        'mb_na_s': input_bytes / 1e6 / wall if wall else 0.0,
+        'cpu_glowny_s': main_cpu,
+        'cpu_potomne_s': child_cpu,
+        'wykorzystanie_cpu_glowny': main_cpu / capacity if capacity else 0.0,
+        'wykorzystanie_cpu_potomne': child_cpu / capacity if capacity else 0.0,
+        'etapy_s': summary['etapy'],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Pomiar przepustowości muzyka.py na lokalnych plikach audio.")
+    parser.add_argument('katalog', help="katalog z próbkami audio")
+    parser.add_argument('--generuj', type=int, default=0, help="najpierw wygeneruj tyle próbek (ffmpeg, sinus)")
+    parser.add_argument('--dlugosc', type=int, default=60, help="długość generowanej próbki w sekundach")
+    parser.add_argument('--http', action='store_true', help="pliki przez lokalny serwer HTTP zamiast z dysku")
+    parser.add_argument('--tryby', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--metadane', type=int, default=4)
+    parser.add_argument('--pobieranie', type=int, default=4)
+    parser.add_argument('--konwersja', type=int, default=None)
+    parser.add_argument('--json', help="zapisz wyniki do pliku JSON")
+    args = parser.parse_args()
+
+    if shutil.which(FFMPEG) is None:
+        print(f"Brak programu {FFMPEG} w PATH")
+        return
+    if args.generuj:
+        generate_samples(args.katalog, args.generuj, args.dlugosc)
+
+    results = {}
+    for mode in args.tryby:
+        print(f"\n=== {mode} ===")
+        results[mode] = measure(args.katalog, mode, args.http, args.metadane, args.pobieranie, args.konwersja)
+
+    print(f"\n{'tryb':<16}{'pliki/min':>12}{'MB/s':>10}{'CPU główny':>12}{'CPU ffmpeg':>12}")
+    for mode, result in results.items():
+        print(f"{mode:<16}{result['pliki_na_min']:>12.1f}{result['mb_na_s']:>10.2f}"
+              f"{result['wykorzystanie_cpu_glowny']:>12.0%}{result['wykorzystanie_cpu_potomne']:>12.0%}")
+
+    if args.json:
+        report = {
+            'meta': {
+                'czas': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': sys.version.split()[0],
+                'platforma': platform.platform(),
+                'rdzenie': os.cpu_count(),
+                'http': args.http,
+            },
+            'wyniki': results,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,7 +1,28 @@
+import argparse
+import functools
+import hashlib
+import json
 import os
 import re
-from pydub import AudioSegment
-from yt_dlp import YoutubeDL
+import shutil
+import subprocess
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import get_context
+
+MANIFEST_PATH = "muzyka_manifest.json"
+# Stałe nazwy plików tymczasowych (po kluczu utworu) pozwalają yt-dlp wznowić
+# przerwane pobieranie z pliku .part przy następnym uruchomieniu
+TEMP_DIR = ".muzyka_tmp"
+FFMPEG = "ffmpeg"
+# Jakość VBR dla libmp3lame (0 = najlepsza, 9 = najmniejszy plik); 2 to ok. 190 kbps
+MP3_QUALITY = "2"
+
+_VIDEO_ID = re.compile(r'(?:[?&]v=|youtu\.be/|/shorts/|/embed/)([0-9A-Za-z_-]{11})')
 
 def sanitize_filename(s: str) -> str:
     """
@@ -10,63 +31,485 @@ def sanitize_filename(s: str) -> str:
     """
     return re.sub(r'[^0-9A-Za-z\.\-_]', '_', s)
 
-def download_and_convert_to_mp3(url: str, output_name: str):
-    print(f"Pobieranie: {url}")
-    
-   
-    temp_path = "temp_audio"
-    
-    # Konfiguracja yt-dlp
-    ydl_opts = {
-        'format': 'bestaudio/best',
-        'outtmpl': temp_path,
-        'quiet': False,
-        'no_warnings': False,
-    }
-    
+def job_key(url: str) -> str:
+    """ID filmu z URL-a YouTube; dla innych adresów skrót URL-a."""
+    match = _VIDEO_ID.search(url)
+    if match:
+        return match.group(1)
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+
+def file_checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class Manifest:
+    """
+    Rejestr utworów: klucz (ID filmu) -> URL, tytuł, plik wyjściowy, rozmiar i SHA-256.
+    Zapisywany atomowo po każdej zmianie, więc przerwany przebieg można wznowić.
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Nie można odczytać manifestu {path} ({e}), zaczynam od nowa")
+        self.outputs = {entry['output']: key for key, entry in self.entries.items() if 'output' in entry}
+
+    def title(self, key: str):
+        return self.entries.get(key, {}).get('title')
+
+    def is_done(self, key: str, verify: bool = False) -> bool:
+        entry = self.entries.get(key)
+        if not entry or 'sha256' not in entry:
+            return False
+        try:
+            if os.path.getsize(entry['output']) != entry['size']:
+                return False
+        except OSError:
+            return False
+        return not verify or file_checksum(entry['output']) == entry['sha256']
+
+    def output_for(self, key: str, title: str) -> str:
+        """Nazwa pliku MP3; gdy inny utwór ma już taki tytuł, dokleja klucz."""
+        with self.lock:
+            output = self.entries.get(key, {}).get('output')
+            if output is None:
+                output = f"{sanitize_filename(title)}.mp3"
+                if self.outputs.get(output, key) != key:
+                    output = f"{sanitize_filename(title)}_{key}.mp3"
+                self.outputs[output] = key
+            return output
+
+    def update(self, key: str, **fields):
+        with self.lock:
+            self.entries.setdefault(key, {}).update(fields)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+
+    def mark_done(self, key: str, output: str, checksum: str = None):
+        self.update(key, size=os.path.getsize(output), sha256=checksum or file_checksum(output))
+
+def is_mp3(info: dict) -> bool:
+    """Czy wybrany format ma już dźwięk MP3 (wtedy wystarczy remux bez ponownego kodowania)."""
+    return info.get('acodec') == 'mp3' or info.get('ext') == 'mp3'
+
+class YoutubeSource:
+    """
+    Źródło oparte na yt-dlp. Każde źródło udostępnia te same trzy metody:
+
+    - info(url) -> metadane z co najmniej 'title',
+    - download(url, temp_path, quiet, info) -> metadane pobranego formatu
+      ('acodec'/'ext' decydują o remuksie),
+    - stream(url, info) -> metadane z 'url' (i ewentualnie 'http_headers')
+      do odczytu przez ffmpeg albo None.
+
+    yt-dlp jest importowany dopiero przy pierwszym użyciu, więc tryb offline
+    (LocalSource, benchmark.py) działa bez niego.
+    """
+
+    @staticmethod
+    def _youtube_dl(options: dict):
+        from yt_dlp import YoutubeDL
+        return YoutubeDL(options)
+
+    def info(self, url: str) -> dict:
+        """
+        Pobiera tylko metadane filmu (bez wyboru formatu). Wynik można przekazać
+        do download, żeby nie pytać serwisu drugi raz.
+        """
+        with self._youtube_dl({'quiet': True}) as ydl:
+            return ydl.extract_info(url, download=False, process=False)
+
+    def download(self, url: str, temp_path: str, quiet: bool = False, info: dict = None) -> dict:
+        """Pobiera audio do temp_path; zwraca metadane wybranego formatu."""
+        # Konfiguracja yt-dlp
+        ydl_opts = {
+            'format': 'bestaudio/best',
+            'outtmpl': temp_path,
+            'quiet': quiet,
+            'no_warnings': quiet,
+            'noprogress': quiet,
+            'continuedl': True,
+        }
+        with self._youtube_dl(ydl_opts) as ydl:
+            if info is None:
+                return ydl.extract_info(url, download=True)
+            return ydl.process_ie_result(info, download=True)
+
+    def stream(self, url: str, info: dict = None):
+        """
+        Wybiera format bez pobierania. Zwraca metadane formatu z 'url', który ffmpeg
+        może czytać bezpośrednio, albo None (np. dla fragmentów DASH).
+        """
+        with self._youtube_dl({'format': 'bestaudio/best', 'quiet': True}) as ydl:
+            if info is None:
+                selected = ydl.extract_info(url, download=False)
+            else:
+                selected = ydl.process_ie_result(info, download=False)
+        if 'url' not in selected or selected.get('protocol') not in ('http', 'https', 'm3u8', 'm3u8_native'):
+            return None
+        return selected
+
+    def close(self):
+        pass
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+class LocalSource:
+    """
+    Zastępuje YouTube plikami audio z katalogu, do testów i pomiarów offline.
+    "URL-e" to nazwy plików z katalogu. Przy serve_http=True pliki są udostępniane
+    przez lokalny serwer HTTP na 127.0.0.1, więc pobieranie i strumień idą przez
+    sieć jak w prawdziwym źródle.
+    """
+
+    def __init__(self, directory: str, serve_http: bool = False):
+        self.directory = os.path.abspath(directory)
+        self.server = None
+        if serve_http:
+            handler = functools.partial(_QuietHandler, directory=self.directory)
+            self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def urls(self):
+        return sorted(name for name in os.listdir(self.directory)
+                      if os.path.isfile(os.path.join(self.directory, name)))
+
+    def _location(self, name: str) -> str:
+        if self.server is not None:
+            return f"http://127.0.0.1:{self.server.server_port}/{urllib.parse.quote(name)}"
+        return os.path.join(self.directory, name)
+
+    def info(self, url: str) -> dict:
+        name = os.path.basename(url)
+        title, ext = os.path.splitext(name)
+        return {'title': title, 'ext': ext.lstrip('.').lower(), 'url': self._location(name)}
+
+    def download(self, url: str, temp_path: str, quiet: bool = False, info: dict = None) -> dict:
+        info = info or self.info(url)
+        if self.server is not None:
+            source = urllib.request.urlopen(info['url'])
+        else:
+            source = open(info['url'], 'rb')
+        with source, open(temp_path, 'wb') as target:
+            shutil.copyfileobj(source, target, 1 << 20)
+        return info
+
+    def stream(self, url: str, info: dict = None):
+        return info or self.info(url)
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+YOUTUBE = YoutubeSource()
+
+def run_ffmpeg(source: str, output_name: str, copy: bool = False, headers: dict = None):
+    """
+    Koduje (albo przy copy=True tylko przepakowuje) dźwięk ze źródła do MP3.
+    ffmpeg przetwarza dane kawałkami, więc zużycie pamięci nie zależy od długości
+    utworu. Wynik trafia najpierw do pliku .part, więc istniejący MP3 jest kompletny.
+    """
+    part_path = output_name + ".part"
+    command = [FFMPEG, '-hide_banner', '-loglevel', 'error', '-nostdin', '-y']
+    if headers:
+        command += ['-headers', ''.join(f"{name}: {value}\r\n" for name, value in headers.items())]
+    command += ['-i', source, '-vn']
+    command += ['-c:a', 'copy'] if copy else ['-c:a', 'libmp3lame', '-q:a', MP3_QUALITY]
+    command += ['-f', 'mp3', part_path]
+    try:
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg zakończył się kodem {result.returncode}: "
+                               f"{result.stderr.decode(errors='replace').strip()}")
+        os.replace(part_path, output_name)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+def convert_to_mp3(temp_path: str, output_name: str, copy: bool = False) -> float:
+    """
+    Konwertuje pobrany plik do MP3 i usuwa plik tymczasowy.
+    Funkcja na poziomie modułu, żeby dało się ją wysłać do puli procesów.
+    Zwraca czas konwersji w sekundach.
+    """
+    start = time.perf_counter()
     try:
-        with YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
-        
-        # Konwersja do MP3
-        audio = AudioSegment.from_file(temp_path)
-        audio.export(output_name, format="mp3")
-        
-        # Usunięcie pliku tymczasowego
+        run_ffmpeg(temp_path, output_name, copy)
+    finally:
         if os.path.exists(temp_path):
             os.remove(temp_path)
+    return time.perf_counter() - start
+
+def encode_job(temp_path: str, output_name: str, copy: bool = False):
+    """Konwersja w procesie roboczym; zwraca (czas, SHA-256 pliku MP3)."""
+    seconds = convert_to_mp3(temp_path, output_name, copy)
+    return seconds, file_checksum(output_name)
+
+def stream_to_mp3(url: str, output_name: str, info: dict = None, source=YOUTUBE):
+    """
+    Konwersja bez pliku tymczasowego: źródło tylko wybiera format, a ffmpeg
+    czyta strumień prosto z serwera i od razu go koduje. Zwraca czasy etapów
+    albo None, gdy formatu nie da się odczytać bezpośrednio (np. DASH).
+    """
+    start = time.perf_counter()
+    selected = source.stream(url, info)
+    chosen = time.perf_counter()
+    if selected is None:
+        return None
+    run_ffmpeg(selected['url'], output_name, is_mp3(selected), selected.get('http_headers'))
+    return {'wybór formatu': chosen - start, 'strumień': time.perf_counter() - chosen}
+
+def download_and_convert_to_mp3(url: str, output_name: str, temp_path: str = "temp_audio", info: dict = None,
+                                stream: bool = False, source=YOUTUBE) -> dict:
+    """Zwraca czasy poszczególnych etapów w sekundach."""
+    print(f"Pobieranie: {url}")
+    
+    try:
+        timings = stream_to_mp3(url, output_name, info, source) if stream else None
+        if timings is None:
+            start = time.perf_counter()
+            selected = source.download(url, temp_path, info=info)
+            timings = {'pobieranie': time.perf_counter() - start}
             
-        print(f"Zapisano jako: {output_name}\n")
+            # Konwersja do MP3 (usuwa też plik tymczasowy)
+            timings['konwersja'] = convert_to_mp3(temp_path, output_name, is_mp3(selected))
+            
+        print(f"Zapisano jako: {output_name} ({format_timings(timings)})\n")
+        return timings
     except Exception as e:
         print(f"✖ Błąd przy przetwarzaniu {url}: {e}")
         if os.path.exists(temp_path):
             os.remove(temp_path)
         raise
 
-def main():
+def format_timings(timings: dict) -> str:
+    return ", ".join(f"{stage}: {seconds:.1f} s" for stage, seconds in timings.items())
 
-    lista_path = "DoPobrania.txt"
-    if not os.path.exists(lista_path):
-        print(f"Brak pliku {lista_path}")
-        return
-    
+def read_urls(lista_path: str):
     with open(lista_path, "r", encoding="utf-8") as f:
-        urls = [line.strip() for line in f if line.strip()]
-    
+        return [line.strip() for line in f if line.strip()]
+
+def pending_jobs(urls, manifest: Manifest, verify: bool = False):
+    """Pomija duplikaty i utwory już zapisane według manifestu. Zwraca (zadania, liczba pominiętych)."""
+    jobs, skipped, seen = [], 0, set()
     for url in urls:
+        key = job_key(url)
+        if key in seen:
+            continue
+        seen.add(key)
+        if manifest.is_done(key, verify):
+            skipped += 1
+        else:
+            jobs.append((key, url))
+    return jobs, skipped
+
+def resolve_job(key: str, url: str, manifest: Manifest, source=YOUTUBE):
+    """
+    Ustala plik wyjściowy. Metadane pobiera tylko wtedy, gdy tytułu nie ma
+    w manifeście; zwraca (info albo None, plik wyjściowy).
+    """
+    info = None
+    title = manifest.title(key)
+    if title is None:
+        info = source.info(url)
+        title = info.get('title', url)
+    output_file = manifest.output_for(key, title)
+    manifest.update(key, url=url, title=title, output=output_file)
+    return info, output_file
+
+def run_sequential(urls, manifest: Manifest, verify: bool = False, stream: bool = False, source=YOUTUBE):
+    """Przetwarza utwory po kolei; zwraca podsumowanie jak run_pipeline."""
+    start = time.perf_counter()
+    stage_times = {}
+    done = failed = 0
+    jobs, skipped = pending_jobs(urls, manifest, verify)
+    if skipped:
+        print(f"Pominięto {skipped} już zapisanych utworów\n")
+    for key, url in jobs:
         try:
-            # Pobierz tytuł filmu jako podstawę nazwy pliku
-            with YoutubeDL({'quiet': True}) as ydl:
-                info = ydl.extract_info(url, download=False)
-                title = info.get('title', url)
+            # Tytuł filmu (z manifestu albo z metadanych) jest podstawą nazwy pliku
+            t0 = time.perf_counter()
+            info, output_file = resolve_job(key, url, manifest, source)
+            stage_times['metadane'] = stage_times.get('metadane', 0.0) + time.perf_counter() - t0
+            if os.path.exists(output_file):
+                manifest.mark_done(key, output_file)
+                print(f"Plik już istnieje: {output_file}\n")
+                skipped += 1
+                continue
             
-            # Utwórz bezpieczną nazwę pliku z tytułu
-            base_name = sanitize_filename(title)
-            output_file = f"{base_name}.mp3"
-            
-            download_and_convert_to_mp3(url, output_file)
+            timings = download_and_convert_to_mp3(url, output_file, os.path.join(TEMP_DIR, key), info, stream,
+                                                  source)
+            for stage, seconds in timings.items():
+                stage_times[stage] = stage_times.get(stage, 0.0) + seconds
+            manifest.mark_done(key, output_file)
+            done += 1
         except Exception as e:
+            failed += 1
             print(f"ERROR! - Błąd przy przetwarzaniu {url}: {e}\n")
+    return {
+        'zapisane': done,
+        'pominięte': skipped,
+        'błędy': failed,
+        'czas': time.perf_counter() - start,
+        'etapy': stage_times,
+    }
+
+def run_pipeline(urls, manifest: Manifest, metadata_workers=4, download_workers=4, encode_workers=None,
+                 verify=False, stream=False, source=YOUTUBE):
+    """
+    Tryb potokowy: metadane i pobieranie działają w puli wątków (I/O),
+    a konwersja do MP3 w puli procesów (CPU). Każdy etap ma własny limit
+    równoczesnych zadań. Pula procesów używa ``spawn`` - fork procesu, w którym
+    działają już wątki (i serwer HTTP w trybie offline), mógłby zakleszczyć
+    potomka na blokadzie trzymanej przez inny wątek. Przy stream=True ffmpeg koduje strumień od razu
+    w wątku pobierającym (bez pliku tymczasowego i bez puli procesów).
+    Zwraca słownik z podsumowaniem.
+    """
+    metadata_slots = threading.Semaphore(metadata_workers)
+    download_slots = threading.Semaphore(download_workers)
+    stage_times = {'metadane': 0.0, 'wybór formatu': 0.0, 'strumień': 0.0, 'pobieranie': 0.0, 'konwersja': 0.0}
+    times_lock = threading.Lock()
+    start = time.perf_counter()
+    jobs, skipped = pending_jobs(urls, manifest, verify)
+
+    def add_time(stage, seconds):
+        with times_lock:
+            stage_times[stage] += seconds
+
+    def fetch_and_download(key, url):
+        t0 = time.perf_counter()
+        with metadata_slots:
+            info, output_file = resolve_job(key, url, manifest, source)
+        t1 = time.perf_counter()
+        add_time('metadane', t1 - t0)
+        if os.path.exists(output_file):
+            manifest.mark_done(key, output_file)
+            return 'pominięty', output_file, None
+        if stream:
+            with download_slots:
+                timings = stream_to_mp3(url, output_file, info, source)
+            if timings is not None:
+                for stage, seconds in timings.items():
+                    add_time(stage, seconds)
+                return 'zapisany', output_file, None
+            t1 = time.perf_counter()
+        # Każde zadanie ma własny plik tymczasowy, więc zadania się nie nadpisują
+        temp_path = os.path.join(TEMP_DIR, key)
+        with download_slots:
+            selected = source.download(url, temp_path, quiet=True, info=info)
+        add_time('pobieranie', time.perf_counter() - t1)
+        return 'pobrany', output_file, (temp_path, is_mp3(selected))
+
+    done = failed = 0
+    with ThreadPoolExecutor(max_workers=metadata_workers + download_workers) as io_pool, \
+            ProcessPoolExecutor(max_workers=encode_workers,
+                                mp_context=get_context('spawn')) as cpu_pool:
+        downloads = {io_pool.submit(fetch_and_download, key, url): (key, url) for key, url in jobs}
+        encodes = {}
+        for future in as_completed(downloads):
+            key, url = downloads[future]
+            try:
+                status, output_file, download = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"ERROR! - Błąd przy przetwarzaniu {url}: {e}")
+                continue
+            if status == 'pominięty':
+                skipped += 1
+            elif status == 'zapisany':
+                manifest.mark_done(key, output_file)
+                done += 1
+                print(f"[{done + failed}/{len(jobs)}] Zapisano jako: {output_file}")
+            else:
+                temp_path, copy = download
+                encodes[cpu_pool.submit(encode_job, temp_path, output_file, copy)] = (key, url, output_file)
+        for future in as_completed(encodes):
+            key, url, output_file = encodes[future]
+            try:
+                seconds, checksum = future.result()
+                add_time('konwersja', seconds)
+                manifest.mark_done(key, output_file, checksum)
+                done += 1
+                print(f"[{done + failed}/{len(jobs)}] Zapisano jako: {output_file}")
+            except Exception as e:
+                failed += 1
+                print(f"ERROR! - Błąd przy konwersji {url}: {e}")
+
+    return {
+        'zapisane': done,
+        'pominięte': skipped,
+        'błędy': failed,
+        'czas': time.perf_counter() - start,
+        'etapy': stage_times,
+    }
+
+def print_summary(summary):
+    print(f"\nZapisane: {summary['zapisane']}, pominięte: {summary['pominięte']}, "
+          f"błędy: {summary['błędy']}, czas: {summary['czas']:.1f} s")
+    # Suma czasów zadań w etapie; przy równoległości może przekraczać czas całkowity
+    for stage, seconds in summary['etapy'].items():
+        if seconds:
+            print(f"  {stage:<14} {seconds:8.1f} s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Pobiera audio z listy URL-i i zapisuje jako MP3.")
+    parser.add_argument('--lista', default="DoPobrania.txt", help="plik z URL-ami (jeden w linii)")
+    parser.add_argument('--manifest', default=MANIFEST_PATH, help="rejestr już pobranych utworów")
+    parser.add_argument('--weryfikuj', action='store_true',
+                        help="przed pominięciem utworu sprawdza sumę SHA-256 pliku MP3")
+    parser.add_argument('--strumien', action='store_true',
+                        help="koduje strumień od razu, bez pliku tymczasowego (gdy format na to pozwala)")
+    parser.add_argument('--rownolegle', action='store_true', help="tryb potokowy (wątki + procesy)")
+    parser.add_argument('--metadane', type=int, default=4, help="limit równoczesnych zapytań o metadane")
+    parser.add_argument('--pobieranie', type=int, default=4, help="limit równoczesnych pobrań")
+    parser.add_argument('--konwersja', type=int, default=None,
+                        help="liczba procesów konwertujących (domyślnie liczba rdzeni)")
+    parser.add_argument('--katalog', help="tryb offline: pliki audio z tego katalogu zamiast YouTube "
+                                          "(lista URL-i jest wtedy pomijana)")
+    parser.add_argument('--http', action='store_true',
+                        help="w trybie offline udostępnia katalog przez lokalny serwer HTTP")
+    args = parser.parse_args()
+
+    if shutil.which(FFMPEG) is None:
+        print(f"Brak programu {FFMPEG} w PATH")
+        return
+    
+    if args.katalog:
+        source = LocalSource(args.katalog, args.http)
+        urls = source.urls()
+    else:
+        lista_path = args.lista
+        if not os.path.exists(lista_path):
+            print(f"Brak pliku {lista_path}")
+            return
+        source = YOUTUBE
+        urls = read_urls(lista_path)
+    manifest = Manifest(args.manifest)
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    
+    try:
+        if args.rownolegle:
+            summary = run_pipeline(urls, manifest, args.metadane, args.pobieranie, args.konwersja,
+                                   args.weryfikuj, args.strumien, source)
+        else:
+            summary = run_sequential(urls, manifest, args.weryfikuj, args.strumien, source)
+    finally:
+        source.close()
+    print_summary(summary)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
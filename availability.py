@@ -0,0 +1,119 @@
+"""
+Indeks dostępności pokoi w pamięci.
+
+Dla każdego pokoju trzymamy dwie posortowane listy: daty zameldowania i daty
+wymeldowania (jako ordinale). Liczba rezerwacji nachodzących na przedział
+[d1, d2) to:
+
+    #(CheckInDate < d2) - #(CheckOutDate <= d1)
+
+bo każda rezerwacja kończąca się przed d1 zaczęła się też przed d2. Dwa
+wyszukiwania binarne na pokój, więc zapytanie o wolne pokoje dla danego miasta
+i liczby łóżek nie zależy od tego, ile rezerwacji jest w bazie.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+
+
+def _ordinal(value):
+    if isinstance(value, date):
+        return value.toordinal()
+    return date.fromisoformat(str(value)).toordinal()
+
+
+class RoomAvailabilityIndex:
+    def __init__(self):
+        self.rooms = {}            # room_id -> (room_number, price)
+        self.buckets = {}          # (city, bed_count) -> [room_id, ...]
+        self.starts = {}           # room_id -> posortowane CheckInDate
+        self.ends = {}             # room_id -> posortowane CheckOutDate
+        self.reservations = {}     # reservation_id -> (room_id, start, end)
+        self.loaded = False
+
+    def load(self, cursor):
+        """
+        Wczytuje pokoje i wszystkie rezerwacje jednym przebiegiem.
+
+        Podmiana kilku atrybutów nie jest atomowa - indeksu, z którego ktoś
+        właśnie czyta, nie przeładowuje się w innym wątku. W tle buduje się
+        nowy obiekt (``from_cursor``) i podmienia referencję w wątku GUI.
+        """
+        rooms, buckets, starts, ends, reservations = {}, {}, {}, {}, {}
+
+        cursor.execute("""
+            SELECT r.ID, r.RoomNumber, r.Price, r.BedCount, b.City
+            FROM Room r
+            JOIN Building b ON r.BuildingID = b.ID
+            ORDER BY r.RoomNumber
+        """)
+        for room_id, room_number, price, bed_count, city in cursor.fetchall():
+            rooms[room_id] = (room_number, price)
+            buckets.setdefault((city, bed_count), []).append(room_id)
+            starts[room_id] = []
+            ends[room_id] = []
+
+        cursor.execute("SELECT ID, RoomID, CheckInDate, CheckOutDate FROM Reservation")
+        rows = cursor.fetchall()
+        for reservation_id, room_id, check_in, check_out in rows:
+            start, end = _ordinal(check_in), _ordinal(check_out)
+            reservations[reservation_id] = (room_id, start, end)
+            starts.setdefault(room_id, []).append(start)
+            ends.setdefault(room_id, []).append(end)
+        # Jedno sortowanie na pokój zamiast insort dla każdego wiersza
+        for room_id in starts:
+            starts[room_id].sort()
+            ends[room_id].sort()
+
+        self.rooms, self.buckets, self.starts, self.ends = rooms, buckets, starts, ends
+        self.reservations = reservations
+        self.loaded = True
+
+    @classmethod
+    def from_cursor(cls, cursor):
+        index = cls()
+        index.load(cursor)
+        return index
+
+    def add_reservation(self, reservation_id, room_id, check_in, check_out):
+        start, end = _ordinal(check_in), _ordinal(check_out)
+        if reservation_id in self.reservations:
+            self.remove_reservation(reservation_id)
+        self.reservations[reservation_id] = (room_id, start, end)
+        insort(self.starts.setdefault(room_id, []), start)
+        insort(self.ends.setdefault(room_id, []), end)
+
+    def remove_reservation(self, reservation_id):
+        entry = self.reservations.pop(reservation_id, None)
+        if entry is None:
+            return
+        room_id, start, end = entry
+        starts = self.starts[room_id]
+        del starts[bisect_left(starts, start)]
+        ends = self.ends[room_id]
+        del ends[bisect_left(ends, end)]
+
+    def move_reservation(self, reservation_id, check_in, check_out):
+        entry = self.reservations.get(reservation_id)
+        if entry is None:
+            return
+        self.add_reservation(reservation_id, entry[0], check_in, check_out)
+
+    def overlapping(self, room_id, check_in, check_out):
+        start, end = _ordinal(check_in), _ordinal(check_out)
+        starts = self.starts.get(room_id, ())
+        ends = self.ends.get(room_id, ())
+        return bisect_left(starts, end) - bisect_right(ends, start)
+
+    def is_free(self, room_id, check_in, check_out):
+        return self.overlapping(room_id, check_in, check_out) == 0
+
+    def free_rooms(self, city, bed_count, check_in, check_out):
+        """Zwraca [(RoomNumber, Price), ...] pokoi wolnych w całym przedziale."""
+        start, end = _ordinal(check_in), _ordinal(check_out)
+        free = []
+        for room_id in self.buckets.get((city, bed_count), ()):
+            starts = self.starts[room_id]
+            if not starts or bisect_left(starts, end) - bisect_right(self.ends[room_id], start) == 0:
+                free.append(self.rooms[room_id])
+        return free
@@ -1,41 +1,315 @@
+import argparse
+import queue
+import threading
+import time
+
 import cv2
+import numpy as np
+
+CASCADE_PATH = 'haarcascade_frontalface_default.xml'
+WINDOW_NAME = 'Face Detection with Blur'
+
 
-# Załadowanie Haar Cascade
-face_cascade = cv2.CascadeClassifier('haarcascade_frontalface_default.xml')
-if face_cascade.empty():
-    print("Error: Could not load Haar cascade file.")
-    exit()
-
-# Odpalenie kamerki
-cap = cv2.VideoCapture(0)
-if not cap.isOpened():
-    print("Error: Could not open webcam.")
-    exit()
-
-while True:
-    # Przechwyć frame po framie
-    ret, frame = cap.read()
-    if not ret:
-        print("Error: Failed to capture frame.")
-        break
-    
+def load_cascade():
+    face_cascade = cv2.CascadeClassifier(CASCADE_PATH)
+    if face_cascade.empty():
+        print("Error: Could not load Haar cascade file.")
+        exit()
+    return face_cascade
+
+
+def detect_faces(face_cascade, frame):
     # Konwertuj na odcienie szarości
     gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    
+
     # Wykrywanie twarzy
-    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=4)
-    
+    return face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=4)
+
+
+def blur_faces(frame, faces):
     # Blur dla każdej wykrytej twarzy
     for (x, y, w, h) in faces:
         face_region = frame[y:y+h, x:x+w]  # Wybierz region twarzy
         blurred_face = cv2.GaussianBlur(face_region, (51, 51), 30)  # Gaussian blur
         frame[y:y+h, x:x+w] = blurred_face  # Podmień na zblurrowaną twarz
 
-    cv2.imshow('Face Detection with Blur', frame)
-    
+
+class FaceTracker:
+    """
+    Kaskada uruchamiana co ``detect_every`` klatek na klatce pomniejszonej
+    ``scale`` razy; pomiędzy detekcjami ramki są przesuwane przepływem optycznym
+    (Lucas-Kanade) punktów charakterystycznych z ich wnętrza. Detekcja jest też
+    wymuszana, gdy w którejś ramce zostanie mniej niż ``min_points`` punktów.
+    """
+
+    def __init__(self, face_cascade, detect_every=5, scale=0.5, min_points=0.5):
+        self.face_cascade = face_cascade
+        self.detect_every = detect_every
+        self.scale = scale
+        self.min_points = min_points
+        self.prev_gray = None
+        self.boxes = []         # (x, y, w, h) w pełnej rozdzielczości
+        self.points = []        # punkty śledzone w każdej ramce
+        self.initial = []       # liczba punktów zaraz po detekcji
+        self.since_detect = 0
+
+    def _features(self, gray, box):
+        x, y, w, h = (int(v) for v in box)
+        mask = np.zeros_like(gray)
+        mask[max(y, 0):y+h, max(x, 0):x+w] = 255
+        return cv2.goodFeaturesToTrack(gray, maxCorners=30, qualityLevel=0.01, minDistance=3, mask=mask)
+
+    def _detect(self, gray):
+        small = gray
+        if self.scale != 1:
+            small = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        faces = self.face_cascade.detectMultiScale(small, scaleFactor=1.1, minNeighbors=4)
+        # Ramki z pomniejszonej klatki z powrotem w pełnej rozdzielczości
+        self.boxes = [tuple(v / self.scale for v in face) for face in faces]
+        self.points = [self._features(gray, box) for box in self.boxes]
+        self.initial = [0 if points is None else len(points) for points in self.points]
+        self.since_detect = 0
+
+    def _track(self, gray):
+        """Przesuwa ramki; False, gdy śledzenie straciło pewność."""
+        boxes, points = [], []
+        for box, old, initial in zip(self.boxes, self.points, self.initial):
+            if old is None or len(old) < 3:
+                return False
+            new, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, old, None, winSize=(15, 15), maxLevel=2)
+            good = status.ravel() == 1
+            if good.sum() < max(3, self.min_points * initial):
+                return False
+            dx, dy = np.median(new[good].reshape(-1, 2) - old[good].reshape(-1, 2), axis=0)
+            x, y, w, h = box
+            boxes.append((x + dx, y + dy, w, h))
+            points.append(new[good].reshape(-1, 1, 2))
+        self.boxes, self.points = boxes, points
+        return True
+
+    def update(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        self.since_detect += 1
+        if self.prev_gray is None or self.since_detect >= self.detect_every or not self._track(gray):
+            self._detect(gray)
+        self.prev_gray = gray
+
+        height, width = gray.shape
+        faces = []
+        for x, y, w, h in self.boxes:
+            x0, y0 = max(int(x), 0), max(int(y), 0)
+            x1, y1 = min(int(x + w), width), min(int(y + h), height)
+            if x1 > x0 and y1 > y0:
+                faces.append((x0, y0, x1 - x0, y1 - y0))
+        return faces
+
+
+def make_locator(detect_every=1, scale=1.0):
+    """Funkcja frame -> ramki twarzy: sama kaskada albo kaskada ze śledzeniem."""
+    face_cascade = load_cascade()
+    if detect_every > 1 or scale != 1:
+        return FaceTracker(face_cascade, detect_every, scale).update
+    return lambda frame: detect_faces(face_cascade, frame)
+
+
+class FrameStats:
+    """FPS (średnia krocząca) i opóźnienie od przechwycenia do wyświetlenia."""
+
+    def __init__(self, smoothing=0.9):
+        self.smoothing = smoothing
+        self.fps = 0.0
+        self.latency_ms = 0.0
+        self.last = None
+
+    def shown(self, captured_at):
+        now = time.perf_counter()
+        if self.last is not None and now > self.last:
+            self.fps = self.smoothing * self.fps + (1 - self.smoothing) / (now - self.last)
+        self.last = now
+        self.latency_ms = self.smoothing * self.latency_ms + (1 - self.smoothing) * (now - captured_at) * 1000
+
+    def draw(self, frame, dropped=None):
+        text = f"FPS: {self.fps:.1f}  latency: {self.latency_ms:.0f} ms"
+        if dropped is not None:
+            text += f"  dropped: {dropped}"
+        cv2.putText(frame, text, (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+
+
+def show(frame, window=WINDOW_NAME):
+    cv2.imshow(window, frame)
+
     # 'q' przerywa działanie programu
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+    return cv2.waitKey(1) & 0xFF == ord('q')
+
+
+def run_serial(caps, locators):
+    """Obsługuje kolejno wszystkie strumienie, każdy we własnym oknie."""
+    streams = []
+    for i, (cap, locate) in enumerate(zip(caps, locators)):
+        window = WINDOW_NAME if len(caps) == 1 else f"{WINDOW_NAME} [{i}]"
+        streams.append((cap, locate, FrameStats(), window))
+    while True:
+        for cap, locate, stats, window in streams:
+            # Przechwyć frame po framie
+            ret, frame = cap.read()
+            captured_at = time.perf_counter()
+            if not ret:
+                print("Error: Failed to capture frame.")
+                return
+
+            blur_faces(frame, locate(frame))
+            stats.shown(captured_at)
+            stats.draw(frame)
+            if show(frame, window):
+                return
+
+
+class LatestFrame:
+    """
+    Jednoelementowy bufor: wątek przechwytujący nadpisuje starą klatkę, więc
+    detektory zawsze dostają najnowszą, a w buforze kamery nic się nie kolejkuje.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.frame = None
+        self.seq = 0
+        self.taken = 0
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, frame, captured_at):
+        with self.condition:
+            if self.frame is not None and self.taken < self.seq:
+                self.dropped += 1
+            self.seq += 1
+            self.frame = (self.seq, captured_at, frame)
+            self.condition.notify()
+
+    def take(self):
+        """Czeka na klatkę nowszą niż ostatnio pobrana; None po zamknięciu."""
+        with self.condition:
+            while not self.closed and self.taken >= self.seq:
+                self.condition.wait()
+            if self.taken >= self.seq:
+                return None
+            self.taken = self.seq
+            return self.frame
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+def capture_loop(cap, latest, stop):
+    while not stop.is_set():
+        ret, frame = cap.read()
+        if not ret:
+            print("Error: Failed to capture frame.")
+            break
+        latest.put(frame, time.perf_counter())
+    latest.close()
+
+
+def detect_loop(locate, latest, results):
+    while True:
+        item = latest.take()
+        if item is None:
+            break
+        seq, captured_at, frame = item
+        faces = locate(frame)
+        while True:
+            try:
+                results.put_nowait((seq, captured_at, frame, faces))
+                break
+            except queue.Full:
+                # Renderer nie nadąża: wyrzuć najstarszy wynik
+                try:
+                    results.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+def run_pipelined(cap, locators):
+    """
+    Wątek przechwytujący -> pula detektorów -> renderer (wątek główny, bo
+    okna OpenCV trzeba obsługiwać z niego). Kolejki są ograniczone, a nadmiarowe
+    klatki odrzucane, więc opóźnienie nie rośnie, gdy detekcja nie nadąża.
+    Każdy wątek detektora dostaje własny lokalizator z ``locators``.
+    """
+    latest = LatestFrame()
+    results = queue.Queue(maxsize=2 * len(locators))
+    stop = threading.Event()
+    capture = threading.Thread(target=capture_loop, args=(cap, latest, stop), daemon=True)
+    detectors = [threading.Thread(target=detect_loop, args=(locate, latest, results), daemon=True)
+                 for locate in locators]
+    for thread in [capture] + detectors:
+        thread.start()
+
+    stats = FrameStats()
+    shown_seq = 0
+    while True:
+        try:
+            item = results.get(timeout=0.1)
+        except queue.Empty:
+            # Koniec strumienia: detektory skończyły, a kolejka jest pusta
+            if latest.closed and not any(thread.is_alive() for thread in detectors):
+                break
+            continue
+        seq, captured_at, frame, faces = item
+        if seq < shown_seq:
+            # Detektory kończą w różnej kolejności; starsza klatka cofnęłaby obraz
+            continue
+        shown_seq = seq
+        blur_faces(frame, faces)
+        stats.shown(captured_at)
+        stats.draw(frame, latest.dropped)
+        if show(frame):
+            break
+
+    stop.set()
+    latest.close()
+    capture.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blur faces in a webcam or video stream.")
+    parser.add_argument('--source', nargs='+', default=['0'],
+                        help="camera indexes or paths to video files (one window per stream)")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="capture, detection and rendering in separate threads (single stream)")
+    parser.add_argument('--detectors', type=int, default=2, help="detector threads in pipeline mode")
+    parser.add_argument('--detect-every', type=int, default=1,
+                        help="run the cascade every N frames and track faces with optical flow in between")
+    parser.add_argument('--scale', type=float, default=1.0, help="downscale factor for detection, e.g. 0.5")
+    args = parser.parse_args()
+    if args.pipeline and len(args.source) > 1:
+        parser.error("--pipeline supports a single --source")
+    tracking = args.detect_every > 1
+
+    # Odpalenie kamerki
+    caps = []
+    for source in args.source:
+        cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+        if not cap.isOpened():
+            print("Error: Could not open webcam.")
+            exit()
+        caps.append(cap)
+
+    try:
+        if args.pipeline:
+            # Śledzenie potrzebuje klatek po kolei, więc wtedy jest jeden wątek detektora
+            detectors = 1 if tracking else args.detectors
+            # Osobny klasyfikator na wątek; detectMultiScale zwalnia GIL, więc wątki liczą równolegle
+            run_pipelined(caps[0], [make_locator(args.detect_every, args.scale) for _ in range(detectors)])
+        else:
+            run_serial(caps, [make_locator(args.detect_every, args.scale) for _ in caps])
+    finally:
+        for cap in caps:
+            cap.release()
+        cv2.destroyAllWindows()
+
 
-cap.release()
-cv2.destroyAllWindows()
+if __name__ == '__main__':
+    main()
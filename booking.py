@@ -0,0 +1,138 @@
+"""
+Rezerwacja pokoju jednym zapytaniem do bazy.
+
+ID pokoju pochodzi z pamięci podręcznej danych słownikowych (reference_data).
+Cała rezerwacja (sprawdzenie dostępności, gość, rezerwacja, udogodnienia,
+usługi i płatność) wykonuje się jako jeden EXECUTE BLOCK. Tekst bloku zależy
+tylko od liczby zaznaczonych udogodnień i usług, więc przygotowane zapytania
+z puli połączeń są używane ponownie. Gość z istniejącym numerem telefonu jest
+wykorzystywany zamiast wstawiania duplikatu (PhoneNumber jest UNIQUE).
+"""
+
+import time
+from collections import deque, namedtuple
+from datetime import date
+
+BookingResult = namedtuple('BookingResult', [
+    'reservation_id', 'room_id', 'guest_id', 'total_cost', 'payment_date', 'latency_ms'
+])
+
+
+def build_booking_block(amenity_count, service_count):
+    params = [
+        "guest_name VARCHAR(50) = ?",
+        "guest_last_name VARCHAR(70) = ?",
+        "phone VARCHAR(20) = ?",
+        "room_id INTEGER = ?",
+        "check_in DATE = ?",
+        "check_out DATE = ?",
+        "amenities_cost DECIMAL(10, 2) = ?",
+        "services_cost DECIMAL(10, 2) = ?",
+        "total_cost DECIMAL(10, 2) = ?",
+        "payment_date DATE = ?",
+    ]
+    inserts = []
+    for i in range(amenity_count):
+        params += [f"amenity_{i} VARCHAR(50) = ?", f"amenity_{i}_cost DECIMAL(10, 2) = ?"]
+        inserts.append(f"INSERT INTO Amenity (ReservationID, AmenityType, TotalCost) "
+                       f"VALUES (:reservation_id, :amenity_{i}, :amenity_{i}_cost);")
+    for i in range(service_count):
+        params += [f"service_{i} VARCHAR(50) = ?", f"service_{i}_cost DECIMAL(10, 2) = ?"]
+        inserts.append(f"INSERT INTO Service (ReservationID, ServiceType, TotalCost) "
+                       f"VALUES (:reservation_id, :service_{i}, :service_{i}_cost);")
+
+    param_sql = ",\n    ".join(params)
+    insert_sql = "\n    ".join(inserts)
+    return f"""
+EXECUTE BLOCK (
+    {param_sql}
+)
+RETURNS (reservation_id INTEGER, guest_id INTEGER)
+AS
+BEGIN
+    -- Pokój zajęty w tym terminie: zwracamy wiersz z pustym reservation_id
+    IF (EXISTS(SELECT 1 FROM Reservation
+               WHERE RoomID = :room_id AND CheckInDate < :check_out AND CheckOutDate > :check_in)) THEN
+    BEGIN
+        SUSPEND;
+        EXIT;
+    END
+
+    SELECT ID FROM Guest WHERE PhoneNumber = :phone INTO :guest_id;
+    IF (guest_id IS NULL) THEN
+        INSERT INTO Guest (Name, LastName, PhoneNumber)
+        VALUES (:guest_name, :guest_last_name, :phone)
+        RETURNING ID INTO :guest_id;
+
+    INSERT INTO Reservation (GuestID, RoomID, CheckInDate, CheckOutDate)
+    VALUES (:guest_id, :room_id, :check_in, :check_out)
+    RETURNING ID INTO :reservation_id;
+
+    {insert_sql}
+
+    INSERT INTO Payment (ReservationID, AmenitiesCost, ServiceCost, TotalAmount, PaymentDate)
+    VALUES (:reservation_id, :amenities_cost, :services_cost, :total_cost, :payment_date);
+
+    SUSPEND;
+END
+"""
+
+
+class BookingService:
+    def __init__(self, pool, amenity_costs, service_costs, history=100):
+        self.pool = pool
+        self.amenity_costs = amenity_costs
+        self.service_costs = service_costs
+        self.latencies = deque(maxlen=history)
+        self._blocks = {}
+
+    def _block(self, amenity_count, service_count):
+        key = (amenity_count, service_count)
+        sql = self._blocks.get(key)
+        if sql is None:
+            sql = self._blocks[key] = build_booking_block(amenity_count, service_count)
+        return sql
+
+    def book(self, guest, room_id, room_price, check_in, check_out, amenities=(), services=()):
+        """
+        Rezerwuje pokój. Zwraca BookingResult; reservation_id jest None,
+        jeśli pokój jest już zajęty w podanym terminie.
+        """
+        name, last_name, phone = guest
+        days = (check_out - check_in).days
+        amenities_cost = sum(self.amenity_costs[a] for a in amenities)
+        services_cost = sum(self.service_costs[s] for s in services)
+        total_cost = (room_price * days) + amenities_cost + services_cost
+        payment_date = date.today()
+
+        params = [name, last_name, phone, room_id, check_in, check_out,
+                  amenities_cost, services_cost, total_cost, payment_date]
+        for a in amenities:
+            params += [a, self.amenity_costs[a]]
+        for s in services:
+            params += [s, self.service_costs[s]]
+
+        start = time.perf_counter()
+        with self.pool.connection() as conn:
+            reservation_id, guest_id = conn.execute(
+                self._block(len(amenities), len(services)), params
+            ).fetchone()
+            if reservation_id is None:
+                conn.rollback()
+            else:
+                conn.commit()
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.latencies.append(latency_ms)
+
+        return BookingResult(reservation_id, room_id, guest_id, total_cost, payment_date, latency_ms)
+
+    def latency_summary(self):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return {
+            'count': len(ordered),
+            'avg_ms': sum(ordered) / len(ordered),
+            'p50_ms': ordered[len(ordered) // 2],
+            'max_ms': ordered[-1],
+        }
@@ -0,0 +1,208 @@
+"""
+Wspólna pula połączeń Firebird dla mainapp.py i raportgui.py.
+
+Każdy wątek dostaje własne połączenie na czas bloku ``with pool.connection()``
+(zagnieżdżone bloki w tym samym wątku dostają to samo połączenie). Połączenia
+są sprawdzane przed wydaniem, uszkodzone są zamykane i zastępowane nowymi,
+a przygotowane zapytania są trzymane per połączenie (najwyżej
+``STATEMENT_CACHE_SIZE`` ostatnio używanych, starsze są zwalniane).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from queue import LifoQueue, Empty
+
+from firebird.driver import connect
+
+HEALTH_CHECK_QUERY = "SELECT 1 FROM RDB$DATABASE"
+STATEMENT_CACHE_SIZE = 64
+
+
+class PoolExhausted(Exception):
+    pass
+
+
+class PooledConnection:
+    def __init__(self, conn, max_statements=STATEMENT_CACHE_SIZE):
+        self.conn = conn
+        self.max_statements = max_statements
+        self.statements = OrderedDict()
+        self.last_used = time.monotonic()
+
+    def cursor(self):
+        return self.conn.cursor()
+
+    def prepare(self, sql):
+        statement = self.statements.get(sql)
+        if statement is not None:
+            self.statements.move_to_end(sql)
+            return statement
+        statement = self.conn.cursor().prepare(sql)
+        self.statements[sql] = statement
+        while len(self.statements) > self.max_statements:
+            # Uchwyty po stronie serwera żyją do zwolnienia, a połączenie - całą sesję
+            self._free(self.statements.popitem(last=False)[1])
+        return statement
+
+    @staticmethod
+    def _free(statement):
+        try:
+            statement.free()
+        except Exception:
+            pass
+
+    def execute(self, sql, parameters=None):
+        """Wykonuje zapytanie przez przygotowane zapytanie z pamięci podręcznej."""
+        cursor = self.conn.cursor()
+        cursor.execute(self.prepare(sql), parameters)
+        return cursor
+
+    def executemany(self, sql, seq_of_parameters):
+        cursor = self.conn.cursor()
+        cursor.executemany(self.prepare(sql), seq_of_parameters)
+        return cursor
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        for statement in self.statements.values():
+            self._free(statement)
+        self.statements.clear()
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    def __init__(self, database, user, password, max_size=5, timeout=10.0,
+                 health_check_interval=30.0):
+        self.database = database
+        self.user = user
+        self.password = password
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle = LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._local = threading.local()
+        self._closed = False
+
+    def _create(self):
+        return PooledConnection(connect(database=self.database, user=self.user, password=self.password))
+
+    def _is_healthy(self, pooled):
+        if pooled.conn.is_closed():
+            return False
+        if time.monotonic() - pooled.last_used < self.health_check_interval:
+            return True
+        try:
+            cursor = pooled.conn.cursor()
+            cursor.execute(HEALTH_CHECK_QUERY)
+            cursor.fetchone()
+            pooled.conn.commit()
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        if self._closed:
+            raise PoolExhausted("Connection pool is closed")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolExhausted(f"No free database connection after {self.timeout}s")
+        try:
+            while True:
+                try:
+                    pooled = self._idle.get_nowait()
+                except Empty:
+                    return self._create()
+                if self._is_healthy(pooled):
+                    return pooled
+                # Serwer zerwał połączenie - zamknij i spróbuj następne
+                pooled.close()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, pooled, broken=False):
+        try:
+            if not broken:
+                try:
+                    # Nie zostawiaj otwartej transakcji następnemu użytkownikowi
+                    if pooled.conn.main_transaction.is_active():
+                        pooled.conn.rollback()
+                except Exception:
+                    broken = True
+            if broken or self._closed:
+                pooled.close()
+            else:
+                pooled.last_used = time.monotonic()
+                self._idle.put(pooled)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        local = self._local
+        pooled = getattr(local, 'pooled', None)
+        if pooled is not None:
+            local.depth += 1
+            try:
+                yield pooled
+            finally:
+                local.depth -= 1
+            return
+
+        pooled = self.acquire()
+        local.pooled = pooled
+        local.depth = 1
+        broken = False
+        try:
+            yield pooled
+        except Exception:
+            try:
+                pooled.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            local.pooled = None
+            local.depth = 0
+            self.release(pooled, broken)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                break
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database, user, password, **kwargs):
+    """Zwraca wspólną pulę dla danej bazy i użytkownika, tworząc ją przy pierwszym użyciu."""
+    key = (database, user)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = ConnectionPool(database, user, password, **kwargs)
+            _pools[key] = pool
+        return pool
+
+
+def close_all_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
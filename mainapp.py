@@ -1,17 +1,23 @@
 
-from datetime import datetime, date
-from firebird.driver import connect, driver_config
+from firebird.driver import driver_config
 
 from PyQt5.QtWidgets import (QApplication, QWidget, QLabel, QLineEdit, QSpinBox,
                              QComboBox, QPushButton, QCheckBox, QMessageBox,
                              QVBoxLayout, QHBoxLayout, QGridLayout, QDateEdit,
-                             QTableWidget, QTableWidgetItem, QGroupBox, QDialog,
-                             QFormLayout, QDialogButtonBox)
+                             QTableView, QGroupBox, QDialog,
+                             QFormLayout, QDialogButtonBox, QProgressBar)
 from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QPalette, QColor
 
 from fpdf import FPDF
 
+from availability import RoomAvailabilityIndex
+from db_pool import get_pool
+from workers import QueryRunner
+from table_models import DataFrameModel
+from booking import BookingService
+from reference_data import ReferenceDataCache
+
 # Konfiguracja połączenia z bazą Firebird
 driver_config.server_defaults.host.value = 'localhost'
 DATABASE = 'hotel.fdb'
@@ -19,7 +25,23 @@ USER = 'SYSDBA'
 PASSWORD = 'SYSDBA'
 
 def connect_to_db():
-    return connect(database=DATABASE, user=USER, password=PASSWORD)
+    return get_pool(DATABASE, USER, PASSWORD)
+
+ROOM_SEARCH_QUERY = """
+    SELECT r.RoomNumber, r.Price FROM Room r
+    JOIN Building b ON r.BuildingID = b.ID
+    WHERE r.BedCount = ? AND b.City = ?
+      AND NOT EXISTS (
+          SELECT 1 FROM Reservation res
+          WHERE res.RoomID = r.ID
+            AND res.CheckInDate < ? AND res.CheckOutDate > ?
+      )
+    ORDER BY r.RoomNumber
+"""
+
+def search_rooms_db(conn, bed_count, city, check_in, check_out):
+    cursor = conn.execute(ROOM_SEARCH_QUERY, (bed_count, city, check_out.strftime("%Y-%m-%d"), check_in.strftime("%Y-%m-%d")))
+    return cursor.fetchall()
 
 def show_error(msg):
     QMessageBox.critical(None, "Error", msg)
@@ -33,12 +55,28 @@ def show_warning(msg):
 def show_success(msg):
     QMessageBox.information(None, "Success", msg)
 
+def make_table_view(model):
+    view = QTableView()
+    view.setModel(model)
+    view.setSelectionBehavior(QTableView.SelectRows)
+    view.setSelectionMode(QTableView.SingleSelection)
+    view.setEditTriggers(QTableView.NoEditTriggers)
+    view.setSortingEnabled(True)
+    view.horizontalHeader().setStretchLastSection(True)
+    return view
+
+def selected_row(view, model):
+    rows = view.selectionModel().selectedRows()
+    if not rows:
+        return None
+    return model.row_values(rows[0].row())
+
 
 class EditReservationDialog(QDialog):
-    def __init__(self, conn, reservation_id, parent=None):
+    def __init__(self, pool, reservation_id, parent=None):
         super(EditReservationDialog, self).__init__(parent)
         self.setWindowTitle("Edit Reservation")
-        self.conn = conn
+        self.pool = pool
         self.reservation_id = reservation_id
 
         self.phone_edit = QLineEdit()
@@ -65,14 +103,13 @@ class EditReservationDialog(QDialog):
 
     def load_details(self):
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT g.PhoneNumber, r.CheckInDate, r.CheckOutDate
-                FROM Reservation r
-                JOIN Guest g ON r.GuestID = g.ID
-                WHERE r.ID = ?
-            """, (self.reservation_id,))
-            details = cursor.fetchone()
+            with self.pool.connection() as conn:
+                details = conn.execute("""
+                    SELECT g.PhoneNumber, r.CheckInDate, r.CheckOutDate
+                    FROM Reservation r
+                    JOIN Guest g ON r.GuestID = g.ID
+                    WHERE r.ID = ?
+                """, (self.reservation_id,)).fetchone()
             if not details:
                 show_error("Could not retrieve reservation details.")
                 self.reject()
@@ -104,25 +141,23 @@ class EditReservationDialog(QDialog):
             return
 
         try:
-            cursor = self.conn.cursor()
-            # Zaktualizuj dane gościa
-            # Najpierw pobierz GuestID
-            cursor.execute("SELECT GuestID FROM Reservation WHERE ID = ?", (self.reservation_id,))
-            guest_id = cursor.fetchone()
-            if not guest_id:
-                show_error("Guest not found for reservation.")
-                return
-            guest_id = guest_id[0]
-
-            cursor.execute("UPDATE Guest SET PhoneNumber = ? WHERE ID = ?", (phone, guest_id))
-            # Zaktualizuj daty rezerwacji
-            cursor.execute("UPDATE Reservation SET CheckInDate = ?, CheckOutDate = ? WHERE ID = ?",
-                           (check_in_date.strftime("%Y-%m-%d"), check_out_date.strftime("%Y-%m-%d"), self.reservation_id))
-            self.conn.commit()
+            with self.pool.connection() as conn:
+                # Zaktualizuj dane gościa
+                # Najpierw pobierz GuestID
+                guest_id = conn.execute("SELECT GuestID FROM Reservation WHERE ID = ?", (self.reservation_id,)).fetchone()
+                if not guest_id:
+                    show_error("Guest not found for reservation.")
+                    return
+                guest_id = guest_id[0]
+
+                conn.execute("UPDATE Guest SET PhoneNumber = ? WHERE ID = ?", (phone, guest_id))
+                # Zaktualizuj daty rezerwacji
+                conn.execute("UPDATE Reservation SET CheckInDate = ?, CheckOutDate = ? WHERE ID = ?",
+                             (check_in_date.strftime("%Y-%m-%d"), check_out_date.strftime("%Y-%m-%d"), self.reservation_id))
+                conn.commit()
             show_success("Reservation updated successfully!")
             self.accept()
         except Exception as e:
-            self.conn.rollback()
             show_error(f"Could not update reservation: {e}")
 
 
@@ -130,33 +165,51 @@ class HotelReservationApp(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Hotel Reservation System")
-        self.conn = connect_to_db()
+        self.pool = connect_to_db()
+
+        # Zapytania idą do wątków roboczych, żeby okno nie zamarzało
+        self.runner = QueryRunner(max_threads=self.pool.max_size)
+        self.loading_bar = QProgressBar()
+        self.loading_bar.setRange(0, 0)
+        self.loading_bar.setTextVisible(False)
+        self.loading_bar.setVisible(False)
+        self.runner.busy_changed.connect(self.loading_bar.setVisible)
+
+        # Indeks dostępności; dopóki się nie załaduje, wyszukiwanie idzie do bazy
+        self.availability = RoomAvailabilityIndex()
+        self._availability_journal = None
+        self._reload_availability(
+            on_error=lambda e: show_warning(f"Room availability index not loaded, searching the database directly: {e}"))
 
         self.bed_count_spin = QSpinBox()
         self.bed_count_spin.setRange(1, 6)
 
+        # Dane słownikowe (pokoje, budynki, cenniki); listy miast i budynków
+        # uzupełnia _fill_reference_combos, gdy wątek roboczy je wczyta
+        self.reference = ReferenceDataCache(self.pool)
+
         self.city_combo = QComboBox()
-        self.city_combo.addItems(['Los Angeles', 'Manhattan', 'Bydgoszcz', 'Brooklyn'])
 
         self.check_in_date = QDateEdit(calendarPopup=True)
         self.check_in_date.setDisplayFormat("yyyy-MM-dd")
-        
-        
+        self.check_in_date.setDate(QDate.currentDate())
+
         self.check_out_date = QDateEdit(calendarPopup=True)
         self.check_out_date.setDisplayFormat("yyyy-MM-dd")
+        self.check_out_date.setDate(QDate.currentDate().addDays(1))
 
         self.name_edit = QLineEdit()
         self.last_name_edit = QLineEdit()
         self.phone_edit = QLineEdit()
 
-        self.rooms_table = QTableWidget(0, 2)
-        self.rooms_table.setHorizontalHeaderLabels(["Room Number", "Price"])
-        self.rooms_table.setSelectionBehavior(self.rooms_table.SelectRows)
-        self.rooms_table.setEditTriggers(self.rooms_table.NoEditTriggers)
+        self.rooms_model = DataFrameModel.from_rows([], ["Room Number", "Price"])
+        self.rooms_table = make_table_view(self.rooms_model)
 
         # Udogodnienia i usługi
-        self.amenity_costs = {'Swimming Pool': 300, 'Fitness Center': 200}
-        self.service_costs = {'Cleaning': 100, 'Food Service': 150, 'Housekeeping': 50, 'Birthday Surprise': 400, 'Child Care Taking': 250}
+        self.amenity_costs = self.reference.amenity_costs
+        self.service_costs = self.reference.service_costs
+
+        self.booking = BookingService(self.pool, self.amenity_costs, self.service_costs)
 
         self.amenities_checkboxes = []
         self.services_checkboxes = []
@@ -174,10 +227,8 @@ class HotelReservationApp(QWidget):
         self.book_button = QPushButton("Book Room")
         self.book_button.clicked.connect(self.book_room)
 
-        self.reservation_table = QTableWidget(0, 6)
-        self.reservation_table.setHorizontalHeaderLabels(["ID", "Name", "Last Name", "Room", "Check-In", "Check-Out"])
-        self.reservation_table.setSelectionBehavior(self.reservation_table.SelectRows)
-        self.reservation_table.setEditTriggers(self.reservation_table.NoEditTriggers)
+        self.reservation_model = DataFrameModel.from_rows([], ["ID", "Name", "Last Name", "Room", "Check-In", "Check-Out"])
+        self.reservation_table = make_table_view(self.reservation_model)
 
         self.load_res_button = QPushButton("Load Reservations")
         self.load_res_button.clicked.connect(self.load_reservations)
@@ -190,17 +241,23 @@ class HotelReservationApp(QWidget):
         self.rating_spin.setRange(1, 5)
         self.rating_spin.setValue(5)
         self.rate_city_combo = QComboBox()
-        self.rate_city_combo.addItems(['None', 'Los Angeles', 'Manhattan', 'Bydgoszcz', 'Brooklyn'])
+        self.rate_city_combo.addItem('None')
         self.rate_building_combo = QComboBox()
-        self.rate_building_combo.addItems(['None', 'Building A', 'Building B', 'Building C', 'Building D', 'Building E'])
+        self.rate_building_combo.addItem('None')
         self.submit_rating_button = QPushButton("Submit Rating")
         self.submit_rating_button.clicked.connect(self.submit_rating)
 
         self.init_ui()
         self.apply_modern_style()
 
+        self.runner.submit("reference", lambda job: self.reference.refresh_if_stale(),
+                           on_result=lambda _: self._fill_reference_combos(self.reference.cities,
+                                                                           self.reference.building_names),
+                           on_error=self._reference_failed)
+
     def init_ui(self):
         layout = QVBoxLayout()
+        layout.addWidget(self.loading_bar)
 
         grid = QGridLayout()
         grid.addWidget(QLabel("Number of Beds (1-6):"), 0, 0)
@@ -274,24 +331,72 @@ class HotelReservationApp(QWidget):
         palette.setColor(QPalette.WindowText, Qt.black)
         QApplication.setPalette(palette)
 
+    def _fill_reference_combos(self, cities, building_names):
+        self.city_combo.addItems(cities)
+        self.rate_city_combo.addItems(cities)
+        self.rate_building_combo.addItems(building_names)
+
+    def _reference_failed(self, e):
+        show_warning(f"Could not load reference data, using defaults: {e}")
+        self._fill_reference_combos(['Los Angeles', 'Manhattan', 'Bydgoszcz', 'Brooklyn'],
+                                    ['Building A', 'Building B', 'Building C', 'Building D', 'Building E'])
+
+    def _reload_availability(self, on_error=None):
+        """
+        Buduje nowy indeks w wątku roboczym i podmienia go w wątku GUI. Zmiany
+        wprowadzone w międzyczasie są zapisywane w dzienniku i powtarzane na
+        nowym indeksie (operacje są idempotentne).
+        """
+        def work(job):
+            with self.pool.connection() as conn:
+                return RoomAvailabilityIndex.from_cursor(conn.cursor())
+
+        def done(index):
+            for method, args in self._availability_journal or ():
+                getattr(index, method)(*args)
+            self._availability_journal = None
+            self.availability = index
+
+        def failed(e):
+            self._availability_journal = None
+            if on_error:
+                on_error(e)
+
+        if self._availability_journal is None:
+            self._availability_journal = []
+        self.runner.submit("availability", work, on_result=done, on_error=failed)
+
+    def _update_availability(self, method, *args):
+        getattr(self.availability, method)(*args)
+        if self._availability_journal is not None:
+            self._availability_journal.append((method, args))
+
     def search_rooms(self):
-        try:
-            cursor = self.conn.cursor()
-            query = """
-            SELECT r.RoomNumber, r.Price FROM Room r
-            JOIN Building b ON r.BuildingID = b.ID
-            WHERE r.BedCount = ? AND b.City = ? AND r.IsAvailable = 1
-            """
-            cursor.execute(query, (self.bed_count_spin.value(), self.city_combo.currentText()))
-            rooms = cursor.fetchall()
-            self.rooms_table.setRowCount(0)
-            for room in rooms:
-                row_pos = self.rooms_table.rowCount()
-                self.rooms_table.insertRow(row_pos)
-                self.rooms_table.setItem(row_pos, 0, QTableWidgetItem(str(room[0])))
-                self.rooms_table.setItem(row_pos, 1, QTableWidgetItem(str(room[1])))
-        except Exception as e:
-            show_error(f"Could not fetch rooms: {e}")
+        check_in_date = self.check_in_date.date().toPyDate()
+        check_out_date = self.check_out_date.date().toPyDate()
+        if check_out_date <= check_in_date:
+            show_error("Check-out date must be after check-in date!")
+            return
+
+        bed_count = self.bed_count_spin.value()
+        city = self.city_combo.currentText()
+
+        if self.availability.loaded:
+            # Indeks odpowiada w mikrosekundach - nie ma sensu iść do wątku
+            self.runner.cancel("search")
+            self.show_rooms(self.availability.free_rooms(city, bed_count, check_in_date, check_out_date))
+            return
+
+        def work(job):
+            with self.pool.connection() as conn, job.cancellable(conn.conn.cancel_operation):
+                return search_rooms_db(conn, bed_count, city, check_in_date, check_out_date)
+
+        # Nowe wyszukiwanie anuluje poprzednie, jeśli jeszcze trwa
+        self.runner.submit("search", work, on_result=self.show_rooms,
+                           on_error=lambda e: show_error(f"Could not fetch rooms: {e}"))
+
+    def show_rooms(self, rooms):
+        self.rooms_model.set_rows(rooms)
 
     def load_reservations(self):
         phone_number = self.phone_edit.text().strip()
@@ -299,57 +404,59 @@ class HotelReservationApp(QWidget):
             show_error("Please enter a phone number to load reservations!")
             return
 
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT r.ID, g.Name, g.LastName, ro.RoomNumber, r.CheckInDate, r.CheckOutDate
-                FROM Reservation r
-                JOIN Guest g ON r.GuestID = g.ID
-                JOIN Room ro ON r.RoomID = ro.ID
-                WHERE g.PhoneNumber = ?
-            """, (phone_number,))
-            reservations = cursor.fetchall()
-            self.reservation_table.setRowCount(0)
-            if not reservations:
-                show_info("No reservations found for the provided phone number.")
-                return
-            for res in reservations:
-                row_pos = self.reservation_table.rowCount()
-                self.reservation_table.insertRow(row_pos)
-                for i, val in enumerate(res):
-                    self.reservation_table.setItem(row_pos, i, QTableWidgetItem(str(val)))
-        except Exception as e:
-            show_error(f"Could not load reservations: {e}")
+        def work(job):
+            with self.pool.connection() as conn:
+                return conn.execute("""
+                    SELECT r.ID, g.Name, g.LastName, ro.RoomNumber, r.CheckInDate, r.CheckOutDate
+                    FROM Reservation r
+                    JOIN Guest g ON r.GuestID = g.ID
+                    JOIN Room ro ON r.RoomID = ro.ID
+                    WHERE g.PhoneNumber = ?
+                """, (phone_number,)).fetchall()
+
+        self.runner.submit("reservations", work, on_result=self.show_reservations,
+                           on_error=lambda e: show_error(f"Could not load reservations: {e}"))
+
+    def show_reservations(self, reservations):
+        self.reservation_model.set_rows(reservations)
+        if not reservations:
+            show_info("No reservations found for the provided phone number.")
 
     def edit_reservation(self):
-        selected_items = self.reservation_table.selectedItems()
-        if not selected_items:
+        selected = selected_row(self.reservation_table, self.reservation_model)
+        if selected is None:
             show_warning("Please select a reservation to edit.")
             return
         # zakładamy, że ID jest w pierwszej kolumnie
-        reservation_id = int(selected_items[0].text())
+        reservation_id = int(selected[0])
 
-        dialog = EditReservationDialog(self.conn, reservation_id, self)
+        dialog = EditReservationDialog(self.pool, reservation_id, self)
         if dialog.exec_() == QDialog.Accepted:
+            self._update_availability('move_reservation', reservation_id,
+                                      dialog.check_in_edit.date().toPyDate(),
+                                      dialog.check_out_edit.date().toPyDate())
             self.load_reservations()
 
     def cancel_reservation(self):
-        selected_items = self.reservation_table.selectedItems()
-        if not selected_items:
+        selected = selected_row(self.reservation_table, self.reservation_model)
+        if selected is None:
             show_warning("Please select a reservation to cancel.")
             return
-        reservation_id = selected_items[0].text()
+        reservation_id = int(selected[0])
 
-        try:
-            cursor = self.conn.cursor()
-            # Zakładamy, że kluczem jest ID (Reservation.ID)
-            cursor.execute("DELETE FROM Reservation WHERE ID = ?", (reservation_id,))
-            self.conn.commit()
+        def work(job):
+            with self.pool.connection() as conn:
+                # Zakładamy, że kluczem jest ID (Reservation.ID)
+                conn.execute("DELETE FROM Reservation WHERE ID = ?", (reservation_id,))
+                conn.commit()
+
+        def done(_):
+            self._update_availability('remove_reservation', reservation_id)
             self.load_reservations()
             show_success(f"Reservation {reservation_id} canceled successfully.")
-        except Exception as e:
-            self.conn.rollback()
-            show_error(f"Could not cancel reservation: {e}")
+
+        self.runner.submit(f"cancel-{reservation_id}", work, on_result=done,
+                           on_error=lambda e: show_error(f"Could not cancel reservation: {e}"))
 
     def book_room(self):
         def check_empty(value, field_name):
@@ -365,7 +472,8 @@ class HotelReservationApp(QWidget):
         ]):
             return
 
-        if self.rooms_table.currentRow() < 0:
+        selected_room = selected_row(self.rooms_table, self.rooms_model)
+        if selected_room is None:
             show_error("Please select a room!")
             return
 
@@ -376,67 +484,44 @@ class HotelReservationApp(QWidget):
             show_error("Check-out date must be after check-in date!")
             return
 
+        # Wszystko z widżetów czytamy tutaj - wątek roboczy nie może ich dotykać
         try:
-            room_number = int(self.rooms_table.item(self.rooms_table.currentRow(), 0).text())
-            room_price = float(self.rooms_table.item(self.rooms_table.currentRow(), 1).text())
-
-            cursor = self.conn.cursor()
-
-            # Dodanie gościa
-            cursor.execute("""
-                INSERT INTO Guest (Name, LastName, PhoneNumber)
-                VALUES (?, ?, ?)
-                RETURNING ID
-            """, (self.name_edit.text().strip(), self.last_name_edit.text().strip(), self.phone_edit.text().strip()))
-            guest_id = cursor.fetchone()[0]
-
-            # Pobranie ID pokoju
-            cursor.execute("SELECT ID FROM Room WHERE RoomNumber = ?", (room_number,))
-            room_id = cursor.fetchone()[0]
-
-            # Dodanie rezerwacji
-            cursor.execute("""
-                INSERT INTO Reservation (GuestID, RoomID, CheckInDate, CheckOutDate)
-                VALUES (?, ?, ?, ?)
-                RETURNING ID
-            """, (guest_id, room_id, check_in_date.strftime("%Y-%m-%d"), check_out_date.strftime("%Y-%m-%d")))
-            reservation_id = cursor.fetchone()[0]
-
-            # Dodanie udogodnień
-            for cb in self.amenities_checkboxes:
-                if cb.isChecked():
-                    cursor.execute("""
-                        INSERT INTO Amenity (ReservationID, AmenityType, TotalCost)
-                        VALUES (?, ?, ?)
-                    """, (reservation_id, cb.text(), self.amenity_costs[cb.text()]))
-
-            # Dodanie usług
-            for cb in self.services_checkboxes:
-                if cb.isChecked():
-                    cursor.execute("""
-                        INSERT INTO Service (ReservationID, ServiceType, TotalCost)
-                        VALUES (?, ?, ?)
-                    """, (reservation_id, cb.text(), self.service_costs[cb.text()]))
-
-            # Obliczenie całkowitego kosztu
-            days = (check_out_date - check_in_date).days
-            amenities_cost = sum(self.amenity_costs[a.text()] for a in self.amenities_checkboxes if a.isChecked())
-            services_cost = sum(self.service_costs[s.text()] for s in self.services_checkboxes if s.isChecked())
-            total_cost = (room_price * days) + amenities_cost + services_cost
-
-            # Dodanie płatności
-            payment_date = datetime.now().strftime("%Y-%m-%d")
-            cursor.execute("""
-                INSERT INTO Payment (ReservationID, AmenitiesCost, ServiceCost, TotalAmount, PaymentDate)
-                VALUES (?, ?, ?, ?, ?)
-            """, (reservation_id, amenities_cost, services_cost, total_cost, payment_date))
-
-            self.conn.commit()
-            show_success(f"Room {room_number} booked successfully!\nTotal Cost: ${total_cost:.2f}\nPayment Date: {payment_date}")
-
+            room_number = int(selected_room[0])
+            room_price = float(selected_room[1])
         except Exception as e:
-            self.conn.rollback()
             show_error(f"Could not complete booking: {e}")
+            return
+        guest = (self.name_edit.text().strip(), self.last_name_edit.text().strip(), self.phone_edit.text().strip())
+        amenities = [cb.text() for cb in self.amenities_checkboxes if cb.isChecked()]
+        services = [cb.text() for cb in self.services_checkboxes if cb.isChecked()]
+
+        def work(job):
+            room_id = self.reference.room_id(room_number)
+            if room_id is None:
+                raise ValueError(f"Room {room_number} does not exist")
+            return self.booking.book(guest, room_id, room_price, check_in_date, check_out_date,
+                                     amenities, services)
+
+        def done(result):
+            self.book_button.setEnabled(True)
+            if result.reservation_id is None:
+                if self.availability.loaded:
+                    # Indeks nie widział rezerwacji z innego stanowiska - przeładuj
+                    self._reload_availability()
+                show_error(f"Room {room_number} is already booked for the selected dates.")
+                return
+            self._update_availability('add_reservation', result.reservation_id, result.room_id,
+                                      check_in_date, check_out_date)
+            show_success(f"Room {room_number} booked successfully!\nTotal Cost: ${result.total_cost:.2f}\n"
+                         f"Payment Date: {result.payment_date:%Y-%m-%d}\nBooked in {result.latency_ms:.0f} ms")
+
+        def failed(e):
+            self.book_button.setEnabled(True)
+            show_error(f"Could not complete booking: {e}")
+
+        # Zablokuj przycisk, żeby dwuklik nie zarezerwował pokoju dwa razy
+        self.book_button.setEnabled(False)
+        self.runner.submit("booking", work, on_result=done, on_error=failed)
 
     def submit_rating(self):
         rating = self.rating_spin.value()
@@ -449,12 +534,12 @@ class HotelReservationApp(QWidget):
             building = None
 
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                INSERT INTO UserRating (BuildingName, CityName, Rating)
-                VALUES (?, ?, ?)
-            """, (building, city, rating))
-            self.conn.commit()
+            with self.pool.connection() as conn:
+                conn.execute("""
+                    INSERT INTO UserRating (BuildingName, CityName, Rating)
+                    VALUES (?, ?, ?)
+                """, (building, city, rating))
+                conn.commit()
 
             city_msg = f"City: {city}" if city else "City: Not specified"
             building_msg = f"Building: {building}" if building else "Building: Not specified"
@@ -0,0 +1,233 @@
+"""
+Szybki eksport tabeli do PDF.
+
+Zamiast komórek FPDF rysowanych pojedynczo, tabela jest składana czcionką
+Courier (stała szerokość znaku, więc szerokość kolumny to po prostu liczba
+znaków):
+
+- kolumny są formatowane wektorowo porcjami po ``batch_rows`` wierszy,
+- szerokości kolumn liczy pierwszy przebieg, drugi składa strony,
+- kolumny, które nie mieszczą się na szerokości strony, trafiają na kolejne
+  strony (z powtórzonym nagłówkiem i numerami kolumn w stopce),
+- strony są zapisywane do pliku od razu - w pamięci jest tylko bieżąca porcja.
+
+``export_in_background`` wykonuje eksport w osobnym procesie.
+"""
+
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import pandas as pd
+
+A4 = (595.0, 842.0)
+CHAR_WIDTH = 0.6          # szerokość znaku Courier jako ułamek rozmiaru czcionki
+COLUMN_GAP = 2
+ELLIPSIS = '~'
+
+
+class PdfWriter:
+    """Minimalny PDF zapisywany strumieniowo: obiekty stron trafiają od razu do pliku."""
+
+    def __init__(self, path, page_size=A4):
+        self.page_size = page_size
+        self._file = open(path, 'wb')
+        self._offsets = {}
+        self._pages = []
+        self._next_id = 5       # 1 - katalog, 2 - drzewo stron, 3 i 4 - czcionki
+        self._file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self._write_object(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier '
+                              b'/Encoding /WinAnsiEncoding >>')
+        self._write_object(4, b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier-Bold '
+                              b'/Encoding /WinAnsiEncoding >>')
+
+    def _write_object(self, obj_id, body):
+        self._offsets[obj_id] = self._file.tell()
+        self._file.write(b'%d 0 obj\n' % obj_id + body + b'\nendobj\n')
+
+    def add_page(self, content):
+        stream = zlib.compress(content, 6)
+        content_id, page_id = self._next_id, self._next_id + 1
+        self._next_id += 2
+        self._write_object(content_id, b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(stream)
+                           + stream + b'\nendstream')
+        width, height = self.page_size
+        self._write_object(page_id, (
+            '<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] '
+            '/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>'
+            % (width, height, content_id)
+        ).encode('ascii'))
+        self._pages.append(page_id)
+
+    def close(self):
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self._pages)
+        self._write_object(2, f'<< /Type /Pages /Kids [{kids}] /Count {len(self._pages)} >>'.encode('ascii'))
+        self._write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        xref = self._file.tell()
+        size = self._next_id
+        lines = [b'xref\n0 %d\n' % size, b'0000000000 65535 f \n']
+        for obj_id in range(1, size):
+            lines.append(b'%010d 00000 n \n' % self._offsets[obj_id])
+        lines.append(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, xref))
+        self._file.write(b''.join(lines))
+        self._file.close()
+        return len(self._pages)
+
+    def abort(self):
+        self._file.close()
+
+
+def pdf_text(text):
+    """Tekst PDF w nawiasach: escape znaków specjalnych, kodowanie WinAnsi."""
+    escaped = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return b'(' + escaped.encode('cp1252', errors='replace') + b')'
+
+
+def date_only_columns(df):
+    """Kolumny dat bez części czasu - formatowane jako RRRR-MM-DD."""
+    result = set()
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            values = series.dropna()
+            if (values == values.dt.normalize()).all():
+                result.add(col)
+    return result
+
+
+def format_column(series, date_only=False):
+    """Wartości kolumny jako napisy; NULL/NaN jako pusty napis."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        text = series.dt.strftime('%Y-%m-%d' if date_only else '%Y-%m-%d %H:%M:%S')
+    else:
+        text = series.astype(str)
+    return text.where(series.notna(), '').astype(object)
+
+
+def fit_column(text, width):
+    """Przycina i dopełnia napisy do stałej szerokości."""
+    lengths = text.str.len()
+    if (lengths > width).any():
+        text = text.where(lengths <= width, text.str.slice(0, width - 1) + ELLIPSIS)
+    return text.str.ljust(width)
+
+
+def column_widths(df, date_columns, batch_rows, max_chars):
+    widths = [len(str(col)) for col in df.columns]
+    for start in range(0, len(df), batch_rows):
+        batch = df.iloc[start:start + batch_rows]
+        for i, col in enumerate(df.columns):
+            longest = format_column(batch[col], col in date_columns).str.len().max()
+            if pd.notna(longest):
+                widths[i] = max(widths[i], int(longest))
+    return [max(1, min(width, max_chars)) for width in widths]
+
+
+def column_groups(widths, line_chars):
+    """Dzieli kolumny na grupy mieszczące się na szerokości strony."""
+    groups, current, used = [], [], 0
+    for i, width in enumerate(widths):
+        needed = width if not current else used + COLUMN_GAP + width
+        if current and needed > line_chars:
+            groups.append(current)
+            current, needed = [], width
+        current.append(i)
+        used = needed
+    if current:
+        groups.append(current)
+    return groups
+
+
+def render_pdf(df, path, title=None, font_size=8.0, margin=36.0, max_col_chars=40, batch_rows=20000):
+    """Zapisuje DataFrame jako tabelę PDF. Zwraca liczbę stron."""
+    columns = [str(col) for col in df.columns]
+    date_columns = date_only_columns(df)
+    leading = font_size * 1.25
+    char_width = font_size * CHAR_WIDTH
+
+    # Orientacja pozioma, jeśli tabela nie mieści się w pionowej
+    widths = column_widths(df, date_columns, batch_rows, max_col_chars)
+    total_chars = sum(widths) + COLUMN_GAP * (len(widths) - 1)
+    page_width, page_height = A4
+    if total_chars > (page_width - 2 * margin) / char_width:
+        page_width, page_height = page_height, page_width
+    line_chars = int((page_width - 2 * margin) / char_width)
+    widths = [min(width, line_chars) for width in widths]
+    groups = column_groups(widths, line_chars)
+
+    top = page_height - margin
+    header_y = top - leading * 1.5
+    rows_per_page = max(1, int((header_y - leading * 1.5 - margin) / leading))
+    gap = ' ' * COLUMN_GAP
+    title = title or ''
+
+    writer = PdfWriter(path, (page_width, page_height))
+    try:
+        page_number = 0
+        for batch_start in range(0, max(len(df), 1), batch_rows):
+            batch = df.iloc[batch_start:batch_start + batch_rows]
+            cells = [fit_column(format_column(batch[col], col in date_columns), widths[i])
+                     for i, col in enumerate(df.columns)]
+            group_lines = []
+            for group in groups:
+                lines = cells[group[0]]
+                if len(group) > 1:
+                    lines = lines.str.cat([cells[i] for i in group[1:]], sep=gap)
+                escaped = (lines.str.rstrip().str.replace('\\', '\\\\', regex=False)
+                           .str.replace('(', '\\(', regex=False).str.replace(')', '\\)', regex=False))
+                group_lines.append(escaped.tolist())
+
+            for page_start in range(0, max(len(batch), 1), rows_per_page):
+                for group, lines in zip(groups, group_lines):
+                    page_number += 1
+                    header = gap.join(columns[i][:widths[i]].ljust(widths[i]) for i in group).rstrip()
+                    first_row = batch_start + page_start + 1
+                    last_row = batch_start + min(page_start + rows_per_page, len(batch))
+                    footer = f"{title}  rows {first_row}-{last_row} of {len(df)}"
+                    if len(groups) > 1:
+                        footer += f"  columns {group[0] + 1}-{group[-1] + 1} of {len(columns)}"
+                    footer += f"  page {page_number}"
+                    line_y = header_y - leading * 0.4
+                    body = ') \'\n('.join(lines[page_start:page_start + rows_per_page])
+                    content = b''.join([
+                        b'BT /F2 %.1f Tf %.2f %.2f Td ' % (font_size, margin, header_y),
+                        pdf_text(header), b' Tj ET\n',
+                        b'0.5 w %.2f %.2f m %.2f %.2f l S\n' % (margin, line_y, page_width - margin, line_y),
+                        b'BT /F1 %.1f Tf %.2f TL %.2f %.2f Td\n' % (font_size, leading, margin, header_y - leading),
+                        b'(' + body.encode('cp1252', errors='replace') + b") '\nET\n",
+                        b'BT /F1 %.1f Tf %.2f %.2f Td ' % (font_size - 1, margin, margin / 2),
+                        pdf_text(footer), b' Tj ET\n',
+                    ])
+                    writer.add_page(content)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close()
+
+
+_executor = None
+
+
+def export_in_background(df, path, **options):
+    """
+    Eksportuje w osobnym procesie (``spawn`` - bezpieczne przy wątkach Qt).
+    Zwraca Future z liczbą stron.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn'))
+    return _executor.submit(render_pdf, df, path, **options)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.exit("usage: python pdf_report.py <table.csv|.parquet|.feather> <output.pdf>")
+    source, target = sys.argv[1], sys.argv[2]
+    if source.endswith('.parquet'):
+        frame = pd.read_parquet(source)
+    elif source.endswith('.feather'):
+        frame = pd.read_feather(source)
+    else:
+        frame = pd.read_csv(source)
+    print(f"{render_pdf(frame, target, title=source)} pages written to {target}")
@@ -1,16 +1,23 @@
 import sys
-import os
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg, NavigationToolbar2QT
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QPushButton, QComboBox, QLabel,
-    QLineEdit, QWidget, QFileDialog, QTableWidget, QTableWidgetItem, QMessageBox, 
-    QHBoxLayout, QDialog, QCheckBox, QDialogButtonBox, QMenu, QRadioButton, QButtonGroup
+    QLineEdit, QWidget, QFileDialog, QTableView, QMessageBox, 
+    QHBoxLayout, QDialog, QCheckBox, QDialogButtonBox, QMenu, QRadioButton, QButtonGroup,
+    QProgressBar, QHeaderView
 )
 from PyQt5.QtCore import Qt
-from firebird.driver import connect, driver_config
-from fpdf import FPDF
-import numpy as np
+from firebird.driver import driver_config
+
+from db_pool import get_pool
+from workers import QueryRunner
+from table_models import DataFrameModel
+from table_export import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, export_chunks
+from snapshot_cache import SnapshotCache
+from pdf_report import export_in_background
+from report_query import ReportPipeline, ResultView, TableQuery, numeric_columns
+from report_plots import PlotCache, draw_plot, prepare_plot
 
 class ColumnFilterDialog(QDialog):
     def __init__(self, columns, parent=None):
@@ -119,6 +126,18 @@ class GroupByDialog(QDialog):
                 return col, self.agg_combo.currentText()
         return None, None
 
+class PlotWindow(QDialog):
+    def __init__(self, figure, title, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.resize(1000, 650)
+        layout = QVBoxLayout()
+        canvas = FigureCanvasQTAgg(figure)
+        layout.addWidget(NavigationToolbar2QT(canvas, self))
+        layout.addWidget(canvas)
+        self.setLayout(layout)
+
 class DatabaseApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -128,20 +147,43 @@ class DatabaseApp(QMainWindow):
         # Database connection
         driver_config.server_defaults.host.value = 'localhost'
         try:
-            self.con = connect(database='/opt/firebird/hotel.fdb', user='SYSDBA', password='SYSDBA')
-            self.cur = self.con.cursor()
+            self.pool = get_pool('/opt/firebird/hotel.fdb', 'SYSDBA', 'SYSDBA')
+            # Sprawdzenie połączenia od razu przy starcie
+            with self.pool.connection():
+                pass
         except Exception as e:
             QMessageBox.critical(self, "Database Error", f"Failed to connect to database: {e}")
             sys.exit()
 
+        # Migawki tabel na dysku, odświeżane tylko gdy zmieniła się zawartość tabeli
         self.tables_dir = 'database_tables'
-        os.makedirs(self.tables_dir, exist_ok=True)
+        self.snapshots = SnapshotCache(self.tables_dir)
+
+        # Wczytywanie porcjami; w pamięci trzymamy co najwyżej max_rows_in_memory wierszy
+        self.export_format = 'csv'
+        self.chunk_size = DEFAULT_CHUNK_SIZE
+        self.max_rows_in_memory = 2000000
 
         # Store original DataFrame to allow filtering and sorting
         self.original_df = None
-        self.current_df = None
-        self.current_sort_column = None
-        self.current_sort_order = None
+        # Operacje z menu nagłówka jako leniwy potok kroków; gdy tabela nie
+        # mieści się w pamięci, zapytanie z potoku wykonuje baza
+        self.pipeline = None
+        self.view = None
+        self._current_df = None
+        self.table_complete = False
+        # Identyfikator wczytanej migawki (tabela, odcisk, liczba wierszy) i dane przygotowanych wykresów
+        self.snapshot_key = None
+        self.plot_cache = PlotCache()
+
+        # Wczytywanie tabel w tle, pasek postępu w status barze
+        self.runner = QueryRunner(max_threads=2)
+        self.loading_bar = QProgressBar()
+        self.loading_bar.setRange(0, 0)
+        self.loading_bar.setMaximumWidth(150)
+        self.loading_bar.setVisible(False)
+        self.statusBar().addPermanentWidget(self.loading_bar)
+        self.runner.busy_changed.connect(self.loading_bar.setVisible)
 
         # UI setup
         self.initUI()
@@ -158,15 +200,34 @@ class DatabaseApp(QMainWindow):
         top_controls.addWidget(QLabel("Select Table:"))
         top_controls.addWidget(self.table_selector)
 
+        top_controls.addWidget(QLabel("Format:"))
+        self.format_selector = QComboBox()
+        self.format_selector.addItems(list(EXPORT_FORMATS))
+        self.format_selector.currentTextChanged.connect(self.set_export_format)
+        top_controls.addWidget(self.format_selector)
+
         # Add load button
         load_button = QPushButton("Load Table")
         load_button.clicked.connect(self.load_table)
         top_controls.addWidget(load_button)
 
+        reload_button = QPushButton("Reload from DB")
+        reload_button.clicked.connect(self.reload_table)
+        top_controls.addWidget(reload_button)
+
+        export_button = QPushButton("Export Table...")
+        export_button.clicked.connect(self.export_table)
+        top_controls.addWidget(export_button)
+
         layout.addLayout(top_controls)
 
         # Table widget
-        self.table_widget = QTableWidget()
+        self.table_model = DataFrameModel()
+        self.table_widget = QTableView()
+        self.table_widget.setModel(self.table_model)
+        # Stała wysokość wierszy - widok nie musi mierzyć miliona wierszy
+        self.table_widget.verticalHeader().setDefaultSectionSize(24)
+        self.table_widget.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.table_widget.horizontalHeader().sectionClicked.connect(self.on_header_clicked)
         layout.addWidget(self.table_widget)
 
@@ -175,6 +236,10 @@ class DatabaseApp(QMainWindow):
         export_pdf_button.clicked.connect(self.export_to_pdf)
         layout.addWidget(export_pdf_button)
 
+        undo_button = QPushButton("Undo Last Step")
+        undo_button.clicked.connect(self.undo_step)
+        layout.addWidget(undo_button)
+
         # Reset filters button
         reset_button = QPushButton("Reset Filters")
         reset_button.clicked.connect(self.reset_filters)
@@ -189,36 +254,173 @@ class DatabaseApp(QMainWindow):
         layout.addWidget(plot_button)
 
     def get_table_names(self):
-        self.cur.execute("SELECT RDB$RELATION_NAME FROM RDB$RELATIONS WHERE RDB$SYSTEM_FLAG = 0")
-        return [table[0].strip() for table in self.cur.fetchall()]
+        with self.pool.connection() as conn:
+            tables = conn.execute("SELECT RDB$RELATION_NAME FROM RDB$RELATIONS WHERE RDB$SYSTEM_FLAG = 0").fetchall()
+        return [table[0].strip() for table in tables]
+
+    def set_export_format(self, fmt):
+        self.export_format = fmt
 
     def load_table(self):
+        self._load_table(force=False)
+
+    def reload_table(self):
+        self._load_table(force=True)
+
+    def _load_table(self, force):
         selected_table = self.table_selector.currentText()
-        csv_file = os.path.join(self.tables_dir, f"{selected_table}.csv")
-        
-        # Export table if CSV doesn't exist
-        if not os.path.exists(csv_file):
-            self.cur.execute(f"SELECT * FROM {selected_table}")
-            rows = self.cur.fetchall()
-            columns = [col[0].strip() for col in self.cur.description]
-            self.original_df = pd.DataFrame(rows, columns=columns)
-            self.original_df.to_csv(csv_file, index=False)
-        else:
-            self.original_df = pd.read_csv(csv_file)
-
-        self.current_df = self.original_df.copy()
-        self.current_sort_column = None
-        self.current_sort_order = None
-        self.display_table(self.current_df)
+        chunk_size = self.chunk_size
+        max_rows = self.max_rows_in_memory
 
-    def display_table(self, df):
-        self.table_widget.setRowCount(df.shape[0])
-        self.table_widget.setColumnCount(df.shape[1])
-        self.table_widget.setHorizontalHeaderLabels(df.columns.tolist())
+        def work(job):
+            streamed = [0]
+
+            def on_chunk(chunk):
+                # Przy pełnym odświeżeniu wiersze trafiają do tabeli porcjami, w miarę pobierania
+                if max_rows is not None and streamed[0] >= max_rows:
+                    return
+                if max_rows is not None:
+                    chunk = chunk.iloc[:max_rows - streamed[0]]
+                job.progress((chunk, streamed[0] == 0))
+                streamed[0] += len(chunk)
+
+            with self.pool.connection() as conn, job.cancellable(conn.conn.cancel_operation):
+                df, status = self.snapshots.get(
+                    conn, selected_table, force=force, chunk_size=chunk_size, max_rows=max_rows,
+                    on_chunk=on_chunk, should_stop=lambda: job.cancelled
+                )
+            if df is None:
+                return None
+            meta = self.snapshots.read_meta(selected_table)
+            return df, status, meta
+
+        def progress(update):
+            chunk, first = update
+            if first:
+                self.display_table(chunk)
+            else:
+                self.table_model.append_frame(chunk)
+            self.statusBar().showMessage(f"Loading {selected_table}... {self.table_model.rowCount()} rows")
+
+        def done(result):
+            if result is None:
+                return
+            df, status, meta = result
+            total = meta['rows']
+            self.snapshot_key = (selected_table, tuple(meta['fingerprint']), total)
+            self.show_loaded_table(selected_table, df, len(df) == total)
+            if len(df) < total:
+                self.statusBar().showMessage(f"{selected_table}: showing first {len(df)} of {total} rows ({status})")
+            else:
+                self.statusBar().showMessage(f"{selected_table}: {total} rows ({status})", 5000)
+
+        def failed(e):
+            self.statusBar().clearMessage()
+            QMessageBox.critical(self, "Database Error", f"Failed to load table {selected_table}: {e}")
+
+        # Wybranie innej tabeli w trakcie wczytywania anuluje poprzednie zadanie
+        self.statusBar().showMessage(f"Loading {selected_table}...")
+        self.runner.submit("load_table", work, on_result=done, on_error=failed, on_progress=progress)
+
+    def export_table(self):
+        selected_table = self.table_selector.currentText()
+        if self.snapshots.read_meta(selected_table) is None:
+            QMessageBox.warning(self, "Export Error", "Load the table before exporting it")
+            return
+        fmt = self.export_format
+        ext = EXPORT_FORMATS[fmt]
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export Table", f"{selected_table}{ext}", f"{fmt.upper()} Files (*{ext})"
+        )
+        if not path:
+            return
+        chunk_size = self.chunk_size
+
+        def work(job):
+            # Eksport z migawki na dysku - bez limitu wierszy i bez odpytywania bazy
+            df = self.snapshots.load(selected_table)
+            chunks = (df.iloc[i:i + chunk_size] for i in range(0, max(len(df), 1), chunk_size))
+            return export_chunks(chunks, path, fmt, should_stop=lambda: job.cancelled)
+
+        def done(rows):
+            if rows is not None:
+                self.statusBar().showMessage(f"Exported {rows} rows to {path}", 5000)
+
+        def failed(e):
+            QMessageBox.critical(self, "Export Error", f"Failed to export table {selected_table}: {e}")
+
+        self.runner.submit("export_table", work, on_result=done, on_error=failed)
 
-        for i, row in df.iterrows():
-            for j, value in enumerate(row):
-                self.table_widget.setItem(i, j, QTableWidgetItem(str(value)))
+    def show_loaded_table(self, table, df, complete=True):
+        self.original_df = df
+        self.pipeline = ReportPipeline(TableQuery(table, df.columns, numeric_columns(df)), df)
+        self.table_complete = complete
+        self.set_view(ResultView(df))
+
+    @property
+    def query(self):
+        return self.pipeline.query()
+
+    @property
+    def current_df(self):
+        # DataFrame powstaje dopiero, gdy jest potrzebny (PDF, wykres)
+        if self._current_df is None and self.view is not None:
+            self._current_df = self.view.materialize()
+        return self._current_df
+
+    def set_view(self, view):
+        self.view = view
+        self._current_df = None
+        self.table_model.set_view(view.df, view.rows, view.columns)
+
+    def apply_step(self, step):
+        self.pipeline.push(step)
+        self.refresh_view()
+
+    def undo_step(self):
+        if self.pipeline is not None and self.pipeline.undo() is not None:
+            self.refresh_view()
+
+    def refresh_view(self):
+        """
+        Przelicza potok w pamięci, jeśli cała tabela jest wczytana, a w
+        przeciwnym razie wykonuje zapytanie w bazie - tylko wynik (co najwyżej
+        max_rows_in_memory wierszy) przechodzi przez sieć.
+        """
+        query = self.query
+        if self.table_complete:
+            self.set_view(self.pipeline.evaluate(query))
+            return
+
+        max_rows = self.max_rows_in_memory
+
+        def work(job):
+            with self.pool.connection() as conn, job.cancellable(conn.conn.cancel_operation):
+                if query.sql_capable:
+                    sql, params = query.with_limit(first=max_rows).to_sql()
+                else:
+                    # Firebird nie liczy mediany - baza filtruje, grupuje pandas
+                    sql, params = query.base().to_sql()
+                cursor = conn.execute(sql, params)
+                columns = [col[0].strip() for col in cursor.description]
+                df = pd.DataFrame(cursor.fetchall(), columns=columns)
+            if not query.sql_capable:
+                df = query.with_limit(first=max_rows).apply(df)
+            return df
+
+        def done(df):
+            self.set_view(ResultView(df))
+            self.statusBar().showMessage(f"{query.table}: {len(df)} rows from database", 5000)
+
+        def failed(e):
+            self.statusBar().clearMessage()
+            QMessageBox.critical(self, "Database Error", f"Query failed: {e}")
+
+        self.statusBar().showMessage(f"Querying {query.table}...")
+        self.runner.submit("query", work, on_result=done, on_error=failed)
+
+    def display_table(self, df):
+        self.table_model.set_dataframe(df)
 
     def export_to_pdf(self):
         if self.current_df is None or self.current_df.empty:
@@ -233,31 +435,26 @@ class DatabaseApp(QMainWindow):
         if file_dialog.exec_() == QFileDialog.Accepted:
             pdf_file_path = file_dialog.selectedFiles()[0]
 
-            pdf = FPDF()
-            pdf.set_auto_page_break(auto=True, margin=15)
-            pdf.add_page()
-            pdf.set_font("Arial", size=12)
-
-            # Add table headers
-            pdf.set_fill_color(200, 220, 255)
-            for col in self.current_df.columns:
-                pdf.cell(40, 10, col, border=1, fill=True, align='C')
-            pdf.ln()
-
-            # Add table rows
-            for _, row in self.current_df.iterrows():
-                for value in row:
-                    pdf.cell(40, 10, str(value), border=1)
-                pdf.ln()
-
-            try:
-                pdf.output(pdf_file_path)
-                QMessageBox.information(self, "Success", f"Data successfully exported to {pdf_file_path}")
-            except Exception as e:
+            df = self.current_df
+            title = self.table_selector.currentText()
+
+            def work(job):
+                # Składanie PDF w osobnym procesie - GUI nie czeka na eksport
+                return export_in_background(df, pdf_file_path, title=title).result()
+
+            def done(pages):
+                self.statusBar().clearMessage()
+                QMessageBox.information(self, "Success", f"Data successfully exported to {pdf_file_path} ({pages} pages)")
+
+            def failed(e):
+                self.statusBar().clearMessage()
                 QMessageBox.critical(self, "Export Error", f"Failed to export data: {e}")
+
+            self.statusBar().showMessage(f"Exporting {len(df)} rows to PDF...")
+            self.runner.submit("export_pdf", work, on_result=done, on_error=failed)
                 
     def on_header_clicked(self, column_index):
-        column = self.current_df.columns[column_index]
+        column = self.view.columns[column_index]
         
         # Create a menu of actions
         menu = QMenu(self)
@@ -272,7 +469,8 @@ class DatabaseApp(QMainWindow):
         
         # Range Filter (only for numeric columns)
         range_filter = None  # Initialize range_filter here
-        if np.issubdtype(self.current_df[column].dtype, np.number):
+        # Filtr działa na kolumnach tabeli, nie na wynikach agregacji
+        if column in self.query.numeric and self.query.is_base_column(column):
             range_filter = menu.addAction("Filter Range")
         
         # Grouping for all columns
@@ -283,91 +481,44 @@ class DatabaseApp(QMainWindow):
             self.table_widget.horizontalHeader().pos()
         ))
         
-        if action == sort_asc:
-            # Sort the dataframe in ascending order by the selected column
-            self.current_df = self.current_df.sort_values(by=column, ascending=True)
-            self.current_sort_column = column
-            self.current_sort_order = 'asc'
-            self.display_table(self.current_df)  # Refresh the table with sorted data
-            
-        elif action == sort_desc:
-            # Sort the dataframe in descending order by the selected column
-            self.current_df = self.current_df.sort_values(by=column, ascending=False)
-            self.current_sort_column = column
-            self.current_sort_order = 'desc'
-            self.display_table(self.current_df)  # Refresh the table with sorted data
+        if action in (sort_asc, sort_desc):
+            self.apply_step(('sort', column, action == sort_asc))
             
         elif action == select_columns:
             # Open column selection dialog
-            dialog = ColumnFilterDialog(self.current_df.columns, self)
+            dialog = ColumnFilterDialog(self.view.columns, self)
             if dialog.exec_() == QDialog.Accepted:
                 selected_columns = dialog.get_selected_columns()
-                self.current_df = self.current_df[selected_columns]
-                self.display_table(self.current_df)
+                self.apply_step(('select', selected_columns))
                 
         elif action == range_filter:  # This will work now because range_filter is always defined
             # Open range filter dialog for numeric columns
-            dialog = RangeFilterDialog(self.original_df[column], self)
+            dialog = RangeFilterDialog(self.view.column(column), self)
             if dialog.exec_() == QDialog.Accepted:
                 range_values = dialog.get_range()
                 if range_values:
                     min_val, max_val = range_values
-                    self.current_df = self.original_df[
-                        (self.original_df[column] >= min_val) & 
-                        (self.original_df[column] <= max_val)
-                    ]
-                    # Restore previous sorting if applicable
-                    if self.current_sort_column:
-                        self.current_df = self.current_df.sort_values(
-                            by=self.current_sort_column, 
-                            ascending=(self.current_sort_order == 'asc')
-                        )
-                    self.display_table(self.current_df)
+                    # Wybór kolumn, grupowanie i sortowanie zostają - filtr to kolejny krok
+                    self.apply_step(('filter', column, min_val, max_val))
                     
         elif action == group_by:
             # Open grouping dialog
-            dialog = GroupByDialog(self.current_df.columns, self)
+            dialog = GroupByDialog(self.view.columns, self)
             if dialog.exec_() == QDialog.Accepted:
                 group_column, agg_method = dialog.get_groupby_info()
                 if group_column:
-                    # Perform grouping
-                    if agg_method == 'count':
-                        grouped_df = self.current_df.groupby(group_column).size().reset_index(name='count')
-                    else:
-                        # For other aggregation methods, we need to exclude the grouping column
-                        numeric_cols = self.current_df.select_dtypes(include=['int64', 'float64']).columns
-                        numeric_cols = [col for col in numeric_cols if col != group_column]
-                        
-                        if not numeric_cols:
-                            QMessageBox.warning(self, "Grouping Error", "No numeric columns available for aggregation")
-                            return
-                        
-                        # Perform aggregation
-                        if agg_method == 'none':
-                            grouped_df = self.current_df.groupby(group_column, as_index=False).apply(lambda x: x)
-                            grouped_df.reset_index(drop=True, inplace=True)
-                        elif agg_method == 'mean':
-                            grouped_df = self.current_df.groupby(group_column)[numeric_cols].mean().reset_index()
-                        elif agg_method == 'median':
-                            grouped_df = self.current_df.groupby(group_column)[numeric_cols].median().reset_index()
-                        elif agg_method == 'min':
-                            grouped_df = self.current_df.groupby(group_column)[numeric_cols].min().reset_index()
-                        elif agg_method == 'max':
-                            grouped_df = self.current_df.groupby(group_column)[numeric_cols].max().reset_index()
-                        elif agg_method == 'sum':
-                            grouped_df = self.current_df.groupby(group_column)[numeric_cols].sum().reset_index()
-                    
-                    self.current_df = grouped_df
-                    self.display_table(self.current_df)
+                    query = self.query.with_group(group_column, agg_method)
+                    if agg_method not in ('none', 'count') and not query.aggregated_columns():
+                        QMessageBox.warning(self, "Grouping Error", "No numeric columns available for aggregation")
+                        return
+                    self.apply_step(('group', group_column, agg_method))
     
     
     
     def reset_filters(self):
         # Reset to original dataframe
-        self.current_df = self.original_df.copy()
-        self.current_sort_column = None
-        self.current_sort_order = None
-        self.display_table(self.current_df)
+        self.pipeline.clear()
+        self.set_view(ResultView(self.original_df))
         
         
     def create_plot(self):
@@ -380,7 +531,7 @@ class DatabaseApp(QMainWindow):
         normal_columns = self.current_df.columns
         
         # Tylko kolumny numeryczne dla Y
-        numeric_columns = self.current_df.select_dtypes(include=['int64', 'float64']).columns
+        y_columns = numeric_columns(self.current_df)
         
         # X-axis selection
         x_layout = QHBoxLayout()
@@ -394,7 +545,7 @@ class DatabaseApp(QMainWindow):
         y_layout = QHBoxLayout()
         y_layout.addWidget(QLabel("Y-axis:"))
         y_combo = QComboBox()
-        y_combo.addItems(numeric_columns)
+        y_combo.addItems(y_columns)
         y_layout.addWidget(y_combo)
         layout.addLayout(y_layout)
         
@@ -426,25 +577,31 @@ class DatabaseApp(QMainWindow):
             x_column = x_combo.currentText()
             y_column = y_combo.currentText()
             plot_type = plot_type_combo.currentText()
-            
-            # Przygotuj wykres
-            plt.figure(figsize=(10, 6))
-            
-            # Różne rodzaje wykresów
-            if plot_type == "Line Plot":
-                plt.plot(self.current_df[x_column], self.current_df[y_column], marker='o')
-            elif plot_type == "Scatter Plot":
-                plt.scatter(self.current_df[x_column], self.current_df[y_column])
-            elif plot_type == "Bar Plot":
-                plt.bar(self.current_df[x_column], self.current_df[y_column])
-            
-            plt.title(f'{y_column} vs {x_column}')
-            plt.xlabel(x_column)
-            plt.ylabel(y_column)
-            plt.xticks(rotation=45, ha='right')
-            plt.tight_layout()
-            plt.grid(True)
-            plt.show()
+            title = f'{y_column} vs {x_column}'
+
+            key = (self.snapshot_key, self.pipeline.key(), x_column, y_column, plot_type)
+            data = self.plot_cache.get(key)
+            if data is not None:
+                PlotWindow(draw_plot(data, x_column, y_column), title, self).show()
+                return
+
+            df = self.current_df
+
+            def work(job):
+                # Zmniejszenie danych (LTTB, histogram 2D, top-N) poza wątkiem GUI
+                return prepare_plot(df, x_column, y_column, plot_type)
+
+            def done(data):
+                self.statusBar().clearMessage()
+                self.plot_cache.put(key, data)
+                PlotWindow(draw_plot(data, x_column, y_column), title, self).show()
+
+            def failed(e):
+                self.statusBar().clearMessage()
+                QMessageBox.critical(self, "Plot Error", f"Failed to create plot: {e}")
+
+            self.statusBar().showMessage(f"Preparing plot of {len(df)} rows...")
+            self.runner.submit("plot", work, on_result=done, on_error=failed)
             
         
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+"""
+Pamięć podręczna danych słownikowych hotelu (Room, Building, Department, cenniki).
+
+Dane są wczytywane raz przy starcie i trzymane w zwartych strukturach:
+pokoje jako tablice ``array`` z indeksem numer pokoju -> pozycja, zebrane
+w jednym obiekcie ``RoomTable``. Przeładowanie podmienia całą tabelę jednym
+przypisaniem, więc czytelnik nigdy nie połączy nowej pozycji ze starą
+tablicą. Co ``ttl``
+sekund jednym zapytaniem sprawdzany jest odcisk tabel (COUNT i MAX(ID));
+jeśli się zmienił, dane są przeładowywane, a ``version`` rośnie. Zmiany
+wprowadzane przez samą aplikację zgłasza się przez ``invalidate()``.
+"""
+
+import threading
+import time
+from array import array
+
+# W bazie nie ma tabel z cennikiem - ceny udogodnień i usług są stałe
+AMENITY_COSTS = {'Swimming Pool': 300, 'Fitness Center': 200}
+SERVICE_COSTS = {'Cleaning': 100, 'Food Service': 150, 'Housekeeping': 50, 'Birthday Surprise': 400, 'Child Care Taking': 250}
+
+FINGERPRINT_QUERY = """
+    SELECT
+        (SELECT COUNT(*) FROM Room), (SELECT MAX(ID) FROM Room),
+        (SELECT COUNT(*) FROM Building), (SELECT MAX(ID) FROM Building),
+        (SELECT COUNT(*) FROM Department), (SELECT MAX(ID) FROM Department)
+    FROM RDB$DATABASE
+"""
+
+
+class RoomTable:
+    """Niezmienna migawka pokoi: tablice kolumn i indeks numer pokoju -> pozycja."""
+
+    __slots__ = ('ids', 'numbers', 'bed_counts', 'building_ids', 'prices', 'positions')
+
+    def __init__(self, rows=()):
+        self.ids, self.numbers, self.bed_counts = array('i'), array('i'), array('i')
+        self.building_ids, self.prices = array('i'), array('d')
+        self.positions = {}
+        for room_id, room_number, bed_count, price, building_id in rows:
+            self.positions[room_number] = len(self.ids)
+            self.ids.append(room_id)
+            self.numbers.append(room_number)
+            self.bed_counts.append(bed_count)
+            self.building_ids.append(building_id)
+            self.prices.append(float(price))
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class ReferenceDataCache:
+    def __init__(self, pool, ttl=60.0):
+        self.pool = pool
+        self.ttl = ttl
+        self.amenity_costs = dict(AMENITY_COSTS)
+        self.service_costs = dict(SERVICE_COSTS)
+
+        self.rooms = RoomTable()
+        self.buildings = {}           # ID -> (Name, City, DepartmentID)
+        self.departments = {}         # ID -> (Name, MaxEmployeeCount)
+        self.cities = []
+        self.building_names = []
+
+        self.version = 0
+        self.loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self._fingerprint = None
+        self._checked_at = 0.0
+        self._stale = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self.pool.connection() as conn:
+            fingerprint = tuple(conn.execute(FINGERPRINT_QUERY).fetchone())
+            rooms = conn.execute(
+                "SELECT ID, RoomNumber, BedCount, Price, BuildingID FROM Room ORDER BY RoomNumber"
+            ).fetchall()
+            buildings = conn.execute("SELECT ID, Name, City, DepartmentID FROM Building").fetchall()
+            departments = conn.execute("SELECT ID, Name, MaxEmployeeCount FROM Department").fetchall()
+
+        self.rooms = RoomTable(rooms)
+        self.buildings = {row[0]: tuple(row[1:]) for row in buildings}
+        self.departments = {row[0]: tuple(row[1:]) for row in departments}
+        self.cities = sorted({city for _, city, _ in self.buildings.values()})
+        self.building_names = sorted({name for name, _, _ in self.buildings.values()})
+
+        self._fingerprint = fingerprint
+        self._checked_at = time.monotonic()
+        self._stale = False
+        self.version += 1
+        self.reloads += 1
+        self.loaded = True
+
+    def invalidate(self):
+        """Wymusza przeładowanie przy następnym odczycie."""
+        self._stale = True
+
+    def refresh_if_stale(self):
+        with self._lock:
+            if not self.loaded or self._stale:
+                self.load()
+                return True
+            if time.monotonic() - self._checked_at < self.ttl:
+                return False
+            with self.pool.connection() as conn:
+                fingerprint = tuple(conn.execute(FINGERPRINT_QUERY).fetchone())
+            self._checked_at = time.monotonic()
+            if fingerprint != self._fingerprint:
+                self.load()
+                return True
+            return False
+
+    def room_id(self, room_number):
+        self.refresh_if_stale()
+        rooms = self.rooms
+        position = rooms.positions.get(room_number)
+        if position is not None:
+            self.hits += 1
+            return rooms.ids[position]
+        # Pokój mógł zostać dodany po ostatnim wczytaniu
+        self.misses += 1
+        self.invalidate()
+        self.refresh_if_stale()
+        rooms = self.rooms
+        position = rooms.positions.get(room_number)
+        return None if position is None else rooms.ids[position]
+
+    def room(self, room_number):
+        rooms = self.rooms
+        position = rooms.positions.get(room_number)
+        if position is None:
+            return None
+        return {
+            'ID': rooms.ids[position],
+            'RoomNumber': rooms.numbers[position],
+            'BedCount': rooms.bed_counts[position],
+            'Price': rooms.prices[position],
+            'Building': self.buildings.get(rooms.building_ids[position]),
+        }
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'version': self.version,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+            'reloads': self.reloads,
+            'rooms': len(self.rooms),
+        }
@@ -0,0 +1,207 @@
+"""
+Generowanie raportów bez GUI, wiele naraz.
+
+Każdy raport to tabela i lista kroków w tym samym formacie co potok w
+``DatabaseApp`` (``report_query.ReportPipeline``), np.::
+
+    [
+        {"table": "ROOM", "format": "pdf"},
+        {"name": "expensive_rooms", "table": "ROOM",
+         "steps": [["filter", "PRICE", 300, 1000], ["sort", "PRICE", false]]},
+        {"name": "rooms_by_building", "table": "ROOM",
+         "steps": [["group", "BUILDINGID", "mean"]], "format": "csv"}
+    ]
+
+Raporty są wykonywane równolegle w puli procesów; każdy proces ma własne
+połączenie z Firebirdem. Zapytanie z kroków jest wykonywane przez bazę
+(poza medianą, którą liczy pandas), a wynik trafia do PDF lub pliku
+CSV/Parquet/Feather. Na końcu zapisywane jest podsumowanie ``summary.json``
+z liczbą wierszy i czasem każdego raportu.
+
+    python report_batch.py ROOM GUEST --format pdf --workers 4
+    python report_batch.py --all --format csv
+    python report_batch.py --config reports.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+from firebird.driver import driver_config
+
+from db_pool import close_all_pools, get_pool
+from pdf_report import render_pdf
+from report_query import ReportPipeline, TableQuery, quote
+from snapshot_cache import column_kinds
+from table_export import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, export_chunks, iter_query_chunks
+
+DATABASE = '/opt/firebird/hotel.fdb'
+USER = 'SYSDBA'
+PASSWORD = 'SYSDBA'
+REPORT_FORMATS = ['pdf'] + list(EXPORT_FORMATS)
+
+_connection_args = None
+
+
+def _init_worker(host, database, user, password):
+    # Jedno połączenie na proces, tworzone przy starcie procesu
+    global _connection_args
+    driver_config.server_defaults.host.value = host
+    _connection_args = (database, user, password)
+    with get_pool(*_connection_args, max_size=1).connection():
+        pass
+
+
+def table_query(conn, table):
+    """Pusty TableQuery z kolumnami i typami tabeli (bez pobierania wierszy)."""
+    cursor = conn.execute(f"SELECT FIRST 0 * FROM {quote(table)}")
+    columns = [col[0].strip() for col in cursor.description]
+    kinds = column_kinds(cursor.description)
+    numeric = [col for col, kind in zip(columns, kinds) if kind in ('int', 'float')]
+    return TableQuery(table, columns, numeric)
+
+
+def report_summary(report, output_dir):
+    """Początek wiersza podsumowania: nazwa, tabela, format i plik wynikowy."""
+    fmt = report.get('format', 'pdf')
+    name = report.get('name') or report['table']
+    path = os.path.join(output_dir, name + ('.pdf' if fmt == 'pdf' else EXPORT_FORMATS[fmt]))
+    return {'name': name, 'table': report['table'], 'format': fmt, 'output': path}
+
+
+def run_report(report, output_dir, max_rows=None):
+    """Wykonuje jeden raport w procesie roboczym. Zwraca wiersz podsumowania."""
+    start = time.perf_counter()
+    summary = report_summary(report, output_dir)
+    name, fmt, path = summary['name'], summary['format'], summary['output']
+    try:
+        with get_pool(*_connection_args, max_size=1).connection() as conn:
+            pipeline = ReportPipeline(table_query(conn, report['table']))
+            for step in report.get('steps', ()):
+                pipeline.push(tuple(step))
+            query = pipeline.query().with_limit(first=max_rows)
+
+            if query.sql_capable and fmt != 'pdf':
+                # Wynik prosto z kursora do pliku, porcjami
+                sql, params = query.to_sql()
+                rows = export_chunks(iter_query_chunks(conn.cursor(), sql, params, DEFAULT_CHUNK_SIZE), path, fmt)
+            else:
+                if query.sql_capable:
+                    sql, params = query.to_sql()
+                else:
+                    sql, params = query.base().to_sql()
+                df = pd.concat(iter_query_chunks(conn.cursor(), sql, params, DEFAULT_CHUNK_SIZE),
+                               ignore_index=True)
+                if not query.sql_capable:
+                    df = query.apply(df)
+                rows = len(df)
+                if fmt == 'pdf':
+                    summary['pages'] = render_pdf(df, path, title=name)
+                else:
+                    export_chunks([df], path, fmt)
+        summary.update(status='ok', rows=rows)
+    except Exception as e:
+        summary.update(status='error', rows=0, error=f"{type(e).__name__}: {e}")
+    summary['seconds'] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def run_batch(reports, output_dir, workers=None, max_rows=None, host='localhost',
+              database=DATABASE, user=USER, password=PASSWORD, on_done=None):
+    """Wykonuje raporty równolegle; zwraca podsumowania w kolejności ``reports``."""
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or min(len(reports), os.cpu_count() or 1) or 1
+    results = [None] * len(reports)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(host, database, user, password)) as executor:
+        futures = {executor.submit(run_report, report, output_dir, max_rows): i
+                   for i, report in enumerate(reports)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                summary = future.result()
+            except BrokenProcessPool as e:
+                # Np. brak połączenia w _init_worker - pula nie wykona już żadnego raportu
+                summary = report_summary(reports[i], output_dir)
+                summary.update(status='error', rows=0, error=f"{type(e).__name__}: {e}", seconds=0.0)
+            results[i] = summary
+            if on_done is not None:
+                on_done(summary)
+    return results
+
+
+def list_tables(host, database, user, password):
+    driver_config.server_defaults.host.value = host
+    with get_pool(database, user, password, max_size=1).connection() as conn:
+        tables = conn.execute("SELECT RDB$RELATION_NAME FROM RDB$RELATIONS WHERE RDB$SYSTEM_FLAG = 0").fetchall()
+    # Procesy robocze nie mogą odziedziczyć otwartego połączenia
+    close_all_pools()
+    return [table[0].strip() for table in tables]
+
+
+def print_summary(results, elapsed):
+    print(f"\n{'report':<30} {'status':<7} {'rows':>10} {'seconds':>9}")
+    for summary in results:
+        print(f"{summary['name']:<30} {summary['status']:<7} {summary['rows']:>10} {summary['seconds']:>9.2f}")
+        if summary['status'] != 'ok':
+            print(f"    {summary['error']}")
+    total_rows = sum(summary['rows'] for summary in results)
+    print(f"{len(results)} reports, {total_rows} rows in {elapsed:.2f} s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate table reports from the hotel database in parallel.")
+    parser.add_argument('tables', nargs='*', help="tables to export (each as a separate report)")
+    parser.add_argument('--all', action='store_true', help="export every user table")
+    parser.add_argument('--config', help="JSON file with a list of reports (table, steps, format, name)")
+    parser.add_argument('--format', choices=REPORT_FORMATS, default='pdf',
+                        help="format for reports that do not set one (default: pdf)")
+    parser.add_argument('--output-dir', default='reports')
+    parser.add_argument('--workers', type=int, help="number of worker processes (default: CPU count)")
+    parser.add_argument('--max-rows', type=int, help="limit rows per report (FIRST n)")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--database', default=DATABASE)
+    parser.add_argument('--user', default=USER)
+    parser.add_argument('--password', default=PASSWORD)
+    args = parser.parse_args(argv)
+
+    tables = list(args.tables)
+    if args.all:
+        tables += list_tables(args.host, args.database, args.user, args.password)
+    reports = [{'table': table} for table in tables]
+    if args.config:
+        with open(args.config, encoding='utf-8') as f:
+            reports += json.load(f)
+    if not reports:
+        parser.error("no reports to generate: give table names, --all or --config")
+    names = {}
+    for report in reports:
+        report.setdefault('format', args.format)
+        # Ta sama tabela kilka razy - osobne pliki wynikowe
+        name = report.get('name') or report['table']
+        names[name] = names.get(name, 0) + 1
+        report['name'] = name if names[name] == 1 else f"{name}_{names[name]}"
+        if report['format'] not in REPORT_FORMATS:
+            parser.error(f"unsupported format {report['format']!r} in report {report['name']}")
+
+    start = time.perf_counter()
+    results = run_batch(
+        reports, args.output_dir, workers=args.workers, max_rows=args.max_rows, host=args.host,
+        database=args.database, user=args.user, password=args.password,
+        on_done=lambda s: print(f"{s['name']}: {s['status']} ({s['rows']} rows, {s['seconds']:.2f} s)"),
+    )
+    elapsed = time.perf_counter() - start
+
+    print_summary(results, elapsed)
+    with open(os.path.join(args.output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump({'elapsed_seconds': round(elapsed, 3), 'reports': results}, f, indent=2)
+    return 0 if all(summary['status'] == 'ok' for summary in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""
+Przygotowanie danych do wykresów w generatorze raportów.
+
+Matplotlib nie powinien dostawać milionów punktów:
+
+- wykres liniowy: najpierw min-max w przedziałach (zachowuje skoki), potem
+  LTTB (Largest-Triangle-Three-Buckets) do ``max_points`` punktów,
+- wykres punktowy: histogram 2D rysowany jako obraz (jak datashader),
+  dla małych danych zwykłe punkty,
+- wykres słupkowy: suma Y dla każdej wartości X, ``top_n`` największych,
+  reszta jako jeden słupek "Other".
+
+Przygotowane dane trzyma ``PlotCache`` (klucz: migawka tabeli, kroki potoku,
+kolumny, rodzaj wykresu); każde okno rysuje z nich własną figurę, bo zoom
+i przesuwanie z paska narzędzi zmieniają figurę.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from matplotlib.colors import LogNorm
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
+
+LINE_POINTS = 2000
+SCATTER_POINTS = 20000
+SCATTER_BINS = (400, 300)
+BAR_TOP_N = 30
+
+
+def minmax_indices(y, buckets):
+    """Indeksy minimum i maksimum w każdym z ``buckets`` równych przedziałów."""
+    n = len(y)
+    edges = np.linspace(0, n, buckets + 1).astype(np.intp)
+    starts = edges[:-1][edges[1:] > edges[:-1]]
+    # NaN nie może wygrać min/max
+    filled_min = np.where(np.isnan(y), np.inf, y)
+    filled_max = np.where(np.isnan(y), -np.inf, y)
+    lows = np.minimum.reduceat(filled_min, starts)
+    highs = np.maximum.reduceat(filled_max, starts)
+    positions = np.arange(n)
+    bucket = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n)))
+    is_low = filled_min == lows[bucket]
+    is_high = filled_max == highs[bucket]
+    # Pierwsze wystąpienie minimum i maksimum w przedziale
+    low_idx = np.full(len(starts), n)
+    high_idx = np.full(len(starts), n)
+    np.minimum.at(low_idx, bucket[is_low], positions[is_low])
+    np.minimum.at(high_idx, bucket[is_high], positions[is_high])
+    return np.unique(np.concatenate([low_idx, high_idx, [0, n - 1]]))
+
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indeksy ``threshold`` najbardziej znaczących punktów."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Średnia następnego przedziału (dla ostatniego - ostatni punkt)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        bx, by = x[start:end], y[start:end]
+        area = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+        a = start + int(np.nanargmax(area)) if not np.all(np.isnan(area)) else start
+        selected[i + 1] = a
+    return selected
+
+
+def _axis_values(series):
+    """Oś X jako liczby: daty jako int64, tekst jako numer wiersza."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.to_numpy(dtype='datetime64[ns]').astype(np.int64).astype(float)
+        values[series.isna().to_numpy()] = np.nan
+        return values, 'datetime'
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=float, na_value=np.nan), 'numeric'
+    return np.arange(len(series), dtype=float), 'category'
+
+
+def prepare_line(x_series, y_series, max_points=LINE_POINTS):
+    x, kind = _axis_values(x_series)
+    y = y_series.to_numpy(dtype=float, na_value=np.nan)
+    if kind != 'category' and len(x) and not np.all(np.diff(x[~np.isnan(x)]) >= 0):
+        order = np.argsort(x, kind='stable')
+        x, y = x[order], y[order]
+    if len(x) > max_points:
+        if len(x) > max_points * 8:
+            # Wstępne zmniejszenie min-max, żeby LTTB pracował na małej tablicy
+            keep = minmax_indices(y, max_points * 4)
+            x, y = x[keep], y[keep]
+        keep = lttb_indices(x, y, max_points)
+        x, y = x[keep], y[keep]
+    labels = None
+    if kind == 'category':
+        # Dla tekstu X to numery wierszy
+        labels = x_series.iloc[x.astype(np.intp)].astype(str).to_numpy()
+    return {'type': 'line', 'x': x, 'y': y, 'x_kind': kind, 'labels': labels, 'points': len(x_series)}
+
+
+def prepare_scatter(x_series, y_series, max_points=SCATTER_POINTS, bins=SCATTER_BINS):
+    x, kind = _axis_values(x_series)
+    y = y_series.to_numpy(dtype=float, na_value=np.nan)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[valid], y[valid]
+    if len(x) <= max_points:
+        return {'type': 'scatter', 'x': x, 'y': y, 'x_kind': kind, 'points': len(x_series)}
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins)
+    return {'type': 'density', 'counts': counts.T, 'extent': (x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]),
+            'x_kind': kind, 'points': len(x_series)}
+
+
+def prepare_bar(x_series, y_series, top_n=BAR_TOP_N):
+    sums = pd.Series(y_series.to_numpy(dtype=float, na_value=np.nan)).groupby(
+        x_series.astype(str).to_numpy()).sum().sort_values(ascending=False)
+    labels = list(sums.index[:top_n])
+    values = list(sums.to_numpy()[:top_n])
+    if len(sums) > top_n:
+        labels.append(f"Other ({len(sums) - top_n})")
+        values.append(sums.iloc[top_n:].sum())
+    return {'type': 'bar', 'labels': labels, 'values': np.asarray(values), 'points': len(x_series)}
+
+
+PREPARERS = {
+    "Line Plot": prepare_line,
+    "Scatter Plot": prepare_scatter,
+    "Bar Plot": prepare_bar,
+}
+
+
+def prepare_plot(df, x_column, y_column, plot_type):
+    """Zmniejsza dane do rozmiaru, który da się narysować (można wołać w wątku)."""
+    return PREPARERS[plot_type](df[x_column], df[y_column])
+
+
+def _format_datetime(value, position=None):
+    # Daty na osi X są przechowywane jako nanosekundy od 1970-01-01
+    return pd.Timestamp(int(value)).strftime('%Y-%m-%d')
+
+
+def draw_plot(data, x_column, y_column):
+    """Buduje figurę matplotlib (bez pyplot) z przygotowanych danych."""
+    figure = Figure(figsize=(10, 6), tight_layout=True)
+    ax = figure.add_subplot()
+    kind = data['type']
+    if kind == 'line':
+        ax.plot(data['x'], data['y'], marker='o' if len(data['x']) <= 200 else None)
+        if data['x_kind'] == 'category':
+            step = max(1, len(data['x']) // 20)
+            ax.set_xticks(data['x'][::step])
+            ax.set_xticklabels(data['labels'][::step])
+    elif kind == 'scatter':
+        ax.scatter(data['x'], data['y'], s=8)
+    elif kind == 'density':
+        counts = np.ma.masked_equal(data['counts'], 0)
+        image = ax.imshow(counts, origin='lower', extent=data['extent'], aspect='auto',
+                          norm=LogNorm(), cmap='viridis', interpolation='nearest')
+        figure.colorbar(image, ax=ax, label='points')
+    elif kind == 'bar':
+        ax.bar(range(len(data['labels'])), data['values'])
+        ax.set_xticks(range(len(data['labels'])))
+        ax.set_xticklabels(data['labels'])
+        y_column = f"sum of {y_column}"
+    if data.get('x_kind') == 'datetime':
+        ax.xaxis.set_major_formatter(FuncFormatter(_format_datetime))
+
+    ax.set_title(f'{y_column} vs {x_column} ({data["points"]} rows)')
+    ax.set_xlabel(x_column)
+    ax.set_ylabel(y_column)
+    for label in ax.get_xticklabels():
+        label.set_rotation(45)
+        label.set_horizontalalignment('right')
+    ax.grid(True)
+    return figure
+
+
+class PlotCache:
+    """Dane ostatnio przygotowanych wykresów (wynik ``prepare_plot``, LRU)."""
+
+    def __init__(self, max_size=8):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        data = self._data.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._data.move_to_end(key)
+        return data
+
+    def put(self, key, data):
+        self._data[key] = data
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
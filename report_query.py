@@ -0,0 +1,336 @@
+"""
+Opis operacji wykonywanych na tabeli w generatorze raportów.
+
+``TableQuery`` zbiera filtry zakresu, wybór kolumn, grupowanie i sortowanie
+wybierane z menu nagłówka. Ten sam opis można:
+
+- przetłumaczyć na zapytanie Firebirda (``to_sql``) - przez sieć przechodzi
+  tylko wynik, a ``FIRST/SKIP`` ogranicza liczbę wierszy,
+- wykonać w pandas na tabeli wczytanej w całości do pamięci (``apply``).
+
+Mediany Firebird nie liczy; wtedy baza robi tylko filtrowanie i projekcję
+(``base()``), a grupowanie liczy pandas.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+SQL_AGGREGATES = {
+    'count': 'COUNT(*)',
+    # AVG na kolumnie INTEGER zwraca w Firebirdzie liczbę całkowitą
+    'mean': 'AVG(CAST({col} AS DOUBLE PRECISION))',
+    'min': 'MIN({col})',
+    'max': 'MAX({col})',
+    'sum': 'SUM({col})',
+}
+AGGREGATES = ('none', 'count', 'mean', 'median', 'min', 'max', 'sum')
+
+
+def quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def numeric_columns(df):
+    return [col for col in df.columns
+            if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])]
+
+
+class TableQuery:
+    """
+    Niezmienny opis zapytania; metody ``with_*`` zwracają nową kopię.
+
+    ``columns`` to wszystkie kolumny tabeli, ``numeric`` - te, które można
+    agregować. Kolejność operacji: filtry, wybór kolumn, grupowanie,
+    sortowanie, FIRST/SKIP.
+    """
+
+    def __init__(self, table, columns, numeric=(), selected=None, filters=None,
+                 group=None, order=None, first=None, skip=None):
+        self.table = table
+        self.columns = list(columns)
+        self.numeric = list(numeric)
+        self.selected = list(selected) if selected is not None else list(self.columns)
+        self.filters = dict(filters or {})     # kolumna -> (min, max)
+        self.group = group                     # (kolumna, agregacja) albo None
+        self.order = order                     # (kolumna, rosnąco) albo None
+        self.first = first
+        self.skip = skip
+
+    def _replace(self, **changes):
+        state = dict(table=self.table, columns=self.columns, numeric=self.numeric,
+                     selected=self.selected, filters=self.filters, group=self.group,
+                     order=self.order, first=self.first, skip=self.skip)
+        state.update(changes)
+        return TableQuery(**state)
+
+    def with_filter(self, column, low, high):
+        filters = dict(self.filters)
+        filters[column] = (low, high)
+        return self._replace(filters=filters)
+
+    def with_columns(self, selected):
+        selected = [col for col in self.columns if col in selected]
+        query = self._replace(selected=selected)
+        if query.group is not None and query.group[0] not in selected:
+            query = query._replace(group=None)
+        if query.order is not None and query.order[0] not in query.output_columns():
+            query = query._replace(order=None)
+        return query
+
+    def with_group(self, column, aggregate):
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"Unsupported aggregation: {aggregate}")
+        query = self._replace(group=(column, aggregate))
+        if query.order is not None and query.order[0] not in query.output_columns():
+            query = query._replace(order=None)
+        return query
+
+    def with_order(self, column, ascending=True):
+        return self._replace(order=(column, ascending))
+
+    def with_limit(self, first=None, skip=None):
+        return self._replace(first=first, skip=skip)
+
+    def base(self):
+        """Tylko filtry i kolumny potrzebne do policzenia wyniku."""
+        needed = set(self.selected) | set(self.filters)
+        return self._replace(selected=[col for col in self.columns if col in needed],
+                             group=None, order=None, first=None, skip=None)
+
+    def is_base_column(self, column):
+        """Czy kolumna wyniku zawiera wartości z tabeli (a nie wynik agregacji)."""
+        if self.group is None or self.group[1] == 'none':
+            return column in self.columns
+        return column == self.group[0]
+
+    def aggregated_columns(self):
+        column, _ = self.group
+        return [col for col in self.selected if col in self.numeric and col != column]
+
+    def output_columns(self):
+        if self.group is None:
+            return list(self.selected)
+        column, aggregate = self.group
+        if aggregate == 'none':
+            return list(self.selected)
+        if aggregate == 'count':
+            return [column, 'count']
+        return [column] + self.aggregated_columns()
+
+    @property
+    def sql_capable(self):
+        return self.group is None or self.group[1] != 'median'
+
+    def to_sql(self):
+        """Zwraca (sql, parametry). Dla mediany zgłasza ValueError - użyj base()."""
+        if not self.sql_capable:
+            raise ValueError("Median cannot be computed by Firebird")
+
+        head = "SELECT"
+        if self.first is not None:
+            head += f" FIRST {int(self.first)}"
+        if self.skip:
+            head += f" SKIP {int(self.skip)}"
+
+        group_sql = ""
+        if self.group is None or self.group[1] == 'none':
+            select = [quote(col) for col in self.selected]
+        else:
+            column, aggregate = self.group
+            if aggregate == 'count':
+                select = [quote(column), f"{SQL_AGGREGATES['count']} AS {quote('count')}"]
+            else:
+                select = [quote(column)] + [
+                    f"{SQL_AGGREGATES[aggregate].format(col=quote(col))} AS {quote(col)}"
+                    for col in self.aggregated_columns()
+                ]
+            group_sql = f" GROUP BY {quote(column)}"
+
+        where, params = [], []
+        for column, (low, high) in self.filters.items():
+            where.append(f"{quote(column)} BETWEEN ? AND ?")
+            params += [low, high]
+        where_sql = f" WHERE {' AND '.join(where)}" if where else ""
+
+        order = []
+        if self.order is not None:
+            column, ascending = self.order
+            # Pozycja zamiast nazwy - działa też dla kolumn agregowanych
+            position = self.output_columns().index(column) + 1
+            order.append(f"{position} {'ASC' if ascending else 'DESC'} NULLS LAST")
+        if self.group is not None and self.group[1] == 'none':
+            order.append(f"{quote(self.group[0])} NULLS LAST")
+        order_sql = f" ORDER BY {', '.join(order)}" if order else ""
+
+        sql = f"{head} {', '.join(select)} FROM {quote(self.table)}{where_sql}{group_sql}{order_sql}"
+        return sql, params
+
+    def apply(self, df):
+        """Wykonuje to samo zapytanie w pandas."""
+        for column, (low, high) in self.filters.items():
+            df = df[(df[column] >= low) & (df[column] <= high)]
+        df = df[self.selected]
+
+        if self.group is not None:
+            column, aggregate = self.group
+            if aggregate == 'none':
+                df = df.sort_values(column, kind='stable')
+            elif aggregate == 'count':
+                df = df.groupby(column).size().reset_index(name='count')
+            else:
+                df = getattr(df.groupby(column)[self.aggregated_columns()], aggregate)().reset_index()
+
+        if self.order is not None:
+            column, ascending = self.order
+            df = df.sort_values(column, ascending=ascending, kind='stable')
+
+        if self.skip or self.first is not None:
+            start = self.skip or 0
+            stop = None if self.first is None else start + self.first
+            df = df.iloc[start:stop]
+        return df.reset_index(drop=True)
+
+
+class ResultView:
+    """Wynik potoku: DataFrame, pozycje wierszy (None = wszystkie) i kolumny."""
+
+    def __init__(self, df, rows=None, columns=None):
+        self.df = df
+        self.rows = rows
+        self.columns = list(df.columns) if columns is None else list(columns)
+
+    def __len__(self):
+        return len(self.df) if self.rows is None else len(self.rows)
+
+    def column(self, name):
+        series = self.df[name]
+        return series if self.rows is None else series.iloc[self.rows]
+
+    def materialize(self):
+        """Kopia tylko wtedy, gdy jest potrzebna (eksport, wykres)."""
+        if self.rows is None and self.columns == list(self.df.columns):
+            return self.df
+        rows = slice(None) if self.rows is None else self.rows
+        return self.df.iloc[rows][self.columns].reset_index(drop=True)
+
+
+class ReportPipeline:
+    """
+    Lista kroków z menu nagłówka, wykonywana leniwie na tabeli w pamięci.
+
+    Krok to krotka: ``('filter', kolumna, min, max)``, ``('select', kolumny)``,
+    ``('group', kolumna, agregacja)`` albo ``('sort', kolumna, rosnąco)``.
+    Kroki są składane w ``TableQuery`` (to samo zapytanie może wykonać baza),
+    a w pamięci liczone etapami: maska filtrów, grupowanie, kolejność wierszy.
+    Wynik każdego etapu jest zapamiętywany pod kluczem z jego wejść, więc
+    cofnięcie lub zmiana kroku liczy ponownie tylko etapy za nim. Filtry to
+    maski logiczne, a sortowanie to tablica pozycji - DataFrame nie jest
+    kopiowany.
+    """
+
+    def __init__(self, query, df=None, cache_size=32):
+        self.base_query = query
+        self.df = df
+        self.steps = []
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def push(self, step):
+        self.steps.append(step)
+
+    def undo(self):
+        return self.steps.pop() if self.steps else None
+
+    def replace(self, index, step):
+        self.steps[index] = step
+
+    def clear(self):
+        self.steps = []
+
+    def key(self):
+        """Kroki jako krotka - do kluczy pamięci podręcznych (np. wykresów)."""
+        return tuple(tuple(tuple(arg) if isinstance(arg, list) else arg for arg in step)
+                     for step in self.steps)
+
+    def query(self):
+        query = self.base_query
+        for step in self.steps:
+            kind, args = step[0], step[1:]
+            if kind == 'filter':
+                query = query.with_filter(*args)
+            elif kind == 'select':
+                query = query.with_columns(*args)
+            elif kind == 'group':
+                query = query.with_group(*args)
+            elif kind == 'sort':
+                query = query.with_order(*args)
+            else:
+                raise ValueError(f"Unknown pipeline step: {kind}")
+        return query
+
+    def _memo(self, key, compute):
+        try:
+            value = self._cache[key]
+        except KeyError:
+            self.misses += 1
+            value = self._cache[key] = compute()
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self.hits += 1
+            self._cache.move_to_end(key)
+        return value
+
+    def _filter_rows(self, filters):
+        """Pozycje wierszy spełniających wszystkie filtry (None = bez filtrów)."""
+        if not filters:
+            return None
+
+        def combine():
+            mask = None
+            for column, (low, high) in filters:
+                part = self._memo(('mask', column, low, high),
+                                  lambda: ((self.df[column] >= low) & (self.df[column] <= high))
+                                  .fillna(False).to_numpy(dtype=bool))
+                mask = part if mask is None else mask & part
+            return np.flatnonzero(mask)
+
+        return self._memo(('rows', filters), combine)
+
+    @staticmethod
+    def _sorted(df, rows, column, ascending):
+        series = df[column] if rows is None else df[column].iloc[rows]
+        order = series.reset_index(drop=True).sort_values(
+            ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+        return order if rows is None else rows[order]
+
+    def evaluate(self, query=None):
+        """Zwraca ResultView dla bieżących kroków."""
+        query = query or self.query()
+        filters = tuple(sorted(query.filters.items()))
+        key = ('rows', filters)
+        rows = self._filter_rows(filters)
+        df = self.df
+
+        if query.group is not None:
+            column, aggregate = query.group
+            key = ('group', filters, tuple(query.selected), query.group)
+            if aggregate == 'none':
+                rows = self._memo(key, lambda: self._sorted(df, rows, column, True))
+            else:
+                subset_rows = rows
+                grouping = query._replace(filters={}, order=None, first=None, skip=None)
+                df = self._memo(key, lambda: grouping.apply(
+                    df if subset_rows is None else df.iloc[subset_rows]))
+                rows = None
+
+        if query.order is not None:
+            column, ascending = query.order
+            rows = self._memo(key + ('order', query.order),
+                              lambda: self._sorted(df, rows, column, ascending))
+
+        return ResultView(df, rows, query.output_columns())
@@ -0,0 +1,364 @@
+"""
+Pamięć podręczna migawek tabel na dysku (zamiast plików CSV w database_tables).
+
+Każda tabela to katalog z plikiem ``meta.json`` i surowymi plikami kolumn:
+
+    int       -> int64 + maska NULL
+    float     -> float64 (NULL jako NaN; DECIMAL też trafia tutaj)
+    bool      -> uint8 + maska NULL
+    date      -> int64 dni od 1970-01-01 + maska NULL
+    datetime  -> int64 mikrosekund od 1970-01-01 + maska NULL
+    str       -> bajty UTF-8 + int64 offsety końców + maska NULL
+
+Pliki są tylko dopisywane, więc migawkę można zapisywać porcjami i
+odświeżać przyrostowo (``WHERE ID > max_id``). Kolumny liczbowe są wczytywane
+przez np.memmap. Liczba wierszy w ``meta.json`` jest źródłem prawdy - bajty
+dopisane po przerwanym odświeżeniu są ignorowane i obcinane przy następnym.
+
+Świeżość: w ciągu ``ttl`` sekund migawka jest używana bez pytania bazy, potem
+sprawdzane są COUNT(*) i MAX(ID). Zmiany wierszy w miejscu (UPDATE) nie są
+wykrywane - do tego służy wymuszone pełne odświeżenie.
+"""
+
+import datetime
+import decimal
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from report_query import quote
+from table_export import DEFAULT_CHUNK_SIZE
+
+META_FILE = 'meta.json'
+EPOCH_DATE = datetime.date(1970, 1, 1)
+EPOCH_DATETIME = datetime.datetime(1970, 1, 1)
+
+KIND_BY_TYPE = {
+    int: 'int',
+    float: 'float',
+    decimal.Decimal: 'float',
+    bool: 'bool',
+    str: 'str',
+    datetime.date: 'date',
+    datetime.datetime: 'datetime',
+}
+
+
+def column_kinds(description):
+    """Rodzaj kolumny na podstawie typu Pythona z cursor.description."""
+    return [KIND_BY_TYPE.get(col[1], 'str') for col in description]
+
+
+def _encode(values, kind):
+    """Zamienia kolumnę DataFrame na (wartości, maska NULL, bajty napisów)."""
+    mask = pd.isna(values).to_numpy()
+    if kind == 'float':
+        return pd.to_numeric(values, errors='coerce').astype('float64').to_numpy(), None, None
+    if kind in ('int', 'bool'):
+        dtype = 'int64' if kind == 'int' else 'uint8'
+        return values.where(~mask, 0).astype(dtype).to_numpy(), mask, None
+    if kind == 'date':
+        days = [0 if m else (v - EPOCH_DATE).days for v, m in zip(values, mask)]
+        return np.asarray(days, dtype='int64'), mask, None
+    if kind == 'datetime':
+        micros = [0 if m else (v - EPOCH_DATETIME) // datetime.timedelta(microseconds=1)
+                  for v, m in zip(values, mask)]
+        return np.asarray(micros, dtype='int64'), mask, None
+    encoded = [b'' if m else str(v).encode('utf-8') for v, m in zip(values, mask)]
+    lengths = np.fromiter((len(b) for b in encoded), dtype='int64', count=len(encoded))
+    return lengths, mask, b''.join(encoded)
+
+
+class SnapshotWriter:
+    """Dopisuje porcje wierszy do plików kolumn migawki."""
+
+    def __init__(self, path, columns, kinds, rows=0, data_bytes=None):
+        self.path = path
+        self.columns = columns
+        self.kinds = kinds
+        self.rows = rows
+        self.data_bytes = list(data_bytes) if data_bytes else [0] * len(columns)
+        self.max_id = None
+        os.makedirs(path, exist_ok=True)
+        self._files = {}
+
+    def _file(self, name):
+        handle = self._files.get(name)
+        if handle is None:
+            handle = self._files[name] = open(os.path.join(self.path, name), 'ab')
+        return handle
+
+    def write(self, df):
+        for i, kind in enumerate(self.kinds):
+            values, mask, data = _encode(df.iloc[:, i], kind)
+            if kind == 'str':
+                # Offsety końców napisów liczone od początku pliku danych
+                ends = np.cumsum(values) + self.data_bytes[i]
+                self._file(f'{i}.offsets').write(ends.tobytes())
+                self._file(f'{i}.data').write(data)
+                self.data_bytes[i] += len(data)
+            else:
+                self._file(f'{i}.values').write(values.tobytes())
+            if mask is not None:
+                self._file(f'{i}.mask').write(mask.astype('uint8').tobytes())
+        if 'ID' in self.columns and len(df):
+            chunk_max = df['ID'].max()
+            if not pd.isna(chunk_max):
+                self.max_id = int(chunk_max) if self.max_id is None else max(self.max_id, int(chunk_max))
+        self.rows += len(df)
+
+    def close(self):
+        for handle in self._files.values():
+            handle.close()
+        self._files.clear()
+
+
+class SnapshotCache:
+    def __init__(self, directory, disk_budget=2 * 1024 ** 3, ttl=300.0):
+        self.directory = directory
+        self.disk_budget = disk_budget
+        self.ttl = ttl
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    # --- metadane ---------------------------------------------------------
+
+    def _lock(self, table):
+        with self._locks_lock:
+            return self._locks.setdefault(table, threading.Lock())
+
+    def _path(self, table):
+        return os.path.join(self.directory, f'{table}.snapshot')
+
+    def read_meta(self, table):
+        try:
+            with open(os.path.join(self._path(table), META_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, path, meta):
+        tmp = os.path.join(path, META_FILE + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, META_FILE))
+
+    def _touch(self, table, meta, **changes):
+        meta.update(changes)
+        meta['last_access'] = time.time()
+        self._write_meta(self._path(table), meta)
+
+    # --- odczyt -----------------------------------------------------------
+
+    def load(self, table, meta=None, max_rows=None):
+        """Wczytuje migawkę jako DataFrame; kolumny liczbowe są memmapowane."""
+        meta = meta or self.read_meta(table)
+        path = self._path(table)
+        rows = meta['rows'] if max_rows is None else min(meta['rows'], max_rows)
+        data = {}
+        for i, (name, kind) in enumerate(zip(meta['columns'], meta['kinds'])):
+            data[name] = self._load_column(path, i, kind, rows)
+        return pd.DataFrame(data, columns=meta['columns'], copy=False)
+
+    def _memmap(self, path, dtype, rows):
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(rows,))
+
+    def _load_column(self, path, i, kind, rows):
+        base = os.path.join(path, str(i))
+        mask = None
+        if kind != 'float':
+            mask = self._memmap(base + '.mask', 'uint8', rows).astype(bool)
+        if kind == 'float':
+            return self._memmap(base + '.values', 'float64', rows)
+        if kind == 'int':
+            values = self._memmap(base + '.values', 'int64', rows)
+            if not mask.any():
+                return values
+            return pd.arrays.IntegerArray(np.asarray(values), mask)
+        if kind == 'bool':
+            values = self._memmap(base + '.values', 'uint8', rows).astype(bool)
+            return pd.arrays.BooleanArray(values, mask)
+        if kind in ('date', 'datetime'):
+            unit = 'D' if kind == 'date' else 'us'
+            values = np.array(self._memmap(base + '.values', 'int64', rows)).view(f'datetime64[{unit}]')
+            values[mask] = np.datetime64('NaT')
+            return values
+        ends = self._memmap(base + '.offsets', 'int64', rows)
+        if rows == 0:
+            return np.empty(0, dtype=object)
+        with open(base + '.data', 'rb') as f:
+            raw = f.read(int(ends[-1]))
+        out = np.empty(rows, dtype=object)
+        start = 0
+        for j, end in enumerate(ends.tolist()):
+            out[j] = None if mask[j] else raw[start:end].decode('utf-8')
+            start = end
+        return out
+
+    # --- świeżość ---------------------------------------------------------
+
+    @staticmethod
+    def fingerprint(conn, table, has_id):
+        if has_id:
+            count, max_id = conn.execute(f"SELECT COUNT(*), MAX(ID) FROM {quote(table)}").fetchone()
+            return count, max_id
+        return conn.execute(f"SELECT COUNT(*) FROM {quote(table)}").fetchone()[0], None
+
+    # --- zapis ------------------------------------------------------------
+
+    def _full_refresh(self, conn, table, chunk_size, on_chunk, should_stop):
+        final_path = self._path(table)
+        # Własny katalog na każde zadanie - przerwane zadanie nie usunie plików następnego
+        tmp_path = tempfile.mkdtemp(prefix=f'{table}.', suffix='.tmp', dir=self.directory)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT * FROM {quote(table)}")
+            columns = [col[0].strip() for col in cursor.description]
+            writer = SnapshotWriter(tmp_path, columns, column_kinds(cursor.description))
+            try:
+                while True:
+                    if should_stop is not None and should_stop():
+                        return None
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    df = pd.DataFrame(rows, columns=columns)
+                    writer.write(df)
+                    if on_chunk is not None:
+                        on_chunk(df)
+            finally:
+                writer.close()
+
+            if writer.rows == 0 and on_chunk is not None:
+                on_chunk(pd.DataFrame([], columns=columns))
+            count, max_id = self.fingerprint(conn, table, 'ID' in columns)
+            meta = {
+                'table': table,
+                'columns': columns,
+                'kinds': writer.kinds,
+                'rows': writer.rows,
+                'data_bytes': writer.data_bytes,
+                'max_id': writer.max_id,
+                'fingerprint': [count, max_id],
+                'checked_at': time.time(),
+                'last_access': time.time(),
+            }
+            self._write_meta(tmp_path, meta)
+            shutil.rmtree(final_path, ignore_errors=True)
+            os.replace(tmp_path, final_path)
+            return meta
+        finally:
+            # Po udanym os.replace katalogu już nie ma
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def _truncate(self, path, meta):
+        """Obcina pliki do liczby wierszy z meta (resztki po przerwanym dopisywaniu)."""
+        rows = meta['rows']
+        for i, kind in enumerate(meta['kinds']):
+            sizes = {'mask': rows} if kind != 'float' else {}
+            if kind == 'str':
+                sizes.update({'offsets': rows * 8, 'data': meta['data_bytes'][i]})
+            else:
+                sizes['values'] = rows * (1 if kind == 'bool' else 8)
+            for suffix, size in sizes.items():
+                name = os.path.join(path, f'{i}.{suffix}')
+                if os.path.exists(name) and os.path.getsize(name) > size:
+                    with open(name, 'r+b') as f:
+                        f.truncate(size)
+
+    def _incremental_refresh(self, conn, table, meta, expected_count, chunk_size, on_chunk):
+        """Dopisuje wiersze z ID > max_id; zwraca None, jeśli liczby się nie zgadzają."""
+        path = self._path(table)
+        self._truncate(path, meta)
+        writer = SnapshotWriter(path, meta['columns'], meta['kinds'], meta['rows'], meta['data_bytes'])
+        writer.max_id = meta['max_id']
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT * FROM {quote(table)} WHERE ID > ? ORDER BY ID", (meta['max_id'],))
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                df = pd.DataFrame(rows, columns=meta['columns'])
+                writer.write(df)
+                if on_chunk is not None:
+                    on_chunk(df)
+        finally:
+            writer.close()
+        if writer.rows != expected_count:
+            # Coś zostało usunięte lub zmienione - meta nie jest aktualizowane
+            return None
+        self._touch(table, meta, rows=writer.rows, data_bytes=writer.data_bytes,
+                    max_id=writer.max_id, fingerprint=[expected_count, writer.max_id],
+                    checked_at=time.time())
+        return meta
+
+    # --- główne wejście ---------------------------------------------------
+
+    def get(self, conn, table, force=False, chunk_size=DEFAULT_CHUNK_SIZE, max_rows=None,
+            on_chunk=None, should_stop=None):
+        """
+        Zwraca (DataFrame, status), gdzie status to 'cached', 'incremental' lub
+        'full'. Przy pełnym odświeżeniu ``on_chunk`` dostaje kolejne porcje wierszy.
+        """
+        # Odświeżenia tej samej tabeli (np. zadanie zastąpione nowym, które jeszcze
+        # nie zauważyło should_stop) idą po kolei, żeby nie pisały do tych samych plików
+        with self._lock(table):
+            meta = None if force else self.read_meta(table)
+            status = 'cached'
+            if meta is not None and time.time() - meta.get('checked_at', 0) >= self.ttl:
+                has_id = 'ID' in meta['columns']
+                count, max_id = self.fingerprint(conn, table, has_id)
+                if [count, max_id] == meta['fingerprint']:
+                    self._touch(table, meta, checked_at=time.time())
+                elif has_id and meta['max_id'] is not None and count > meta['rows'] \
+                        and max_id is not None and max_id > meta['max_id']:
+                    meta = self._incremental_refresh(conn, table, meta, count, chunk_size, None)
+                    status = 'incremental'
+                else:
+                    meta = None
+
+            if meta is None:
+                meta = self._full_refresh(conn, table, chunk_size, on_chunk, should_stop)
+                if meta is None:
+                    return None, 'cancelled'
+                status = 'full'
+            else:
+                self._touch(table, meta)
+
+            self.evict(keep=table)
+            return self.load(table, meta, max_rows), status
+
+    def size_of(self, table):
+        path = self._path(table)
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+    def evict(self, keep=None):
+        """Usuwa najdawniej używane migawki, dopóki całość nie zmieści się w budżecie."""
+        snapshots = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir() or not entry.name.endswith('.snapshot'):
+                continue
+            table = entry.name[:-len('.snapshot')]
+            meta = self.read_meta(table)
+            snapshots.append((meta['last_access'] if meta else 0, table, self.size_of(table)))
+        total = sum(size for _, _, size in snapshots)
+        for _, table, size in sorted(snapshots):
+            if total <= self.disk_budget:
+                break
+            if table == keep:
+                continue
+            shutil.rmtree(self._path(table), ignore_errors=True)
+            total -= size
+
+    def drop(self, table):
+        shutil.rmtree(self._path(table), ignore_errors=True)
@@ -0,0 +1,118 @@
+"""
+Strumieniowy eksport tabel z Firebirda.
+
+Wiersze są pobierane przez ``fetchmany`` w porcjach i od razu dopisywane do
+pliku (CSV, a jeśli jest zainstalowany pyarrow - także Parquet/Feather), więc
+zużycie pamięci zależy od rozmiaru porcji, a nie od rozmiaru tabeli.
+"""
+
+import os
+
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 10000
+EXPORT_FORMATS = {'csv': '.csv', 'parquet': '.parquet', 'feather': '.feather'}
+
+
+def _require_pyarrow(fmt):
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        raise RuntimeError(f"Export to {fmt} requires the 'pyarrow' package") from None
+
+
+def iter_query_chunks(cursor, query, params=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Wykonuje zapytanie i zwraca kolejne porcje wyniku jako DataFrame."""
+    cursor.execute(query, params)
+    columns = [col[0].strip() for col in cursor.description]
+    empty = True
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        empty = False
+        yield pd.DataFrame(rows, columns=columns)
+    if empty:
+        # Pusta tabela - jedna pusta porcja, żeby zachować nazwy kolumn
+        yield pd.DataFrame([], columns=columns)
+
+
+class ChunkWriter:
+    """Dopisuje kolejne porcje DataFrame do jednego pliku."""
+
+    def __init__(self, path, fmt='csv'):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.rows = 0
+        self._tmp_path = path + '.part'
+        self._writer = None
+        self._schema = None
+        self._file = None
+
+    def write(self, df):
+        if self.fmt == 'csv':
+            if self._file is None:
+                self._file = open(self._tmp_path, 'w', encoding='utf-8', newline='')
+                df.to_csv(self._file, index=False)
+            else:
+                df.to_csv(self._file, index=False, header=False)
+        else:
+            pa = _require_pyarrow(self.fmt)
+            # Schemat z pierwszej porcji - kolejne muszą do niego pasować
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+            if self._writer is None:
+                self._schema = table.schema
+                if self.fmt == 'parquet':
+                    import pyarrow.parquet as pq
+                    self._writer = pq.ParquetWriter(self._tmp_path, self._schema)
+                else:
+                    self._writer = pa.ipc.new_file(self._tmp_path, self._schema)
+            self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is None and self._writer is None:
+            # Pusta tabela - zapisz przynajmniej pusty plik
+            open(self._tmp_path, 'w').close()
+        # Plik pojawia się pod docelową nazwą dopiero, gdy jest kompletny
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        for handle in (self._file, self._writer):
+            if handle is not None:
+                try:
+                    handle.close()
+                except Exception:
+                    pass
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def export_chunks(chunks, path, fmt='csv', on_chunk=None, should_stop=None):
+    """
+    Zapisuje porcje do pliku. ``on_chunk(df)`` jest wołane po zapisaniu każdej
+    porcji; ``should_stop()`` pozwala przerwać eksport (plik nie powstaje).
+    Zwraca liczbę zapisanych wierszy.
+    """
+    writer = ChunkWriter(path, fmt)
+    try:
+        for chunk in chunks:
+            if should_stop is not None and should_stop():
+                writer.abort()
+                return None
+            writer.write(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+    except Exception:
+        writer.abort()
+        raise
+    writer.close()
+    return writer.rows
+
@@ -0,0 +1,139 @@
+"""
+Model tabeli Qt oparty na DataFrame.
+
+Zamiast tworzyć QTableWidgetItem dla każdej komórki, widok pyta model tylko
+o komórki, które są aktualnie widoczne. Kolumny trzymane są jako tablice
+numpy, a sortowanie zmienia jedynie tablicę kolejności wierszy - dane nie są
+kopiowane.
+"""
+
+import numpy as np
+import pandas as pd
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+
+def format_value(value):
+    if value is None or value is pd.NA or value is pd.NaT:
+        return ""
+    if isinstance(value, float) and np.isnan(value):
+        return ""
+    if isinstance(value, (np.datetime64, pd.Timestamp)):
+        if pd.isna(value):
+            return ""
+        value = pd.Timestamp(value)
+        # Kolumny DATE nie mają części czasu
+        return value.strftime("%Y-%m-%d") if value == value.normalize() else str(value)
+    return str(value)
+
+
+class DataFrameModel(QAbstractTableModel):
+    def __init__(self, df=None, parent=None):
+        super().__init__(parent)
+        self._df = pd.DataFrame()
+        self._positions = []
+        self._columns = []
+        self._headers = []
+        self._order = None
+        if df is not None:
+            self.set_dataframe(df)
+
+    @classmethod
+    def from_rows(cls, rows, headers, parent=None):
+        return cls(pd.DataFrame(list(rows), columns=headers), parent)
+
+    def set_dataframe(self, df):
+        self.set_view(df)
+
+    def set_view(self, df, rows=None, columns=None):
+        """
+        Pokazuje wybrane wiersze (tablica pozycji, w kolejności wyświetlania)
+        i kolumny DataFrame bez tworzenia jego kopii.
+        """
+        positions = range(df.shape[1]) if columns is None else [df.columns.get_loc(col) for col in columns]
+        self.beginResetModel()
+        self._df = df
+        self._positions = list(positions)
+        self._columns = [df.iloc[:, i].to_numpy() for i in self._positions]
+        self._headers = [str(df.columns[i]) for i in self._positions]
+        self._order = None if rows is None else np.asarray(rows)
+        self.endResetModel()
+
+    def append_frame(self, df):
+        """Dopisuje wiersze na końcu (wczytywanie tabeli porcjami)."""
+        if len(df) == 0:
+            return
+        first = len(self._df)
+        row = self.rowCount()
+        self.beginInsertRows(QModelIndex(), row, row + len(df) - 1)
+        self._df = pd.concat([self._df, df], ignore_index=True)
+        self._columns = [self._df.iloc[:, i].to_numpy() for i in self._positions]
+        if self._order is not None:
+            self._order = np.concatenate([self._order, np.arange(first, first + len(df))])
+        self.endInsertRows()
+
+    def set_rows(self, rows):
+        self.set_dataframe(pd.DataFrame(list(rows), columns=self._headers))
+
+    def dataframe(self):
+        """DataFrame w kolejności, w jakiej jest wyświetlany."""
+        if self._order is None and len(self._positions) == self._df.shape[1]:
+            return self._df
+        rows = slice(None) if self._order is None else self._order
+        return self._df.iloc[rows, self._positions]
+
+    def source_row(self, row):
+        return row if self._order is None else int(self._order[row])
+
+    def row_values(self, row):
+        source = self.source_row(row)
+        return tuple(column[source] for column in self._columns)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._df) if self._order is None else len(self._order)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        return format_value(self._columns[index.column()][self.source_row(index.row())])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self._headers[section]
+        return super().headerData(section, orientation, role)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if not self._columns:
+            return
+        rows = np.arange(len(self._df)) if self._order is None else self._order
+        values = self._columns[column][rows]
+        # Puste wartości zawsze na końcu; pozostałe jako rangi, żeby malejąco
+        # sortować po zanegowanej randze - lexsort jest stabilny, więc równe
+        # klucze zachowują dotychczasową kolejność w obu kierunkach
+        nulls = np.asarray(pd.isna(values), dtype=bool)
+        ranks = np.zeros(len(values), dtype=np.intp)
+        present = values[~nulls]
+        try:
+            ranks[~nulls] = np.unique(present, return_inverse=True)[1]
+        except TypeError:
+            # Kolumny obiektowe z mieszanymi typami (np. int i str)
+            ranks[~nulls] = np.unique(present.astype(str), return_inverse=True)[1]
+        if order == Qt.DescendingOrder:
+            ranks = -ranks
+        new_order = rows[np.lexsort((ranks, nulls))]
+
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        sources = [self.source_row(index.row()) for index in persistent]
+        self._order = new_order
+        inverse = np.empty(len(self._df), dtype=np.intp)
+        inverse[new_order] = np.arange(len(new_order))
+        self.changePersistentIndexList(
+            persistent,
+            [self.index(int(inverse[source]), index.column()) for source, index in zip(sources, persistent)]
+        )
+        self.layoutChanged.emit()
@@ -0,0 +1,150 @@
+"""
+Wykonywanie zapytań do bazy poza wątkiem GUI.
+
+    runner = QueryRunner(max_threads=4)
+    runner.busy_changed.connect(progress_bar.setVisible)
+    runner.submit("search", lambda job: fetch_rooms(...), on_result=self.show_rooms)
+
+Funkcja zadania dostaje obiekt ``Job`` (flaga ``cancelled``, ``progress()``)
+i działa w QThreadPool. Wynik i błędy wracają sygnałami do wątku GUI, gdzie
+wywoływane są callbacki. Nowe zadanie w tym samym kanale anuluje poprzednie -
+jego wynik zostanie po cichu odrzucony.
+"""
+
+import threading
+import traceback
+from contextlib import contextmanager
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+
+class Job:
+    def __init__(self, channel, on_result=None, on_error=None, on_progress=None):
+        self.channel = channel
+        self.on_result = on_result
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.cancelled = False
+        self.signals = None
+        self._cancel_callback = None
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            if self._cancel_callback is not None:
+                try:
+                    self._cancel_callback()
+                except Exception:
+                    pass
+
+    @contextmanager
+    def cancellable(self, callback):
+        """
+        W obrębie bloku anulowanie zadania wywoła ``callback`` (np. przerwanie
+        zapytania w bazie). Po wyjściu z bloku callback nie zostanie już wywołany,
+        więc połączenie można bezpiecznie oddać do puli.
+        """
+        with self._lock:
+            self._cancel_callback = callback
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._cancel_callback = None
+
+    def progress(self, value):
+        if not self.cancelled:
+            self.signals.progress.emit(self, value)
+
+
+class WorkerSignals(QObject):
+    result = pyqtSignal(object, object)
+    error = pyqtSignal(object, object)
+    progress = pyqtSignal(object, object)
+    finished = pyqtSignal(object)
+
+
+class QueryWorker(QRunnable):
+    def __init__(self, fn, job):
+        super().__init__()
+        self.fn = fn
+        self.job = job
+        self.signals = WorkerSignals()
+        job.signals = self.signals
+
+    def run(self):
+        try:
+            if not self.job.cancelled:
+                result = self.fn(self.job)
+                self.signals.result.emit(self.job, result)
+        except Exception as e:
+            e.traceback = traceback.format_exc()
+            self.signals.error.emit(self.job, e)
+        finally:
+            self.signals.finished.emit(self.job)
+
+
+class QueryRunner(QObject):
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, max_threads=4, parent=None):
+        super().__init__(parent)
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(max_threads)
+        self.current = {}      # channel -> ostatnie zadanie
+        self.running = set()   # trzyma referencje do workerów do końca pracy
+
+    def submit(self, channel, fn, on_result=None, on_error=None, on_progress=None):
+        previous = self.current.get(channel)
+        if previous is not None:
+            previous.cancel()
+
+        job = Job(channel, on_result, on_error, on_progress)
+        worker = QueryWorker(fn, job)
+        worker.signals.result.connect(self._on_result)
+        worker.signals.error.connect(self._on_error)
+        worker.signals.progress.connect(self._on_progress)
+        worker.signals.finished.connect(self._on_finished)
+
+        self.current[channel] = job
+        self.running.add(worker)
+        if len(self.running) == 1:
+            self.busy_changed.emit(True)
+        self.thread_pool.start(worker)
+        return job
+
+    def cancel(self, channel):
+        job = self.current.pop(channel, None)
+        if job is not None:
+            job.cancel()
+
+    def is_busy(self, channel=None):
+        if channel is None:
+            return bool(self.running)
+        return any(worker.job.channel == channel for worker in self.running)
+
+    @pyqtSlot(object, object)
+    def _on_result(self, job, result):
+        if not job.cancelled and job.on_result:
+            job.on_result(result)
+
+    @pyqtSlot(object, object)
+    def _on_error(self, job, error):
+        if not job.cancelled and job.on_error:
+            job.on_error(error)
+
+    @pyqtSlot(object, object)
+    def _on_progress(self, job, value):
+        if not job.cancelled and job.on_progress:
+            job.on_progress(value)
+
+    @pyqtSlot(object)
+    def _on_finished(self, job):
+        self.running = {worker for worker in self.running if worker.job is not job}
+        if self.current.get(job.channel) is job:
+            del self.current[job.channel]
+        if not self.running:
+            self.busy_changed.emit(False)